@@ -0,0 +1,85 @@
+"""
+Import-time benchmark.
+
+Imports each target in a fresh interpreter and reports wall time, resident
+memory added by the import, and which heavy dependencies got loaded. Run
+it before and after touching module-level imports; a worker process pays
+these costs on every cold start.
+
+    python benchmarks/bench_import.py --repeat 5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+HEAVY = ("aiortc", "av", "aiohttp", "numpy", "scipy", "sounddevice", "orjson")
+
+TARGETS = [
+    "import openai_realtime_webrtc",
+    "from openai_realtime_webrtc import events, transcripts, recording",
+    "from openai_realtime_webrtc import SessionSupervisor",
+    "from openai_realtime_webrtc import OpenAIWebRTCClient",
+]
+
+PROBE = """
+import json, os, sys, time
+
+def rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+before = rss()
+start = time.perf_counter()
+exec(sys.argv[1])
+elapsed = time.perf_counter() - start
+loaded = sorted({name.split(".")[0] for name in sys.modules} & set(sys.argv[2].split(",")))
+print(json.dumps({"ms": elapsed * 1000, "rss_mb": (rss() - before) / 2 ** 20, "loaded": loaded}))
+"""
+
+
+def measure(statement: str, repeat: int) -> Dict[str, Any]:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [SRC, os.environ.get("PYTHONPATH")])))
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", PROBE, statement, ",".join(HEAVY)],
+                             env=env, check=True, capture_output=True, text=True).stdout
+        runs.append(json.loads(out))
+    runs.sort(key=lambda run: run["ms"])
+    best = runs[0]
+    return {
+        "target": statement,
+        "ms_min": best["ms"],
+        "ms_median": runs[len(runs) // 2]["ms"],
+        "rss_mb": best["rss_mb"],
+        "loaded": best["loaded"],
+    }
+
+
+def main(args) -> List[Dict[str, Any]]:
+    results = []
+    for statement in args.targets or TARGETS:
+        result = measure(statement, args.repeat)
+        results.append(result)
+        print(f"{result['ms_min']:8.1f} ms  {result['ms_median']:8.1f} ms  {result['rss_mb']:6.1f} MB  "
+              f"{statement}  [{', '.join(result['loaded'])}]", flush=True)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("targets", nargs="*", help="import statements to time (default: a built-in set)")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per target")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    print(f"{'min':>11}  {'median':>11}  {'rss':>9}")
+    results = main(args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,192 @@
+"""
+Session benchmark against the local fake realtime endpoint.
+
+Starts ``fake_realtime_server`` in a separate process (so its CPU time is
+not counted), then for each concurrency level opens that many sessions
+that stream a click track through the echo peer and back. Reports session
+setup time, frame throughput, end-to-end latency percentiles (click sent to
+click heard), CPU per session and resident memory per session.
+
+    python benchmarks/bench_sessions.py --sessions 1,4,16 --duration 10
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import socket
+import sys
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import fake_realtime_server  # noqa: E402
+from openai_realtime_webrtc import OpenAIWebRTCClient, WebRTCManager  # noqa: E402
+from openai_realtime_webrtc.pcm_stream import PCMOutputStream  # noqa: E402
+
+SAMPLE_RATE = 48000
+FRAME_MS = 20
+FRAME_SIZE = SAMPLE_RATE * FRAME_MS // 1000
+CLICK_INTERVAL = 0.5  # seconds between clicks
+CLICK_FRAMES = 3  # click length in frames
+DETECT_RMS = 1000.0
+
+
+def rss_bytes() -> int:
+    """Current resident set size (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else float("nan")
+
+
+class ClickSession:
+    """One client streaming clicks and timing when each comes back."""
+
+    def __init__(self, api_base: str):
+        self.sent: List[float] = []
+        self.latencies: List[float] = []
+        self.remote = PCMOutputStream(SAMPLE_RATE, 1, chunk_ms=FRAME_MS)
+        manager = WebRTCManager(api_base=api_base, ice_servers=[], remote_audio=self.remote)
+        self.client = OpenAIWebRTCClient(
+            "sk-benchmark", model="gpt-4o-realtime-preview", webrtc_manager=manager,
+            audio_source=self._source(), source_realtime=False, enable_metrics=True)
+        self._listener = None
+
+    async def _source(self):
+        t = np.arange(FRAME_SIZE) / SAMPLE_RATE
+        click = (12000 * np.sin(2 * np.pi * 1000 * t)).astype(np.int16).tobytes()
+        silence = bytes(FRAME_SIZE * 2)
+        every = int(CLICK_INTERVAL * 1000 / FRAME_MS)
+        start = time.perf_counter()
+        index = 0
+        while True:
+            delay = start + index * FRAME_MS / 1000 - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            position = index % every
+            if position == 0:
+                self.sent.append(time.perf_counter())
+            yield click if position < CLICK_FRAMES else silence
+            index += 1
+
+    async def _listen(self):
+        loud = False
+        async for chunk in self.remote:
+            samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+            rms = float(np.sqrt(np.mean(samples * samples)))
+            if rms > DETECT_RMS and not loud:
+                now = time.perf_counter()
+                earlier = [t for t in self.sent if t <= now]
+                if earlier:
+                    self.latencies.append((now - earlier[-1]) * 1000)
+            loud = rms > DETECT_RMS
+
+    async def start(self) -> float:
+        started = time.perf_counter()
+        await self.client.start_streaming()
+        elapsed = time.perf_counter() - started
+        self._listener = asyncio.create_task(self._listen())
+        return elapsed
+
+    async def stop(self):
+        await self.client.close()
+        if self._listener:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+
+
+async def run_level(api_base: str, count: int, duration: float, warmup: float) -> Dict[str, Any]:
+    rss_before = rss_bytes()
+    sessions = [ClickSession(api_base) for _ in range(count)]
+    setup_times = await asyncio.gather(*(s.start() for s in sessions))
+    await asyncio.sleep(warmup)
+
+    for s in sessions:
+        s.latencies.clear()
+    counters = [dict(s.client.metrics.counters) for s in sessions]
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    await asyncio.sleep(duration)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    rss_after = rss_bytes()
+
+    sent = sum(s.client.metrics.counters["frames_sent"] - c["frames_sent"] for s, c in zip(sessions, counters))
+    received = sum(s.client.metrics.counters["frames_received"] - c["frames_received"]
+                   for s, c in zip(sessions, counters))
+    latencies = [value for s in sessions for value in s.latencies]
+    await asyncio.gather(*(s.stop() for s in sessions), return_exceptions=True)
+
+    return {
+        "sessions": count,
+        "setup_ms_avg": 1000 * sum(setup_times) / count,
+        "setup_ms_max": 1000 * max(setup_times),
+        "frames_sent_per_s": sent / wall,
+        "frames_received_per_s": received / wall,
+        "latency_ms_p50": percentile(latencies, 50),
+        "latency_ms_p95": percentile(latencies, 95),
+        "latency_ms_p99": percentile(latencies, 99),
+        "clicks_heard": len(latencies),
+        "cpu_pct_per_session": 100 * cpu / wall / count,
+        "rss_mb_per_session": (rss_after - rss_before) / count / 2 ** 20,
+    }
+
+
+def wait_for_port(host: str, port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Fake realtime server did not start on {host}:{port}")
+
+
+async def main(args) -> List[Dict[str, Any]]:
+    api_base = f"http://{args.host}:{args.port}/v1"
+    results = []
+    for count in args.sessions:
+        result = await run_level(api_base, count, args.duration, args.warmup)
+        results.append(result)
+        print(" ".join(f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}"
+                       for key, value in result.items()), flush=True)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", default="1,2,4,8",
+                        type=lambda value: [int(n) for n in value.split(",")],
+                        help="comma separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds before measuring")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    server = multiprocessing.get_context("spawn").Process(
+        target=fake_realtime_server.run, args=(args.host, args.port, fake_realtime_server.ECHO), daemon=True)
+    server.start()
+    try:
+        wait_for_port(args.host, args.port)
+        results = asyncio.run(main(args))
+    finally:
+        server.terminate()
+        server.join()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,166 @@
+"""
+Local stand-in for the OpenAI Realtime WebRTC endpoints.
+
+Implements ``POST /v1/realtime/sessions`` (mints a fake client secret) and
+``POST /v1/realtime?model=...`` (SDP offer in, answer out). Each offer is
+answered by a local aiortc peer that either echoes the caller's audio back
+(``--mode echo``) or plays a generated tone (``--mode tone``), and that
+sends ``session.created`` on the ``oai-events`` data channel.
+
+    python benchmarks/fake_realtime_server.py --port 8765 --mode echo
+"""
+
+import argparse
+import asyncio
+import fractions
+import logging
+import time
+import uuid
+from typing import Optional, Set
+
+import numpy as np
+from aiohttp import web
+from aiortc import MediaStreamTrack, RTCConfiguration, RTCPeerConnection, RTCSessionDescription
+from aiortc.contrib.media import MediaBlackhole
+from av import AudioFrame
+
+logger = logging.getLogger(__name__)
+
+ECHO = "echo"
+TONE = "tone"
+
+SAMPLE_RATE = 48000
+FRAME_SIZE = 960
+
+
+class ToneTrack(MediaStreamTrack):
+    """Paced 440 Hz tone, one 20ms stereo frame per ``recv``."""
+
+    kind = "audio"
+
+    def __init__(self):
+        super().__init__()
+        t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+        tone = (8000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+        self._samples = np.repeat(tone, 2)
+        self._pts = 0
+        self._start: Optional[float] = None
+
+    async def recv(self) -> AudioFrame:
+        if self._start is None:
+            self._start = time.monotonic()
+        wait = self._start + self._pts / SAMPLE_RATE - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        offset = (self._pts % SAMPLE_RATE) * 2
+        frame = AudioFrame(samples=FRAME_SIZE, layout="stereo", format="s16")
+        frame.planes[0].update(self._samples[offset:offset + FRAME_SIZE * 2].tobytes())
+        frame.sample_rate = SAMPLE_RATE
+        frame.pts = self._pts
+        frame.time_base = fractions.Fraction(1, SAMPLE_RATE)
+        self._pts += FRAME_SIZE
+        return frame
+
+
+class FakeRealtimeServer:
+    """aiohttp app serving the realtime session and SDP endpoints on localhost."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, mode: str = ECHO):
+        self.host = host
+        self.port = port
+        self.mode = mode
+        self.peers: Set[RTCPeerConnection] = set()
+        self.sessions_created = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def api_base(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/v1/realtime/sessions", self._create_session)
+        app.router.add_post("/v1/realtime", self._answer_offer)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def close(self):
+        await asyncio.gather(*(pc.close() for pc in list(self.peers)), return_exceptions=True)
+        self.peers.clear()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _create_session(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.sessions_created += 1
+        return web.json_response({
+            "id": f"sess_{uuid.uuid4().hex[:12]}",
+            "model": body.get("model"),
+            "client_secret": {"value": f"ek_{uuid.uuid4().hex}", "expires_at": int(time.time()) + 60},
+        })
+
+    async def _answer_offer(self, request: web.Request) -> web.Response:
+        offer = RTCSessionDescription(sdp=await request.text(), type="offer")
+        pc = RTCPeerConnection(RTCConfiguration(iceServers=[]))
+        self.peers.add(pc)
+        blackhole = MediaBlackhole()
+
+        @pc.on("track")
+        def on_track(track):
+            if self.mode == ECHO:
+                pc.addTrack(track)
+            else:
+                pc.addTrack(ToneTrack())
+                blackhole.addTrack(track)
+
+        @pc.on("datachannel")
+        def on_datachannel(channel):
+            @channel.on("open")
+            def on_open():
+                channel.send('{"type":"session.created","session":{}}')
+
+            if channel.readyState == "open":
+                on_open()
+
+        @pc.on("connectionstatechange")
+        async def on_connectionstatechange():
+            if pc.connectionState in ("failed", "closed"):
+                await blackhole.stop()
+                self.peers.discard(pc)
+                await pc.close()
+
+        await pc.setRemoteDescription(offer)
+        await blackhole.start()
+        await pc.setLocalDescription(await pc.createAnswer())
+        return web.Response(status=201, text=pc.localDescription.sdp, content_type="application/sdp")
+
+
+async def serve_forever(host: str = "127.0.0.1", port: int = 8765, mode: str = ECHO):
+    server = FakeRealtimeServer(host, port, mode)
+    await server.start()
+    logger.info(f"Fake realtime endpoint at {server.api_base} ({mode})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def run(host: str = "127.0.0.1", port: int = 8765, mode: str = ECHO):
+    """Blocking entry point, also used as a subprocess target by the benchmark."""
+    try:
+        asyncio.run(serve_forever(host, port, mode))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mode", choices=(ECHO, TONE), default=ECHO)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    run(args.host, args.port, args.mode)
@@ -54,7 +54,7 @@ async def main():
         logger.error(f"Error during streaming: {str(e)}")
     finally:
         # Clean up
-        await client.stop_streaming()
+        await client.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -13,7 +13,11 @@ setup(
         "aiohttp>=3.8.5",
         "pyaudio>=0.2.13",
         "python-dotenv>=1.0.0",
-        "aiortc>=1.6.0",
+        "aiortc>=1.12.0,<2",
+        "scipy>=1.12.0",
     ],
-    python_requires=">=3.7",
+    extras_require={
+        "fast": ["orjson>=3.9.0"],
+    },
+    python_requires=">=3.10",
 )
@@ -2,20 +2,58 @@
 OpenAI Realtime WebRTC Python Client
 
 A Python library for real-time audio streaming with OpenAI's API using WebRTC protocol.
+
+Public classes are imported on first access, so ``import openai_realtime_webrtc``
+does not load aiortc, PyAV, aiohttp or PortAudio until a component that needs
+them is used. The package does not configure logging; applications call
+``logging.basicConfig`` (or attach handlers) themselves.
 """
 
+import importlib
 import logging
-
-from .client import OpenAIWebRTCClient
-from .audio_handler import AudioHandler
-from .webrtc_manager import WebRTCManager
+from typing import TYPE_CHECKING
 
 __version__ = "0.1.0"
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+# 公开名称 -> 所在子模块，首次访问时才导入
+_EXPORTS = {
+    'OpenAIWebRTCClient': '.client',
+    'AudioHandler': '.audio_handler',
+    'WebRTCManager': '.webrtc_manager',
+    'SessionPool': '.session_pool',
+    'PoolFullError': '.session_pool',
+    'EphemeralTokenCache': '.token_cache',
+    'PeerConnectionPool': '.connection_pool',
+    'SessionSupervisor': '.sharding',
+    'ShardedSession': '.sharding',
+    'DeviceRegistry': '.devices',
+    'ConnectionStats': '.stats',
+}
+
+if TYPE_CHECKING:
+    from .client import OpenAIWebRTCClient
+    from .audio_handler import AudioHandler
+    from .webrtc_manager import WebRTCManager
+    from .session_pool import SessionPool, PoolFullError
+    from .token_cache import EphemeralTokenCache
+    from .connection_pool import PeerConnectionPool
+    from .sharding import SessionSupervisor, ShardedSession
+    from .devices import DeviceRegistry
+    from .stats import ConnectionStats
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
 
-__all__ = ['OpenAIWebRTCClient', 'AudioHandler', 'WebRTCManager']
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
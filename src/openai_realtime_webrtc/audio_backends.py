@@ -0,0 +1,420 @@
+"""
+Audio I/O backends.
+
+AudioHandler and AudioOutput never talk to an audio API directly; they ask a
+backend for a stream that drives a sounddevice-style callback
+``callback(data, frames, time, status)`` once per block. A backend that only
+provides one direction implements AudioInputBackend or AudioOutputBackend;
+AudioBackend covers both. SoundDeviceBackend
+uses PortAudio, while NumpyBackend and FileBackend run the callback from a
+worker thread on a simulated clock so sessions can be driven without any
+sound card.
+"""
+
+import abc
+import asyncio
+import logging
+import threading
+import time
+import wave
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from .devices import INPUT, OUTPUT, DeviceRegistry, default_registry, track_stream
+
+logger = logging.getLogger(__name__)
+
+# How long a replacement stream may take to deliver its first callback
+SWITCH_TIMEOUT = 0.5
+SWITCH_POLL_INTERVAL = 0.005
+
+
+class AudioInputBackend(abc.ABC):
+    """Factory for input streams (what AudioHandler needs).
+
+    Streams returned by a backend expose ``start()``, ``stop()`` and
+    ``close()`` like ``sounddevice`` streams.
+    """
+
+    @abc.abstractmethod
+    def open_input_stream(self, samplerate: int, channels: int, dtype, blocksize: int,
+                          callback: Callable, device=None):
+        ...
+
+
+class AudioOutputBackend(abc.ABC):
+    """Factory for output streams (what AudioOutput needs)."""
+
+    @abc.abstractmethod
+    def open_output_stream(self, samplerate: int, channels: int, dtype, blocksize: int,
+                           callback: Callable, device=None):
+        ...
+
+
+class AudioBackend(AudioInputBackend, AudioOutputBackend):
+    """Factory for input and output streams."""
+
+
+class SoundDeviceBackend(AudioBackend):
+    """PortAudio devices through ``sounddevice``.
+
+    Devices may be given by index or name; names are resolved against the
+    cached ``registry`` instead of letting sounddevice re-enumerate devices.
+    """
+
+    def __init__(self, registry: Optional[DeviceRegistry] = None):
+        self._registry = registry
+
+    @property
+    def registry(self) -> DeviceRegistry:
+        if self._registry is None:
+            self._registry = default_registry()
+        return self._registry
+
+    def open_input_stream(self, samplerate, channels, dtype, blocksize, callback, device=None):
+        import sounddevice as sd
+        if device is not None:
+            device = self.registry.resolve(device, INPUT)
+        return track_stream(sd.InputStream(device=device, channels=channels, samplerate=samplerate,
+                                           dtype=dtype, blocksize=blocksize, callback=callback))
+
+    def open_output_stream(self, samplerate, channels, dtype, blocksize, callback, device=None):
+        import sounddevice as sd
+        if device is not None:
+            device = self.registry.resolve(device, OUTPUT)
+        return track_stream(sd.OutputStream(device=device, samplerate=samplerate, channels=channels,
+                                            dtype=dtype, blocksize=blocksize, callback=callback,
+                                            prime_output_buffers_using_stream_callback=True))
+
+
+class StreamSwitch:
+    """Moves a stream callback to a newly opened stream without a gap.
+
+    Every stream is opened with a callback from :meth:`bind`; only the
+    callbacks of the ``active`` stream reach ``callback``. :meth:`replace`
+    starts the new stream while the old one keeps running, the new stream
+    takes over on its first callback (for output streams that is the
+    priming callback), and only then is the old stream closed. Callbacks of
+    an inactive stream are passed to ``idle`` (e.g. to write silence).
+    """
+
+    def __init__(self, callback: Callable, idle: Optional[Callable] = None):
+        self.callback = callback
+        self.idle = idle
+        self.active = 0
+        self.switches = 0
+        self._pending = 0
+        self._ids = 0
+
+    def bind(self) -> Tuple[int, Callable]:
+        self._ids += 1
+        stream_id = self._ids
+
+        def callback(data, frames, time, status):
+            if stream_id != self.active:
+                if stream_id != self._pending:
+                    if self.idle:
+                        self.idle(data)
+                    return
+                self.active = stream_id
+            self.callback(data, frames, time, status)
+
+        return stream_id, callback
+
+    def open(self, open_stream: Callable[[Callable], Any]) -> Any:
+        """Open the first stream of a session; it is active immediately."""
+        stream_id, callback = self.bind()
+        self.active = stream_id
+        return open_stream(callback)
+
+    async def replace(self, old, open_stream: Callable[[Callable], Any], timeout: float = SWITCH_TIMEOUT) -> Any:
+        """Open, start and hand over to a new stream, then close ``old``.
+
+        If the new stream does not call back within ``timeout`` it is closed
+        and ``old`` stays active.
+        """
+        stream_id, callback = self.bind()
+        self._pending = stream_id
+        try:
+            stream = open_stream(callback)
+            stream.start()
+        except Exception:
+            self._pending = 0
+            raise
+
+        deadline = time.perf_counter() + timeout
+        while self.active != stream_id and time.perf_counter() < deadline:
+            await asyncio.sleep(SWITCH_POLL_INTERVAL)
+        self._pending = 0
+        if self.active != stream_id:
+            stream.stop()
+            stream.close()
+            raise Exception(f"Audio stream did not start within {timeout * 1000:.0f}ms")
+
+        if old is not None:
+            old.stop()
+            old.close()
+        self.switches += 1
+        return stream
+
+
+def run_switch(switch: Awaitable, loop: asyncio.AbstractEventLoop):
+    """Run a device switch coroutine on ``loop`` from synchronous code.
+
+    From any other thread this blocks until the switch is done and raises
+    its error. On the loop's own thread it cannot block, so the switch is
+    scheduled and its task returned; the switch logs its own failures.
+    """
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is not loop:
+        return asyncio.run_coroutine_threadsafe(switch, loop).result()
+    task = loop.create_task(switch)
+    # Retrieved here so an unawaited failure is not reported again as "never retrieved"
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return task
+
+
+class VirtualStream(abc.ABC):
+    """Calls a stream callback from a worker thread on a block clock.
+
+    ``speed`` scales the clock: 1.0 is real time, 10.0 runs ten times faster
+    and 0 runs unpaced (as fast as the callback returns).
+    """
+
+    def __init__(self, samplerate: int, channels: int, dtype, blocksize: int,
+                 callback: Callable, speed: float = 1.0):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.dtype = np.dtype(dtype)
+        self.blocksize = blocksize
+        self.callback = callback
+        self.speed = speed
+        self.blocks = 0
+        self._buffer = np.zeros((blocksize, channels), dtype=self.dtype)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.active:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def close(self):
+        self.stop()
+
+    def _run(self):
+        interval = self.blocksize / self.samplerate / self.speed if self.speed else 0
+        deadline = time.perf_counter()
+        while not self._stop_event.is_set():
+            try:
+                self._process(self._buffer)
+            except Exception as e:
+                logger.error(f"Error in virtual audio stream: {str(e)}")
+                break
+            self.blocks += 1
+            if interval:
+                deadline += interval
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    self._stop_event.wait(delay)
+
+    @abc.abstractmethod
+    def _process(self, buffer: np.ndarray):
+        ...
+
+
+class SourceInputStream(VirtualStream):
+    """Input stream fed from a ``read(frames) -> np.ndarray`` source.
+
+    When the source runs dry the stream delivers silence and sets
+    ``finished``, like a microphone in a quiet room.
+    """
+
+    def __init__(self, read: Callable[[int], np.ndarray], **kwargs):
+        super().__init__(**kwargs)
+        self._read = read
+        self.finished = threading.Event()
+
+    def _process(self, buffer):
+        data = self._read(self.blocksize)
+        n = len(data)
+        if n:
+            buffer[:n] = _as_dtype(data, self.dtype).reshape(n, -1)
+        if n < self.blocksize:
+            buffer[n:] = 0
+            self.finished.set()
+        self.callback(buffer, self.blocksize, None, None)
+
+
+class SinkOutputStream(VirtualStream):
+    """Output stream that hands every rendered block to ``write(block)``."""
+
+    def __init__(self, write: Callable[[np.ndarray], None], on_close: Optional[Callable[[], None]] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._write = write
+        self._on_close = on_close
+
+    def _process(self, buffer):
+        self.callback(buffer, self.blocksize, None, None)
+        self._write(buffer)
+
+    def close(self):
+        super().close()
+        if self._on_close:
+            self._on_close()
+            self._on_close = None
+
+
+class NumpyBackend(AudioBackend):
+    """In-memory backend.
+
+    Input streams play ``input_data`` (shape ``(n, channels)``, int16 or float
+    in [-1, 1]); rendered output blocks are collected in ``output_blocks``.
+    """
+
+    def __init__(self, input_data: Optional[np.ndarray] = None, speed: float = 1.0, loop: bool = False,
+                 record_output: bool = True):
+        self.input_data = input_data
+        self.speed = speed
+        self.loop = loop
+        self.record_output = record_output
+        self.output_blocks: List[np.ndarray] = []
+        self.input_stream: Optional[SourceInputStream] = None
+        self.output_stream: Optional[SinkOutputStream] = None
+
+    def open_input_stream(self, samplerate, channels, dtype, blocksize, callback, device=None):
+        data = self.input_data
+        if data is None:
+            data = np.zeros((0, channels), dtype=dtype)
+        self.input_stream = SourceInputStream(
+            _array_reader(data, self.loop), samplerate=samplerate, channels=channels,
+            dtype=dtype, blocksize=blocksize, callback=callback, speed=self.speed)
+        return self.input_stream
+
+    def open_output_stream(self, samplerate, channels, dtype, blocksize, callback, device=None):
+        self.output_stream = SinkOutputStream(
+            self._collect, samplerate=samplerate, channels=channels, dtype=dtype,
+            blocksize=blocksize, callback=callback, speed=self.speed)
+        return self.output_stream
+
+    def output_data(self) -> np.ndarray:
+        """All rendered output as one ``(n, channels)`` array."""
+        if not self.output_blocks:
+            return np.zeros((0, 1), dtype=np.int16)
+        return np.concatenate(self.output_blocks)
+
+    def _collect(self, block: np.ndarray):
+        if self.record_output:
+            self.output_blocks.append(block.copy())
+
+
+class FileBackend(AudioBackend):
+    """WAV or raw PCM file backend.
+
+    Files ending in ``.wav`` are read and written with the ``wave`` module;
+    anything else is treated as raw little-endian interleaved int16 at the
+    stream's rate and channel count.
+    """
+
+    def __init__(self, input_path: Optional[str] = None, output_path: Optional[str] = None,
+                 speed: float = 1.0, loop: bool = False):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.speed = speed
+        self.loop = loop
+        self.input_stream: Optional[SourceInputStream] = None
+        self.output_stream: Optional[SinkOutputStream] = None
+
+    def open_input_stream(self, samplerate, channels, dtype, blocksize, callback, device=None):
+        data = np.zeros((0, channels), dtype=np.int16)
+        if self.input_path:
+            data = read_pcm_file(self.input_path, samplerate, channels)
+        self.input_stream = SourceInputStream(
+            _array_reader(data, self.loop), samplerate=samplerate, channels=channels,
+            dtype=dtype, blocksize=blocksize, callback=callback, speed=self.speed)
+        return self.input_stream
+
+    def open_output_stream(self, samplerate, channels, dtype, blocksize, callback, device=None):
+        if not self.output_path:
+            write, on_close = (lambda block: None), None
+        elif self.output_path.endswith(".wav"):
+            wav = wave.open(self.output_path, "wb")
+            wav.setnchannels(channels)
+            wav.setsampwidth(2)
+            wav.setframerate(samplerate)
+            write = lambda block: wav.writeframes(_as_dtype(block, np.int16).tobytes())
+            on_close = wav.close
+        else:
+            raw = open(self.output_path, "wb")
+            write = lambda block: raw.write(_as_dtype(block, np.int16).tobytes())
+            on_close = raw.close
+        self.output_stream = SinkOutputStream(
+            write, on_close=on_close, samplerate=samplerate, channels=channels, dtype=dtype,
+            blocksize=blocksize, callback=callback, speed=self.speed)
+        return self.output_stream
+
+
+def read_pcm_file(path: str, samplerate: int, channels: int) -> np.ndarray:
+    """Load a WAV or raw int16 file as an ``(n, channels)`` int16 array."""
+    if path.endswith(".wav"):
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError(f"Only 16-bit WAV files are supported: {path}")
+            if wav.getframerate() != samplerate:
+                raise ValueError(
+                    f"WAV sample rate {wav.getframerate()}Hz does not match stream rate {samplerate}Hz")
+            file_channels = wav.getnchannels()
+            data = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2")
+    else:
+        file_channels = channels
+        data = np.fromfile(path, dtype="<i2")
+
+    data = data[:len(data) - len(data) % file_channels].reshape(-1, file_channels)
+    if file_channels != channels:
+        # 声道不一致时：下混为单声道，再按需复制到各声道
+        data = data.mean(axis=1, keepdims=True).astype(np.int16)
+        data = np.repeat(data, channels, axis=1)
+    return data.astype(np.int16, copy=False)
+
+
+def _array_reader(data: np.ndarray, loop: bool) -> Callable[[int], np.ndarray]:
+    """Return a ``read(frames)`` closure that walks through ``data`` block by block."""
+    position = 0
+
+    def read(frames: int) -> np.ndarray:
+        nonlocal position
+        if loop and len(data) and position >= len(data):
+            position = 0
+        chunk = data[position:position + frames]
+        position += len(chunk)
+        return chunk
+
+    return read
+
+
+def _as_dtype(data: np.ndarray, dtype) -> np.ndarray:
+    """Convert between float [-1, 1] and int16 sample formats."""
+    dtype = np.dtype(dtype)
+    if data.dtype == dtype:
+        return data
+    if dtype == np.int16 and data.dtype.kind == "f":
+        return (np.clip(data, -1.0, 1.0) * 32767).astype(np.int16)
+    if dtype.kind == "f" and data.dtype == np.int16:
+        return data.astype(dtype) / 32768.0
+    return data.astype(dtype)
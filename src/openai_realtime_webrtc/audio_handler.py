@@ -1,85 +1,299 @@
 import asyncio
+from collections import deque
 import numpy as np
-import sounddevice as sd
 from aiortc.mediastreams import MediaStreamTrack, MediaStreamError
 from av import AudioFrame
 import logging
-from typing import Optional
+from time import perf_counter
+from typing import Callable, Deque, List, Optional, Tuple
+from .audio_backends import AudioInputBackend, SoundDeviceBackend, StreamSwitch, SWITCH_TIMEOUT, run_switch
+from .metrics import PipelineMetrics
+from .diagnostics import DiagnosticsChannel
+from .conversion import AudioConverter
+from .recording import SessionRecorder, UPLINK
+from .devices import DeviceSpec
+from .opus import OpusSettings, TunedOpusEncoder, install_encoder
+from .vad import VoiceActivityDetector, SPEECH_START, SPEECH_END
 
 logger = logging.getLogger(__name__)
 
 SAMPLE_RATE = 48000
 CHANNELS = 1
 DTYPE = np.int16
+# Preallocated capture blocks between the device callback and the event loop
+CAPTURE_SLOTS = 16
+# Frames AudioTrack may hold before the overflow policy kicks in (500ms at 20ms frames)
+CAPTURE_QUEUE_SIZE = 25
+
+# Overflow policies for CaptureQueue
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+DROP_BACKLOG = "drop_backlog"
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, DROP_BACKLOG)
+
+# What the VAD gate sends while the user is silent
+VAD_DROP = "drop"
+VAD_COMFORT_NOISE = "comfort_noise"
+VAD_SILENCE_MODES = (VAD_DROP, VAD_COMFORT_NOISE)
+
+
+class CaptureQueue:
+    """Bounded frame queue between capture and AudioTrack.recv.
+
+    When full, ``drop_oldest`` discards the oldest queued frame,
+    ``drop_newest`` discards the incoming frame and ``drop_backlog``
+    discards the whole backlog so only the newest frame remains. Dropped
+    frames are passed to ``on_drop`` and remembered so the track can close
+    the pts gap they leave.
+    """
+
+    def __init__(self, maxsize: int = CAPTURE_QUEUE_SIZE, policy: str = DROP_OLDEST, on_drop: Optional[Callable[[AudioFrame], None]] = None):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self._on_drop = on_drop
+        self._frames: Deque[AudioFrame] = deque()
+        self._dropped: Deque[Tuple[int, int]] = deque()
+        self._waiter: Optional[asyncio.Future] = None
+        self.dropped_frames = 0
+        self.max_depth = 0
+
+    def qsize(self) -> int:
+        return len(self._frames)
+
+    def empty(self) -> bool:
+        return not self._frames
+
+    def put_nowait(self, frame: AudioFrame):
+        if len(self._frames) >= self.maxsize:
+            if self.policy == DROP_NEWEST:
+                self._drop(frame)
+                return
+            if self.policy == DROP_OLDEST:
+                self._drop(self._frames.popleft())
+            else:
+                while self._frames:
+                    self._drop(self._frames.popleft())
+
+        self._frames.append(frame)
+        self.max_depth = max(self.max_depth, len(self._frames))
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def get(self) -> AudioFrame:
+        while not self._frames:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return self._frames.popleft()
+
+    def get_nowait(self) -> AudioFrame:
+        if not self._frames:
+            raise asyncio.QueueEmpty
+        return self._frames.popleft()
+
+    def clear(self):
+        while self._frames:
+            self._drop(self._frames.popleft())
+
+    def dropped_samples_before(self, pts: int) -> int:
+        """Consume the drop records for frames captured before ``pts``; return their total samples."""
+        total = 0
+        while self._dropped and self._dropped[0][0] < pts:
+            total += self._dropped.popleft()[1]
+        return total
+
+    def _drop(self, frame: AudioFrame):
+        self.dropped_frames += 1
+        self._dropped.append((frame.pts, frame.samples))
+        if self._on_drop:
+            self._on_drop(frame)
 
 class AudioTrack(MediaStreamTrack):
     kind = "audio"
 
-    def __init__(self, audio_handler):
+    def __init__(self, audio_handler, max_queue_size: int = CAPTURE_QUEUE_SIZE, overflow_policy: str = DROP_OLDEST):
         super().__init__()
         self._audio_handler = audio_handler
-        self._queue = asyncio.Queue()
+        self._queue = CaptureQueue(max_queue_size, overflow_policy, on_drop=audio_handler.recycle_frame)
         self._task = None
+        self._last_frame = None
+        # Outgoing timeline: frames dropped on overflow are cut out of it
+        self._next_pts = 0
+        self._capture_end = 0
+        self._metrics = audio_handler.metrics
+        if self._metrics is not None:
+            self._metrics.add_gauge("capture_queue_depth", lambda: self.queue_depth)
+            self._metrics.add_gauge("capture_dropped_frames", lambda: self.dropped_frames)
+
+    @property
+    def dropped_frames(self) -> int:
+        return self._queue.dropped_frames
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def max_queue_depth(self) -> int:
+        return self._queue.max_depth
+
+    @property
+    def max_queue_size(self) -> int:
+        """Frames held before the overflow policy applies; raised while reconnecting."""
+        return self._queue.maxsize
+
+    @max_queue_size.setter
+    def max_queue_size(self, value: int):
+        self._queue.maxsize = value
 
     async def recv(self):
         if self._task is None:
             self._task = asyncio.create_task(self._audio_handler.start_recording(self._queue))
 
+        # aiortc has finished encoding the previous frame by the time it asks for the next one
+        if self._last_frame is not None:
+            self._audio_handler.recycle_frame(self._last_frame)
+            self._last_frame = None
+
         try:
             frame = await self._queue.get()
+            self._last_frame = frame
+            if self._metrics is not None:
+                self._metrics.mark_sent(frame.pts)
+            self._resync_pts(frame)
+            if self._audio_handler.recorder is not None:
+                self._audio_handler.recorder.record_frame(UPLINK, frame)
             return frame
         except Exception as e:
             logger.error(f"Error receiving audio frame: {str(e)}")
             raise MediaStreamError("Failed to receive audio frame")
 
+    def _resync_pts(self, frame: AudioFrame):
+        """Restamp ``frame`` so overflow drops leave no hole while real capture gaps are kept."""
+        capture_pts = frame.pts
+        gap = capture_pts - self._capture_end
+        dropped = self._queue.dropped_samples_before(capture_pts)
+        frame.pts = self._next_pts + max(0, gap - dropped)
+        self._capture_end = capture_pts + frame.samples
+        self._next_pts = frame.pts + frame.samples
+
 class AudioHandler:
-    def __init__(self, sample_rate: int = SAMPLE_RATE, channels: int = CHANNELS, frame_duration: int = 20, dtype: np.dtype = DTYPE, input_device_index: Optional[int] = None, output_device_index: Optional[int] = None):
+    def __init__(self, sample_rate: int = SAMPLE_RATE, channels: int = CHANNELS, frame_duration: int = 20, dtype: np.dtype = DTYPE, input_device_index: Optional[int] = None, output_device_index: Optional[int] = None, backend: Optional[AudioInputBackend] = None, capture_queue_size: int = CAPTURE_QUEUE_SIZE, overflow_policy: str = DROP_OLDEST, metrics: Optional[PipelineMetrics] = None, device_sample_rate: Optional[int] = None, device_channels: Optional[int] = None, vad: Optional[VoiceActivityDetector] = None, vad_silence_mode: str = VAD_DROP, encoder_settings: Optional[OpusSettings] = None):
         self.sample_rate = sample_rate
         self.channels = channels
+        # The device runs at its native format; frames are converted to sample_rate/channels
+        self.device_sample_rate = device_sample_rate or sample_rate
+        self.device_channels = device_channels or channels
         self.frame_duration = frame_duration
         self.dtype = dtype
         self.input_device_index = input_device_index
         self.output_device_index = output_device_index
+        self.backend = backend or SoundDeviceBackend()
+        self.capture_queue_size = capture_queue_size
+        self.overflow_policy = overflow_policy
+        self.metrics = metrics
         self.frame_size = int(sample_rate * frame_duration / 1000)
+        self.device_frame_size = int(self.device_sample_rate * frame_duration / 1000)
+        # Optional uplink gate: silence is dropped or replaced by comfort noise
+        if vad_silence_mode not in VAD_SILENCE_MODES:
+            raise ValueError(f"Unknown VAD silence mode: {vad_silence_mode}")
+        self.vad = vad
+        self.vad_silence_mode = vad_silence_mode
+        self.on_speech_start: Optional[Callable[[], None]] = None
+        self.on_speech_end: Optional[Callable[[], None]] = None
+        self._preroll: Deque[AudioFrame] = deque()
+        self._comfort_unit = np.random.default_rng().standard_normal((self.frame_size, channels)).astype(np.float32)
+        self._comfort_noise = np.zeros((self.frame_size, channels), dtype=DTYPE)
+
+        self._converter: Optional[AudioConverter] = None
+        if (self.device_sample_rate, self.device_channels) != (sample_rate, channels):
+            self._converter = AudioConverter(self.device_sample_rate, self.device_channels, sample_rate, channels)
         self.stream = None
+        # Device hot-swap: callbacks only count while their stream is the active one
+        self._switch = StreamSwitch(self._capture_callback)
         self.is_recording = False
         self.is_paused = False
         self._loop = None
         self._pts = 0
 
+        # Capture ring: the device callback fills slots, the event loop turns them into frames
+        self._slots = np.zeros((CAPTURE_SLOTS, self.device_frame_size, self.device_channels), dtype=DTYPE)
+        self._slot_pts = np.zeros(CAPTURE_SLOTS, dtype=np.int64)
+        self._captured = 0
+        self._delivered = 0
+        self._delivery_scheduled = False
+        self._queue: Optional[CaptureQueue] = None
+        self._free_frames: List[AudioFrame] = []
+        # Opus settings for the uplink; None leaves aiortc's default encoder in place
+        self.encoder_settings = encoder_settings
+        if encoder_settings is not None:
+            encoder_settings.validate()
+        self.encoder: Optional[TunedOpusEncoder] = None
+        # Optional SessionRecorder for the frames handed to the sender
+        self.recorder: Optional[SessionRecorder] = None
+        self.capture_overruns = 0
+        # Callback-side warnings go through here instead of logging on the audio thread
+        self.diagnostics = DiagnosticsChannel(logger)
+        if metrics is not None:
+            metrics.add_gauge("capture_overruns", lambda: self.capture_overruns)
+            metrics.add_gauge("input_device_switches", lambda: self._switch.switches)
+
+    @property
+    def capture_backlog(self) -> int:
+        """Captured frames not yet taken by the sender."""
+        queued = self._queue.qsize() if self._queue is not None else 0
+        return queued + self._captured - self._delivered
+
     def create_audio_track(self) -> AudioTrack:
-        return AudioTrack(self)
+        return AudioTrack(self, self.capture_queue_size, self.overflow_policy)
+
+    def install_encoder(self, sender) -> Optional[TunedOpusEncoder]:
+        """Give a new connection's sender an encoder built from ``encoder_settings``."""
+        self.encoder = None
+        if self.encoder_settings is None:
+            return None
+        encoder = TunedOpusEncoder(self.encoder_settings)
+        if install_encoder(sender, encoder):
+            self.encoder = encoder
+        return self.encoder
+
+    def set_encoder_settings(self, **changes):
+        """Change Opus settings (``bitrate=24000, fec=True``, ...); a running encoder is retuned."""
+        settings = (self.encoder_settings or OpusSettings())._replace(**changes)
+        settings.validate()
+        if self.encoder is not None:
+            # Frame duration and channels are fixed per encoder; they apply from the next connection
+            running = self.encoder.settings
+            self.encoder.reconfigure(settings._replace(frame_duration_ms=running.frame_duration_ms, channels=running.channels))
+        self.encoder_settings = settings
 
-    async def start_recording(self, queue: asyncio.Queue):
+    async def start_recording(self, queue: CaptureQueue):
         if self.is_recording:
             return
 
         self.is_recording = True
         self.is_paused = False
         self._loop = asyncio.get_running_loop()
+        self._queue = queue
         self._pts = 0
+        self._captured = 0
+        self._delivered = 0
+        self._delivery_scheduled = False
+        if self._converter:
+            self._converter.reset()
+        if self.vad:
+            self.vad.reset()
+        while self._preroll:
+            self.recycle_frame(self._preroll.popleft())
 
         try:
-            def callback(indata, frames, time, status):
-                if status:
-                    logger.warning(f"Audio input status: {status}")
-                if not self.is_paused:
-                    audio_data = indata.copy()
-                    if audio_data.dtype != self.dtype:
-                        if self.dtype == np.int16:
-                            audio_data = (audio_data * 32767).astype(self.dtype)
-                        else:
-                            audio_data = audio_data.astype(self.dtype)
-
-                    frame = AudioFrame(samples=len(audio_data), layout='mono', format='s16')
-                    frame.rate = self.sample_rate
-                    frame.pts = self._pts
-                    self._pts += len(audio_data)
-                    frame.planes[0].update(audio_data.tobytes())
-                    asyncio.run_coroutine_threadsafe(queue.put(frame), self._loop)
-
-            self.stream = sd.InputStream(device=self.input_device_index, channels=self.channels, samplerate=self.sample_rate, dtype=self.dtype, blocksize=self.frame_size, callback=callback)
+            self.stream = self._switch.open(self._open_input)
             self.stream.start()
+            self.diagnostics.start()
 
             while self.is_recording:
                 await asyncio.sleep(0.1)
@@ -90,12 +304,110 @@ class AudioHandler:
         finally:
             await self.stop()
 
+    def _open_input(self, callback):
+        return self.backend.open_input_stream(device=self.input_device_index, channels=self.device_channels, samplerate=self.device_sample_rate, dtype=self.dtype, blocksize=self.device_frame_size, callback=callback)
+
+    def _capture_callback(self, indata, frames, time, status):
+        """Device callback: copy the block into a preallocated slot and wake the event loop."""
+        started = perf_counter()
+        if status:
+            self.diagnostics.record(logging.WARNING, "Audio input status", status)
+        if self.is_paused:
+            return
+
+        # pts counts samples at the track rate
+        pts = self._pts
+        self._pts += self.frame_size
+        if self._captured - self._delivered >= CAPTURE_SLOTS:
+            # Event loop is not keeping up; drop the block rather than block the device
+            self.capture_overruns += 1
+            self.diagnostics.record(logging.WARNING, "Capture ring full, dropped input block")
+            return
+
+        index = self._captured % CAPTURE_SLOTS
+        slot = self._slots[index]
+        if indata.dtype == slot.dtype:
+            np.copyto(slot, indata)
+        else:
+            np.multiply(indata, 32767, out=slot, casting="unsafe")
+        self._slot_pts[index] = pts
+        self._captured += 1
+
+        # One wakeup per batch: the loop drains every slot captured before it runs
+        if not self._delivery_scheduled:
+            self._delivery_scheduled = True
+            self._loop.call_soon_threadsafe(self._deliver_frames)
+
+        if self.metrics is not None:
+            self.metrics.mark_captured(pts, started)
+            self.metrics.observe("input_callback_ms", (perf_counter() - started) * 1000)
+
+    def _deliver_frames(self):
+        """Event loop side: wrap captured slots in (recycled) AudioFrames and queue them."""
+        self._delivery_scheduled = False
+        captured = self._captured
+        while self._delivered < captured:
+            index = self._delivered % CAPTURE_SLOTS
+            data = self._slots[index]
+            if self._converter:
+                data = self._converter.process(data)
+            if len(data) == self.frame_size:
+                frame = self._free_frames.pop() if self._free_frames else self._new_frame()
+            else:
+                frame = self._new_frame(len(data))
+            frame.planes[0].update(data)
+            frame.pts = int(self._slot_pts[index])
+            self._delivered += 1
+            if self.vad is None:
+                self._queue.put_nowait(frame)
+            else:
+                self._gate(frame, data)
+
+    def _gate(self, frame: AudioFrame, data: np.ndarray):
+        """Pass speech (plus pre-roll) to the queue; hold back or replace silence."""
+        active, event = self.vad.process(data)
+        if event == SPEECH_START:
+            while self._preroll:
+                self._queue.put_nowait(self._preroll.popleft())
+            if self.on_speech_start:
+                self.on_speech_start()
+        elif event == SPEECH_END and self.on_speech_end:
+            self.on_speech_end()
+
+        if active:
+            self._queue.put_nowait(frame)
+            return
+
+        # Silence is held back for pre-roll first, so an onset can be sent in full
+        self._preroll.append(frame)
+        if len(self._preroll) <= self.vad.preroll_frames:
+            return
+        expired = self._preroll.popleft()
+        if self.vad_silence_mode == VAD_COMFORT_NOISE and expired.samples == self.frame_size:
+            amplitude = 32768.0 * 10 ** (self.vad.noise_floor_db / 20)
+            np.multiply(self._comfort_unit, amplitude, out=self._comfort_noise, casting="unsafe")
+            expired.planes[0].update(self._comfort_noise)
+            self._queue.put_nowait(expired)
+        else:
+            self.recycle_frame(expired)
+
+    def _new_frame(self, samples: Optional[int] = None) -> AudioFrame:
+        frame = AudioFrame(samples=samples or self.frame_size, layout='mono' if self.channels == 1 else 'stereo', format='s16')
+        frame.rate = self.sample_rate
+        return frame
+
+    def recycle_frame(self, frame: AudioFrame):
+        """Return a frame the consumer no longer uses so the next capture can reuse it."""
+        if frame.samples == self.frame_size and len(self._free_frames) < CAPTURE_SLOTS:
+            self._free_frames.append(frame)
+
     async def stop(self):
         self.is_recording = False
         if self.stream:
             self.stream.stop()
             self.stream.close()
             self.stream = None
+        await self.diagnostics.stop()
 
     async def pause(self):
         self.is_paused = True
@@ -103,16 +415,37 @@ class AudioHandler:
     async def resume(self):
         self.is_paused = False
 
-    def set_input_device(self, input_device_index: int):
-        self.input_device_index = input_device_index
-        if self.stream:
-            self.stream.stop()
-            self.stream.close()
-            self.stream = None
+    async def switch_input_device(self, device: DeviceSpec, timeout: float = SWITCH_TIMEOUT):
+        """Capture from another device without stopping the session.
+
+        The new stream is opened at the same rate and channel count and
+        takes over on its first block, so the track's timestamps run on
+        without a gap. If it fails to start the old device keeps capturing.
+        """
+        previous = self.input_device_index
+        self.input_device_index = device
+        if self.stream is None:
+            return
+        started = perf_counter()
+        try:
+            self.stream = await self._switch.replace(self.stream, self._open_input, timeout)
+        except Exception as e:
+            self.input_device_index = previous
+            logger.error(f"Failed to switch input device to {device}: {str(e)}")
+            raise
+        logger.info(f"Switched input device to {device} in {(perf_counter() - started) * 1000:.1f}ms")
+
+    def set_input_device(self, input_device_index: DeviceSpec):
+        """Select the capture device; while recording this runs :meth:`switch_input_device`.
 
-    def set_output_device(self, output_device_index: int):
+        Called from another thread it waits for the switch and raises if it
+        failed; on the event loop it returns the scheduled task.
+        """
+        if self.stream is None or self._loop is None:
+            self.input_device_index = input_device_index
+            return None
+        return run_switch(self.switch_input_device(input_device_index), self._loop)
+
+    def set_output_device(self, output_device_index: DeviceSpec):
+        # Playback runs in AudioOutput; this only records the choice
         self.output_device_index = output_device_index
-        if self.stream:
-            self.stream.stop()
-            self.stream.close()
-            self.stream = None
@@ -1,11 +1,19 @@
-import sounddevice as sd
-import numpy as np
 import asyncio
+import numpy as np
 import logging
-from typing import Optional, Deque, Dict, Tuple
 from collections import deque
-from av import AudioFrame
-from scipy import signal
+from time import perf_counter
+from typing import TYPE_CHECKING, Deque, Optional, Tuple
+from .ring_buffer import AudioRingBuffer
+from .audio_backends import AudioOutputBackend, SoundDeviceBackend, StreamSwitch, SWITCH_TIMEOUT, run_switch
+from .jitter_buffer import JitterBuffer, DEFAULT_PLAYOUT_DELAY_MS
+from .metrics import PipelineMetrics
+from .diagnostics import DiagnosticsChannel
+from .conversion import AudioConverter
+from .devices import DeviceSpec
+
+if TYPE_CHECKING:
+    from av import AudioFrame
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +26,10 @@ DEFAULT_CHANNELS = 2    # 固定为单声道
 DEFAULT_BLOCK_SIZE = int(DEFAULT_SAMPLE_RATE * FRAME_DURATION_MS / 1000)
 
 DEFAULT_DTYPE = np.int16
+# Fade applied to the audio still playing when the buffer is flushed
+FLUSH_FADE_MS = 5
+# flush(hold=True) stops discarding incoming frames after this long (seconds)
+FLUSH_HOLD_TIMEOUT = 3.0
 
 
 class AudioOutput:
@@ -28,7 +40,10 @@ class AudioOutput:
         dtype: str = DEFAULT_DTYPE,
         block_size: int = DEFAULT_BLOCK_SIZE,
         max_queue_size: int = 50,
-        device: Optional[str] = None
+        device: DeviceSpec = None,
+        playout_delay_ms: Optional[int] = DEFAULT_PLAYOUT_DELAY_MS,
+        backend: Optional[AudioOutputBackend] = None,
+        metrics: Optional[PipelineMetrics] = None
     ):
         # 强制使用固定配置
         self.sample_rate = sample_rate
@@ -37,17 +52,56 @@ class AudioOutput:
         self.block_size = block_size
         self.max_queue_size = max_queue_size
         self.device = device
+        self.backend = backend or SoundDeviceBackend()
 
         # Calculate buffer sizes
         self.samples_per_frame = int(
-            DEFAULT_SAMPLE_RATE * FRAME_DURATION_MS / 1000)
+            self.sample_rate * FRAME_DURATION_MS / 1000)
 
-        self.stream: Optional[sd.OutputStream] = None
+        self.stream = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Device hot-swap: both streams read the same ring, the inactive one plays silence
+        self._switch = StreamSwitch(self._audio_callback, idle=lambda outdata: outdata.fill(0))
         self.is_playing = False
-        self._queue = asyncio.Queue()
-        self._buffer: Deque[np.ndarray] = deque(maxlen=max_queue_size)
-        self._task = None
-        self._remaining_data = None
+        # play_frame writes, _audio_callback reads; holds max_queue_size 20ms frames.
+        self._ring = AudioRingBuffer(
+            max_queue_size * self.samples_per_frame, channels, dtype)
+        # Remote frames are converted to the device's rate/channels on arrival
+        self._converter: Optional[AudioConverter] = None
+        # playout_delay_ms=None keeps the plain "write whatever arrives" behaviour
+        self.jitter_buffer: Optional[JitterBuffer] = None
+        if playout_delay_ms is not None:
+            self.jitter_buffer = JitterBuffer(
+                self._ring, self.sample_rate, target_delay_ms=playout_delay_ms)
+
+        self.metrics = metrics
+        # Callback-side warnings/errors go through here instead of logging on the audio thread
+        self.diagnostics = DiagnosticsChannel(logger)
+        # (ring position of a frame's first sample, arrival time) awaiting playout
+        self._in_flight: Deque[Tuple[int, float]] = deque(maxlen=max_queue_size * 2)
+        # (ring start, ring end, media start, media end) of every frame written for playout.
+        # Media positions count received samples only, so jitter-buffer silence,
+        # concealment and time compression do not move media_played_position.
+        self._segments: Deque[Tuple[int, int, int, int]] = deque(maxlen=max_queue_size * 4)
+        self._media_queued = 0
+        self._media_played = 0
+
+        # Barge-in: flush() arms a fade that the callback applies before dropping the ring
+        self._flush_samples = 0
+        self._fade_ramp = np.zeros((0, 1), dtype=np.float32)
+        self._holding = False
+        self._hold_until: Optional[float] = None
+        self.flushes = 0
+        self.flushed_samples = 0
+
+        if metrics is not None:
+            metrics.add_gauge("playout_delay_ms", lambda: self.current_delay_ms)
+            metrics.add_gauge("playout_underruns", lambda: self.underruns)
+            metrics.add_gauge("playout_overruns", lambda: self.overruns)
+            metrics.add_gauge("output_device_switches", lambda: self._switch.switches)
+            if self.jitter_buffer:
+                metrics.add_gauge("playout_jitter_ms", lambda: self.jitter_buffer.jitter_ms)
+                metrics.add_gauge("playout_concealed_blocks", lambda: self.jitter_buffer.concealed_blocks)
 
     async def start(self):
         """Start audio output stream."""
@@ -55,24 +109,59 @@ class AudioOutput:
             return
 
         try:
-            # 强制使用固定配置，但保持设备原生采样率以避免重采样
-            self.stream = sd.OutputStream(
-                device=self.device,
-                samplerate=self.sample_rate,
-                channels=self.channels,  # 强制使用单声道
-                dtype=self.dtype,        # 强制使用16位
-                blocksize=int(self.block_size),
-                callback=self._audio_callback,
-                prime_output_buffers_using_stream_callback=True
-            )
+            self._loop = asyncio.get_running_loop()
+            self.stream = self._switch.open(self._open_output)
             self.stream.start()
             self.is_playing = True
-            self._task = asyncio.create_task(self._process_audio())
+            self.diagnostics.start()
 
         except Exception as e:
             logger.error(f"Failed to start audio output: {str(e)}")
             raise
 
+    def _open_output(self, callback):
+        # 强制使用固定配置，但保持设备原生采样率以避免重采样
+        return self.backend.open_output_stream(
+            device=self.device,
+            samplerate=self.sample_rate,
+            channels=self.channels,  # 强制使用单声道
+            dtype=self.dtype,        # 强制使用16位
+            blocksize=int(self.block_size),
+            callback=callback
+        )
+
+    async def switch_device(self, device: DeviceSpec, timeout: float = SWITCH_TIMEOUT):
+        """Play through another device without stopping playback.
+
+        The new stream reads the same ring buffer, so nothing queued is lost:
+        it takes over on its priming callback and the old device goes silent
+        until it is closed. If the new device fails to start the old one
+        keeps playing.
+        """
+        previous = self.device
+        self.device = device
+        if self.stream is None:
+            return
+        started = perf_counter()
+        try:
+            self.stream = await self._switch.replace(self.stream, self._open_output, timeout)
+        except Exception as e:
+            self.device = previous
+            logger.error(f"Failed to switch output device to {device}: {str(e)}")
+            raise
+        logger.info(f"Switched output device to {device} in {(perf_counter() - started) * 1000:.1f}ms")
+
+    def set_device(self, device: DeviceSpec):
+        """Select the output device; while playing this runs :meth:`switch_device`.
+
+        Called from another thread it waits for the switch and raises if it
+        failed; on the event loop it returns the scheduled task.
+        """
+        if self.stream is None or self._loop is None:
+            self.device = device
+            return None
+        return run_switch(self.switch_device(device), self._loop)
+
     async def stop(self):
         """Stop audio output."""
         if not self.is_playing:
@@ -80,22 +169,21 @@ class AudioOutput:
 
         try:
             self.is_playing = False
-            if self._task:
-                self._task.cancel()
-                self._task = None
 
             if self.stream:
                 self.stream.stop()
                 self.stream.close()
                 self.stream = None
 
+            await self.diagnostics.stop()
+
             # 清空缓冲区
-            self._buffer.clear()
-            while not self._queue.empty():
-                try:
-                    self._queue.get_nowait()
-                except asyncio.QueueEmpty:
-                    break
+            self._ring.clear()
+            self._in_flight.clear()
+            self._segments.clear()
+            self._media_played = self._media_queued
+            if self.jitter_buffer:
+                self.jitter_buffer.reset()
 
             logger.info("Audio output stopped")
         except Exception as e:
@@ -103,70 +191,178 @@ class AudioOutput:
 
     def _audio_callback(self, outdata, frames, time, status):
         """Callback for sounddevice output stream."""
+        started = perf_counter()
         if status:
-            logger.warning(f"Audio output status: {status}")
+            self.diagnostics.record(logging.WARNING, "Audio output status", status)
 
         try:
-            # 从缓冲区获取数据
-            if len(self._buffer) > 0:
-                data = self._buffer.popleft()
-                print(f"=========== data shape: {data.shape}, dtype: {data.dtype}")
-                outdata[:] = data.reshape(outdata.shape)
+            if self._flush_samples:
+                self._fade_out(outdata)
             else:
-                # 如果缓冲区为空，输出静音
-                outdata.fill(0)
+                # 从环形缓冲区读取 frames 个采样，不足部分补静音
+                filled = self._ring.read_into(outdata)
+                if self.jitter_buffer:
+                    self.jitter_buffer.conceal(outdata, filled)
+                self._advance_media()
         except Exception as e:
-            logger.error(f"Error in audio callback: {str(e)}")
+            self.diagnostics.record(logging.ERROR, "Error in audio callback", e)
             outdata.fill(0)
 
-    async def _process_audio(self):
-        """Process audio frames from the queue and maintain the buffer."""
-        try:
-            while self.is_playing:
-                # 如果缓冲区未满，从队列获取新数据
-                if len(self._buffer) < self.max_queue_size:
-                    try:
-                        # 非阻塞方式获取数据，超时0.1秒
-                        data = await asyncio.wait_for(self._queue.get(), 0.1)
-                        self._buffer.append(data)
-                    except asyncio.TimeoutError:
-                        # 超时继续循环
-                        continue
-                    except asyncio.QueueEmpty:
-                        # 队列为空继续循环
-                        continue
-                    except Exception as e:
-                        logger.error(
-                            f"Error getting data from queue: {str(e)}")
-                else:
-                    # 缓冲区已满，等待一小段时间
-                    await asyncio.sleep(0.001)
-
-        except asyncio.CancelledError:
-            logger.info("Audio processing task cancelled")
-        except Exception as e:
-            logger.error(f"Error processing audio: {str(e)}")
+        if self.metrics is not None:
+            read_pos = self._ring.read_position
+            while self._in_flight and self._in_flight[0][0] < read_pos:
+                _, arrived = self._in_flight.popleft()
+                self.metrics.observe("receive_to_playout_ms", (started - arrived) * 1000)
+            self.metrics.observe("output_callback_ms", (perf_counter() - started) * 1000)
 
-    async def play_frame(self, frame: AudioFrame):
-        """Queue an audio frame for playback."""
-        try:
-            # Convert AudioFrame to numpy array
+    def _fade_out(self, outdata):
+        """Play the first few ms of the ring faded to zero and discard the rest (callback side)."""
+        n = min(self._flush_samples, len(outdata), len(self._fade_ramp))
+        self._flush_samples = 0
+        head = outdata[:n]
+        self._ring.read_into(head)
+        np.multiply(head, self._fade_ramp[:n], out=head, casting="unsafe")
+        outdata[n:].fill(0)
+        self._advance_media()
+        self._segments.clear()
+        self.flushed_samples += self._ring.available
+        self._ring.clear()
+        if self.jitter_buffer:
+            self.jitter_buffer.cut()
+
+    def _advance_media(self):
+        """Move media_played_position up to the ring's read position (callback side)."""
+        read_pos = self._ring.read_position
+        segments = self._segments
+        while segments and segments[0][1] <= read_pos:
+            self._media_played = segments.popleft()[3]
+        if segments and segments[0][0] < read_pos:
+            ring_start, ring_end, media_start, media_end = segments[0]
+            self._media_played = media_start + (
+                (read_pos - ring_start) * (media_end - media_start) // (ring_end - ring_start))
+
+    def flush(self, fade_ms: float = FLUSH_FADE_MS, hold: bool = False,
+              hold_timeout: Optional[float] = FLUSH_HOLD_TIMEOUT):
+        """Drop buffered playout audio after a short fade-out, keeping the stream open.
+
+        The flush happens in the next audio callback, so it never races the
+        device. With ``hold``, frames that keep arriving are discarded until
+        :meth:`release` is called or ``hold_timeout`` seconds have passed
+        (``None`` waits for :meth:`release`).
+        """
+        self.flushes += 1
+        if hold:
+            self._holding = True
+            self._hold_until = perf_counter() + hold_timeout if hold_timeout is not None else None
+        if self.stream is None:
+            self._segments.clear()
+            self._ring.clear()
+            return
+        n = max(1, int(self.sample_rate * fade_ms / 1000))
+        if len(self._fade_ramp) != n:
+            self._fade_ramp = np.linspace(1.0, 0.0, n, endpoint=False, dtype=np.float32)[:, None]
+        self._flush_samples = n
 
-            audio_data = frame.to_ndarray()
+    def release(self):
+        """Accept incoming frames again after ``flush(hold=True)``."""
+        if self._holding:
+            self._holding = False
+            self._hold_until = None
+            if self.jitter_buffer:
+                self.jitter_buffer.resync()
+
+    def _frame_samples(self, frame: "AudioFrame") -> np.ndarray:
+        """Return the frame's samples as an ``(n, channels)`` array, without copying when possible."""
+        channels = len(frame.layout.channels)
+        if frame.format.name == "s16" and not frame.format.is_planar:
+            # Packed s16 (what aiortc's Opus decoder produces): view the plane directly.
+            data = np.frombuffer(
+                frame.planes[0], dtype=np.int16, count=frame.samples * channels)
+            return data.reshape(-1, channels)
+
+        data = frame.to_ndarray()
+        if frame.format.is_planar:
+            data = data.T
+        else:
+            data = data.reshape(-1, channels)
+        return data
+
+    async def play_frame(self, frame: "AudioFrame"):
+        """Write an audio frame into the playback ring buffer."""
+        if self._holding:
+            if self._hold_until is None or perf_counter() < self._hold_until:
+                return
+            self.release()
+        try:
+            audio_data = self._frame_samples(frame)
 
             # 确保数据类型正确
             if audio_data.dtype != self.dtype:
                 audio_data = audio_data.astype(self.dtype)
 
-            # 如果队列已满，移除最旧的帧
-            if self._queue.qsize() >= self.max_queue_size:
-                try:
-                    self._queue.get_nowait()
-                except asyncio.QueueEmpty:
-                    pass
+            # 采样率或声道数与输出设备不同时进行转换
+            in_format = (frame.sample_rate or self.sample_rate, audio_data.shape[1])
+            if in_format != (self.sample_rate, self.channels):
+                if self._converter is None or self._converter.in_format != in_format:
+                    self._converter = AudioConverter(*in_format, self.sample_rate, self.channels)
+                audio_data = self._converter.process(audio_data)
 
-            # Queue the audio data
-            await self._queue.put(audio_data)
+            arrived = perf_counter()
+            if self.jitter_buffer:
+                pts = None
+                if frame.pts is not None and frame.time_base is not None:
+                    pts = float(frame.pts * frame.time_base)
+                written = self.jitter_buffer.put(audio_data, pts, arrived)
+                # A compressed frame still carries the whole frame's media
+                media = len(audio_data) if written else 0
+            else:
+                # 缓冲区已满时丢弃超出部分（计入 overruns）
+                written = media = self._ring.write(audio_data)
+
+            if written:
+                end = self._ring.write_position
+                self._segments.append((end - written, end, self._media_queued, self._media_queued + media))
+                self._media_queued += media
+                if self.metrics is not None:
+                    self._in_flight.append((end - written, arrived))
         except Exception as e:
             logger.error(f"Error queueing audio frame: {str(e)}")
             raise
+
+    @property
+    def buffered_frames(self) -> int:
+        """Number of sample frames waiting to be played."""
+        return self._ring.available
+
+    @property
+    def played_position(self) -> int:
+        """Total sample frames handed to the device so far."""
+        return self._ring.read_position
+
+    @property
+    def queued_position(self) -> int:
+        """Total sample frames written for playout so far."""
+        return self._ring.write_position
+
+    @property
+    def media_played_position(self) -> int:
+        """Received sample frames played so far, not counting inserted silence or flushed audio."""
+        return self._media_played
+
+    @property
+    def media_queued_position(self) -> int:
+        """Received sample frames queued for playout so far."""
+        return self._media_queued
+
+    @property
+    def overruns(self) -> int:
+        return self._ring.overruns
+
+    @property
+    def underruns(self) -> int:
+        return self._ring.underruns
+
+    @property
+    def current_delay_ms(self) -> float:
+        """Playout delay currently buffered ahead of the device, in milliseconds."""
+        return self._ring.available * 1000.0 / self.sample_rate
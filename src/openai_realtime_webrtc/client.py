@@ -1,30 +1,55 @@
 import asyncio
 import logging
+import time
 from typing import Optional, Callable
-import sounddevice as sd
 from aiortc import RTCPeerConnection, RTCSessionDescription, MediaStreamTrack
-from .audio_handler import AudioHandler, SAMPLE_RATE, CHANNELS
-from .audio_output import FRAME_DURATION_MS
+from .audio_handler import AudioHandler, AudioTrack, SAMPLE_RATE, CHANNELS, VAD_DROP
+from .audio_output import FRAME_DURATION_MS, DEFAULT_SAMPLE_RATE, FLUSH_FADE_MS
 from .webrtc_manager import WebRTCManager
+from .jitter_buffer import DEFAULT_PLAYOUT_DELAY_MS
+from .audio_backends import AudioBackend
+from .token_cache import EphemeralTokenCache
+from .connection_pool import PeerConnectionPool
+from .metrics import PipelineMetrics
+from .vad import VoiceActivityDetector
+from .events import EventChannel, EventHandler, Event, EVENTS_CHANNEL_LABEL, DEFAULT_SEND_QUEUE_SIZE
+from .transcripts import TranscriptAssembler, TranscriptChunk
+from .pcm_stream import PCMSource, PCMSourceBackend, PCMOutputStream
+from .recording import SessionRecorder
+from .opus import (OpusSettings, BitrateController, ADAPT_INTERVAL, FRAME_DURATIONS_MS, encoder_supported,
+                   install_encoder, negotiated_codec)
+from .stats import ConnectionStats, DEFAULT_STATS_WINDOW
+from .devices import AudioDevice, DeviceRegistry, DeviceSpec, INPUT, OUTPUT, default_registry
 from typing import Optional, Deque, Dict, Tuple
 
 logger = logging.getLogger(__name__)
 SYSTEM_MESSAGE = "You are a friendly assistant.",
+# Supervised mode: how long captured audio is kept while the connection is rebuilt
+RECONNECT_BUFFER_MS = 2000
+RECONNECT_ATTEMPTS = 3
+# Per attempt: SDP exchange plus ICE/DTLS until the connection is up
+RECONNECT_TIMEOUT = 5.0
+RECONNECT_BACKOFF = 0.1
+
+def get_default_audio_info(registry: Optional[DeviceRegistry] = None) -> Tuple[AudioDevice, AudioDevice]:
+    """Default input and output devices from the cached registry (no PortAudio query after the first call)."""
+    registry = registry or default_registry()
 
-def get_default_audio_info() -> Tuple[Dict, Dict]:
     try:
-        input_device = sd.query_devices(kind='input')
-        output_device = sd.query_devices(kind='output')
+        input_device = registry.default_device(INPUT)
+        output_device = registry.default_device(OUTPUT)
 
-        logger.info("Default Input Device:")
-        logger.info(f"  Name: {input_device['name']}")
-        logger.info(f"  Channels: {input_device['max_input_channels']}")
-        logger.info(f"  Sample Rate: {input_device['default_samplerate']}Hz")
+        if input_device:
+            logger.info("Default Input Device:")
+            logger.info(f"  Name: {input_device.name}")
+            logger.info(f"  Channels: {input_device.max_input_channels}")
+            logger.info(f"  Sample Rate: {input_device.default_samplerate}Hz")
 
-        logger.info("Default Output Device:")
-        logger.info(f"  Name: {output_device['name']}")
-        logger.info(f"  Channels: {output_device['max_output_channels']}")
-        logger.info(f"  Sample Rate: {output_device['default_samplerate']}Hz")
+        if output_device:
+            logger.info("Default Output Device:")
+            logger.info(f"  Name: {output_device.name}")
+            logger.info(f"  Channels: {output_device.max_output_channels}")
+            logger.info(f"  Sample Rate: {output_device.default_samplerate}Hz")
 
         return input_device, output_device
     except Exception as e:
@@ -32,7 +57,6 @@ def get_default_audio_info() -> Tuple[Dict, Dict]:
         raise
 
 
-
 class OpenAIWebRTCClient:
     def __init__(
         self,
@@ -42,6 +66,33 @@ class OpenAIWebRTCClient:
         channels: int = CHANNELS,
         frame_duration: int = FRAME_DURATION_MS,
         system_message: str = SYSTEM_MESSAGE,
+        playout_delay_ms: Optional[int] = DEFAULT_PLAYOUT_DELAY_MS,
+        audio_backend: Optional[AudioBackend] = None,
+        webrtc_manager: Optional[WebRTCManager] = None,
+        token_cache: Optional[EphemeralTokenCache] = None,
+        connection_pool: Optional[PeerConnectionPool] = None,
+        enable_metrics: bool = True,
+        device_sample_rate: Optional[int] = None,
+        vad: Optional[VoiceActivityDetector] = None,
+        vad_silence_mode: str = VAD_DROP,
+        max_send_queue: int = DEFAULT_SEND_QUEUE_SIZE,
+        barge_in: bool = True,
+        audio_source: Optional[PCMSource] = None,
+        source_realtime: bool = True,
+        remote_audio: Optional[PCMOutputStream] = None,
+        api_base: Optional[str] = None,
+        recorder: Optional[SessionRecorder] = None,
+        input_device: DeviceSpec = None,
+        output_device: DeviceSpec = None,
+        auto_reconnect: bool = False,
+        reconnect_attempts: int = RECONNECT_ATTEMPTS,
+        reconnect_buffer_ms: int = RECONNECT_BUFFER_MS,
+        reconnect_timeout: float = RECONNECT_TIMEOUT,
+        liveness_timeout: Optional[float] = None,
+        encoder_settings: Optional[OpusSettings] = None,
+        adaptive_bitrate: bool = False,
+        stats_interval: Optional[float] = None,
+        stats_window: int = DEFAULT_STATS_WINDOW,
     ):
         self.api_key = api_key
         self.model = model
@@ -50,16 +101,109 @@ class OpenAIWebRTCClient:
         self.frame_duration = frame_duration
         self.system_message = system_message
 
+        # Pipeline instrumentation shared by capture, send, receive and playout
+        self.metrics: Optional[PipelineMetrics] = None
+        if enable_metrics:
+            self.metrics = PipelineMetrics(frame_size=int(sample_rate * frame_duration / 1000))
+
+        # Raw PCM uplink: bytes or an async iterator instead of a capture device
+        input_backend = audio_backend
+        if audio_source is not None:
+            input_backend = PCMSourceBackend(audio_source, realtime=source_realtime)
+
         self.audio_handler = AudioHandler(
             sample_rate=sample_rate,
             channels=channels,
-            frame_duration=frame_duration
+            frame_duration=frame_duration,
+            backend=input_backend,
+            input_device_index=input_device,
+            metrics=self.metrics,
+            device_sample_rate=device_sample_rate,
+            vad=vad,
+            vad_silence_mode=vad_silence_mode,
+            encoder_settings=encoder_settings
         )
-        self.webrtc_manager = WebRTCManager()
+        # Adaptation needs our encoder; default to voice settings at the capture frame duration
+        self.adaptive_bitrate = adaptive_bitrate
+        if adaptive_bitrate and encoder_settings is None:
+            duration = frame_duration if frame_duration in FRAME_DURATIONS_MS else OpusSettings().frame_duration_ms
+            self.audio_handler.encoder_settings = OpusSettings(frame_duration_ms=duration)
+        self._bitrate_controller: Optional[BitrateController] = None
+        self.audio_handler.on_speech_start = self._handle_speech_start
+        self.audio_handler.on_speech_end = self._handle_speech_end
+        if isinstance(input_backend, PCMSourceBackend):
+            input_backend.backlog = lambda: self.audio_handler.capture_backlog
+        self.webrtc_manager = webrtc_manager or WebRTCManager(
+            playout_delay_ms=playout_delay_ms,
+            audio_backend=audio_backend,
+            output_sample_rate=device_sample_rate or DEFAULT_SAMPLE_RATE,
+            remote_audio=remote_audio,
+            api_base=api_base,
+            output_device=output_device)
+        if self.webrtc_manager.metrics is None:
+            self.webrtc_manager.metrics = self.metrics
+        if remote_audio is not None:
+            self.webrtc_manager.remote_audio = remote_audio
+        # Bitrate adaptation consumes the connection stats, so it turns them on
+        if stats_interval is None and adaptive_bitrate:
+            stats_interval = ADAPT_INTERVAL
+        if stats_interval is not None:
+            self.webrtc_manager.enable_stats(stats_interval, stats_window)
+        # Both audio directions and every server event go to the recorder
+        self.recorder = recorder
+        self.audio_handler.recorder = recorder
+        self.webrtc_manager.recorder = recorder
+        self.token_cache = token_cache
+        self.connection_pool = connection_pool
 
         self.peer_connection: Optional[RTCPeerConnection] = None
         self.is_streaming = False
         self.on_transcription: Optional[Callable[[str], None]] = None
+        self.on_speech_start: Optional[Callable[[], None]] = None
+        self.on_speech_end: Optional[Callable[[], None]] = None
+        self.on_partial_transcript: Optional[Callable[[TranscriptChunk], None]] = None
+        self.on_final_transcript: Optional[Callable[[TranscriptChunk], None]] = None
+
+        # Realtime server events over the oai-events data channel
+        self.events = EventChannel(max_send_queue=max_send_queue)
+        self.transcripts = TranscriptAssembler()
+        self.transcripts.attach(self.events.dispatcher)
+        self.transcripts.on_partial = self._handle_partial_transcript
+        self.transcripts.on_final = self._handle_final_transcript
+
+        # Supervised mode: a failed or dropped connection is rebuilt with a fresh offer
+        self.auto_reconnect = auto_reconnect
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_buffer_ms = reconnect_buffer_ms
+        self.reconnect_timeout = reconnect_timeout
+        self.liveness_timeout = liveness_timeout
+        self.reconnecting = False
+        self.reconnects = 0
+        self.last_reconnect_ms: Optional[float] = None
+        self.on_reconnecting: Optional[Callable[[], None]] = None
+        self.on_reconnected: Optional[Callable[[float], None]] = None
+        # Merged session.update payloads, replayed after a reconnect
+        self.session_config: Dict = {}
+        self._audio_track: Optional[AudioTrack] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._liveness_task: Optional[asyncio.Task] = None
+        if auto_reconnect:
+            self.webrtc_manager.on_state_change = self._on_connection_state
+        if self.metrics is not None:
+            self.metrics.add_histogram("reconnect_ms")
+
+        # Barge-in: local speech (VAD) or interrupt() cuts off the assistant's audio
+        self.barge_in = barge_in
+        self._response_id: Optional[str] = None
+        self._playing_item: Optional[str] = None
+        self._item_start = 0
+        dispatcher = self.events.dispatcher
+        dispatcher.on("response.created", self._on_response_created)
+        dispatcher.on("response.done", self._on_response_done)
+        dispatcher.on("response.output_item.added", self._on_output_item_added)
+        dispatcher.on("input_audio_buffer.speech_started", self._on_server_speech_started)
+        if recorder is not None:
+            dispatcher.on("*", recorder.record_event)
 
     async def start_streaming(self):
         """Start the audio streaming session."""
@@ -67,24 +211,65 @@ class OpenAIWebRTCClient:
             logger.warning("Streaming is already active")
             return
 
+        # The encoder hooks rely on aiortc internals; checked (and warned about) once
+        if self.audio_handler.encoder_settings is not None and not encoder_supported():
+            self.audio_handler.encoder_settings = None
+
+        try:
+            self._audio_track = self.audio_handler.create_audio_track()
+            await self._connect(self._audio_track)
+
+            self.is_streaming = True
+            if self.auto_reconnect and self.liveness_timeout:
+                self._liveness_task = asyncio.ensure_future(self._watch_liveness())
+            logger.info("Streaming started successfully")
+
+        except Exception as e:
+            logger.error(f"Failed to start streaming: {str(e)}")
+            # is_streaming is still False, so stop_streaming() would return early
+            try:
+                await self._teardown()
+            except Exception as cleanup_error:
+                logger.error(f"Error cleaning up after failed start: {str(cleanup_error)}")
+            raise
+
+    async def _connect(self, audio_track: AudioTrack):
+        """Build a peer connection for ``audio_track``, exchange SDP and bind the events channel."""
+        # Mint (or take a cached) ephemeral token while the offer and ICE candidates are gathered
+        token_task = asyncio.ensure_future(self._get_ephemeral_token())
         try:
-            # Initialize WebRTC connection
-            self.peer_connection = await self.webrtc_manager.create_connection()
+            if self.connection_pool:
+                # Pre-built connection: offer and ICE candidates are already gathered
+                pc, channel = await self.connection_pool.acquire()
+                self.peer_connection = await self.webrtc_manager.create_connection(pc)
+                transceiver = self.peer_connection.getTransceivers()[0]
+                transceiver.sender.replaceTrack(audio_track)
+            else:
+                # Initialize WebRTC connection
+                self.peer_connection = await self.webrtc_manager.create_connection()
 
-            # Add audio track
-            audio_track = self.audio_handler.create_audio_track()
-            self.peer_connection.addTransceiver(audio_track, "sendrecv")
+                # Add audio track
+                transceiver = self.peer_connection.addTransceiver(audio_track, "sendrecv")
 
-            # Create and set local description
-            offer = await self.peer_connection.createOffer()
-            await self.peer_connection.setLocalDescription(offer)
+                # Events channel must be created before the offer to be negotiated
+                channel = self.peer_connection.createDataChannel(EVENTS_CHANNEL_LABEL)
+
+                # Create and set local description
+                offer = await self.peer_connection.createOffer()
+                await self.peer_connection.setLocalDescription(offer)
+            # Our encoder has to be in place before the sender pulls its first frame
+            self._stop_bitrate_controller()
+            encoder = self.audio_handler.install_encoder(transceiver.sender)
+            self.events.attach(channel)
+            ephemeral_token = await token_task
 
             # Connect to OpenAI's WebRTC endpoint
             response = await self.webrtc_manager.connect_to_openai(
                 self.api_key,
                 self.model,
-                offer,
-                self.system_message # pass system message prompt
+                self.peer_connection.localDescription,
+                self.system_message, # pass system message prompt
+                ephemeral_token=ephemeral_token
             )
 
             # Set remote description
@@ -94,13 +279,136 @@ class OpenAIWebRTCClient:
             )
             await self.peer_connection.setRemoteDescription(answer)
 
-            self.is_streaming = True
-            logger.info("Streaming started successfully")
+            if encoder is not None and negotiated_codec(transceiver) not in (None, "audio/opus"):
+                logger.warning(f"Negotiated {negotiated_codec(transceiver)}, not Opus; encoder settings ignored")
+                install_encoder(transceiver.sender, None)
+                self.audio_handler.encoder = encoder = None
+            if encoder is not None and self.adaptive_bitrate:
+                self._bitrate_controller = BitrateController(encoder, metrics=self.metrics)
+                self.connection_stats.add_listener(self._bitrate_controller.on_sample)
+        except BaseException:
+            token_task.cancel()
+            raise
 
+    async def reconnect(self) -> bool:
+        """Move the session to a new peer connection; returns False if every attempt failed.
+
+        aiortc cannot restart ICE on an existing connection, so this is always
+        a full re-offer on the same audio track. Audio captured meanwhile
+        waits in the track's queue (up to ``reconnect_buffer_ms``) and is sent
+        once the new connection is up, queued client events are sent on the
+        new data channel, and the accumulated ``session.update`` is replayed.
+        Concurrent calls share one attempt. If all attempts fail, streaming
+        stops.
+        """
+        if not self.is_streaming:
+            return False
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.ensure_future(self._reconnect())
+        return await asyncio.shield(self._reconnect_task)
+
+    async def _reconnect(self) -> bool:
+        started = time.perf_counter()
+        self.reconnecting = True
+        if self.on_reconnecting:
+            self.on_reconnecting()
+
+        track = self._audio_track
+        queue_size = track.max_queue_size
+        # 重连期间扩大采集队列，缓存的音频在新连接建立后补发
+        track.max_queue_size = max(queue_size, self.reconnect_buffer_ms // self.frame_duration)
+        self.events.detach()
+        self._response_id = None
+        self._playing_item = None
+
+        try:
+            for attempt in range(1, self.reconnect_attempts + 1):
+                try:
+                    await self.webrtc_manager.close_connection()
+                    await asyncio.wait_for(self._connect(track), self.reconnect_timeout)
+                    await self.webrtc_manager.wait_connected(self.reconnect_timeout)
+                    break
+                except Exception as e:
+                    logger.warning(
+                        f"Reconnect attempt {attempt}/{self.reconnect_attempts} failed: {str(e) or type(e).__name__}")
+                    if attempt == self.reconnect_attempts:
+                        raise
+                    await asyncio.sleep(RECONNECT_BACKOFF * 2 ** (attempt - 1))
         except Exception as e:
-            logger.error(f"Failed to start streaming: {str(e)}")
+            logger.error(f"Failed to reconnect: {str(e) or type(e).__name__}")
+            if self.metrics is not None:
+                self.metrics.increment("reconnect_failures")
+            self.reconnecting = False
             await self.stop_streaming()
-            raise
+            return False
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.reconnecting = False
+        self.reconnects += 1
+        self.last_reconnect_ms = elapsed_ms
+        if self.metrics is not None:
+            self.metrics.increment("reconnects")
+            self.metrics.observe("reconnect_ms", elapsed_ms)
+        logger.info(f"Reconnected in {elapsed_ms:.0f}ms")
+
+        # The new server session starts from defaults
+        if self.session_config:
+            await self.send_event({"type": "session.update", "session": dict(self.session_config)})
+        if self.on_reconnected:
+            self.on_reconnected(elapsed_ms)
+
+        # Let the sender drain the backlog before the normal bound applies again
+        deadline = time.perf_counter() + 1.0
+        while track.queue_depth > queue_size and time.perf_counter() < deadline:
+            await asyncio.sleep(self.frame_duration / 1000)
+        track.max_queue_size = queue_size
+        return True
+
+    def _stop_bitrate_controller(self):
+        if self._bitrate_controller:
+            if self.connection_stats:
+                self.connection_stats.remove_listener(self._bitrate_controller.on_sample)
+            self._bitrate_controller = None
+
+    @property
+    def connection_stats(self) -> Optional[ConnectionStats]:
+        """Connection quality poller, if ``stats_interval`` or ``adaptive_bitrate`` is set."""
+        return self.webrtc_manager.stats
+
+    def set_encoder_settings(self, **changes):
+        """Change uplink Opus settings (bitrate, complexity, fec, packet_loss, dtx, ...).
+
+        Frame duration and channels apply from the next connection on; the
+        other settings retune the running encoder. With ``adaptive_bitrate``
+        a new ``bitrate`` becomes the ceiling the adaptation probes up to,
+        and ``fec``/``packet_loss`` the floor it never goes below.
+        """
+        self.audio_handler.set_encoder_settings(**changes)
+        if self._bitrate_controller:
+            self._bitrate_controller.configure(self.audio_handler.encoder_settings)
+
+    def _on_connection_state(self, state: str):
+        if state in ("failed", "closed") and self.is_streaming and not self.reconnecting:
+            logger.warning(f"Connection {state}, reconnecting")
+            asyncio.ensure_future(self.reconnect())
+
+    async def _watch_liveness(self):
+        """Reconnect when no remote audio arrived for ``liveness_timeout`` seconds."""
+        interval = min(0.25, self.liveness_timeout / 4)
+        while self.is_streaming:
+            await asyncio.sleep(interval)
+            last = self.webrtc_manager.last_received
+            if self.reconnecting or last is None:
+                continue
+            if time.monotonic() - last > self.liveness_timeout:
+                logger.warning(f"No remote audio for {self.liveness_timeout}s, reconnecting")
+                await self.reconnect()
+
+    async def _get_ephemeral_token(self) -> str:
+        if self.token_cache:
+            return await self.token_cache.get(self.model, self.system_message)
+        return await self.webrtc_manager.get_ephemeral_token(
+            self.api_key, self.model, self.system_message)
 
     async def stop_streaming(self):
         """Stop the audio streaming session."""
@@ -108,8 +416,7 @@ class OpenAIWebRTCClient:
             return
 
         try:
-            await self.webrtc_manager.cleanup()
-            await self.audio_handler.stop()
+            await self._teardown()
             self.is_streaming = False
             logger.info("Streaming stopped successfully")
 
@@ -117,6 +424,24 @@ class OpenAIWebRTCClient:
             logger.error(f"Error while stopping streaming: {str(e)}")
             raise
 
+    async def _teardown(self):
+        """Release the connection, playout, capture and background tasks."""
+        current = asyncio.current_task()
+        for task in (self._liveness_task, self._reconnect_task):
+            if task and task is not current and not task.done():
+                task.cancel()
+        self._liveness_task = None
+        self._stop_bitrate_controller()
+        await self.events.close()
+        self.transcripts.clear()
+        await self.webrtc_manager.cleanup()
+        await self.audio_handler.stop()
+
+    async def close(self):
+        """Stop streaming and release the HTTP session kept alive between calls."""
+        await self.stop_streaming()
+        await self.webrtc_manager.close()
+
     async def pause_streaming(self):
         """Pause the audio streaming."""
         if not self.is_streaming:
@@ -129,13 +454,133 @@ class OpenAIWebRTCClient:
             return
         await self.audio_handler.resume()
 
-    def set_audio_input_device(self, input_device_index: int):
-        self.audio_handler.set_input_device(input_device_index)
+    def on(self, event_type: str, handler: Optional[EventHandler] = None):
+        """Register a handler for a realtime server event type (``"*"`` for all)."""
+        return self.events.dispatcher.on(event_type, handler)
+
+    async def send_event(self, event: Event):
+        """Queue a client event for the data channel."""
+        if event.get("type") == "session.update":
+            self.session_config.update(event.get("session", {}))
+        await self.events.send(event)
+
+    async def update_session(self, **session):
+        """Send a ``session.update`` event."""
+        await self.send_event({"type": "session.update", "session": session})
+
+    async def create_response(self, **response):
+        """Send a ``response.create`` event."""
+        event: Event = {"type": "response.create"}
+        if response:
+            event["response"] = response
+        await self.send_event(event)
+
+    async def interrupt(self, fade_ms: float = FLUSH_FADE_MS):
+        """Cut the assistant off: flush local playout and tell the server where audio stopped.
 
-    def set_audio_output_device(self, output_device_index: int):
-        self.audio_handler.set_output_device(output_device_index)
+        Buffered audio fades out within ``fade_ms``; frames still arriving
+        for the interrupted response are discarded until the next
+        ``response.created`` or ``response.done``, or for at most
+        ``FLUSH_HOLD_TIMEOUT`` seconds. The server gets
+        ``response.cancel``, ``output_audio_buffer.clear`` and a
+        ``conversation.item.truncate`` at the last sample actually played.
+        """
+        output = self.webrtc_manager.audio_output
+        audio_end_ms = 0
+        if output:
+            output.flush(fade_ms, hold=True)
+            played = max(0, output.media_played_position - self._item_start)
+            audio_end_ms = int(played * 1000 / output.sample_rate)
+
+        if not self.is_streaming:
+            return
+        if self._response_id:
+            await self.send_event({"type": "response.cancel"})
+        await self.send_event({"type": "output_audio_buffer.clear"})
+        if self._playing_item:
+            await self.send_event({
+                "type": "conversation.item.truncate",
+                "item_id": self._playing_item,
+                "content_index": 0,
+                "audio_end_ms": audio_end_ms,
+            })
+            self._playing_item = None
+
+    def set_audio_input_device(self, input_device_index: DeviceSpec):
+        """Capture from another device (index or name); see :meth:`AudioHandler.set_input_device`."""
+        return self.audio_handler.set_input_device(input_device_index)
+
+    def set_audio_output_device(self, output_device_index: DeviceSpec):
+        """Play through another device (index or name); see :meth:`AudioOutput.set_device`."""
+        self.webrtc_manager.output_device = output_device_index
+        output = self.webrtc_manager.audio_output
+        if output is not None:
+            return output.set_device(output_device_index)
+        return None
+
+    async def switch_input_device(self, device: DeviceSpec):
+        """Capture from another device while streaming; raises if it fails to start."""
+        await self.audio_handler.switch_input_device(device)
+
+    async def switch_output_device(self, device: DeviceSpec):
+        """Play through another device while streaming; raises if it fails to start."""
+        self.webrtc_manager.output_device = device
+        output = self.webrtc_manager.audio_output
+        if output is not None:
+            await output.switch_device(device)
 
     def _handle_transcription(self, text: str):
         """Handle incoming transcription."""
         if self.on_transcription:
             self.on_transcription(text)
+
+    def _handle_partial_transcript(self, chunk: TranscriptChunk):
+        """Handle a transcript delta."""
+        if self.on_partial_transcript:
+            self.on_partial_transcript(chunk)
+
+    def _handle_final_transcript(self, chunk: TranscriptChunk):
+        """Handle a finished transcript of user speech or model output."""
+        if self.on_final_transcript:
+            self.on_final_transcript(chunk)
+        self._handle_transcription(chunk.text)
+
+    def _on_response_created(self, event: Event):
+        self._response_id = event.get("response", {}).get("id")
+        output = self.webrtc_manager.audio_output
+        if output:
+            output.release()
+
+    def _on_response_done(self, event: Event):
+        # Also sent for cancelled responses (status "cancelled"): stop holding playout
+        self._response_id = None
+        output = self.webrtc_manager.audio_output
+        if output:
+            output.release()
+
+    def _on_output_item_added(self, event: Event):
+        item = event.get("item", {})
+        if item.get("type") == "message":
+            self._playing_item = item.get("id")
+            output = self.webrtc_manager.audio_output
+            # The item's audio starts after whatever is already queued
+            self._item_start = output.media_queued_position if output else 0
+
+    def _on_server_speech_started(self, event: Event):
+        # Server VAD already truncates on its side; drop what is buffered locally
+        output = self.webrtc_manager.audio_output
+        if self.barge_in and output:
+            output.flush()
+
+    def _handle_speech_start(self):
+        """Handle local speech onset reported by the VAD gate."""
+        output = self.webrtc_manager.audio_output
+        if self.barge_in and (self._response_id or (output and output.buffered_frames)):
+            asyncio.ensure_future(self.interrupt())
+        if self.on_speech_start:
+            self.on_speech_start()
+
+    def _handle_speech_end(self):
+        """Handle the end of local speech reported by the VAD gate."""
+        if self.on_speech_end:
+            self.on_speech_end()
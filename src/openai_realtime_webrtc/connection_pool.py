@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from aiortc import RTCConfiguration, RTCDataChannel, RTCIceServer, RTCPeerConnection
+
+from .events import EVENTS_CHANNEL_LABEL
+from .webrtc_manager import DEFAULT_STUN_URL
+
+logger = logging.getLogger(__name__)
+
+
+class PeerConnectionPool:
+    """Keeps pre-built peer connections with their offers already gathered.
+
+    Each pooled connection has a track-less sendrecv audio transceiver, the
+    ``oai-events`` data channel and a local description with gathered ICE
+    candidates, so a session only has to attach its track and exchange SDP.
+    A background task keeps ``size`` connections ready and closes
+    connections older than ``max_idle_age`` seconds, whose candidates and
+    NAT bindings may have gone stale.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        max_idle_age: float = 30.0,
+        ice_servers: Optional[List[RTCIceServer]] = None,
+    ):
+        self.size = size
+        self.max_idle_age = max_idle_age
+        if ice_servers is None:
+            ice_servers = [RTCIceServer(urls=[DEFAULT_STUN_URL])]
+        self.ice_servers = ice_servers
+        self._idle: Deque[Tuple[float, RTCPeerConnection, RTCDataChannel]] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    @property
+    def ready(self) -> int:
+        """Number of idle connections ready to be acquired."""
+        return len(self._idle)
+
+    async def start(self):
+        """Start the background refill task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._maintain())
+
+    async def close(self):
+        """Stop refilling and close all idle connections."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._idle:
+            _, pc, _ = self._idle.popleft()
+            await pc.close()
+
+    async def acquire(self) -> Tuple[RTCPeerConnection, RTCDataChannel]:
+        """Take a ready connection and its events channel, building one on demand if the pool is empty."""
+        await self._evict_stale()
+        self._wakeup.set()
+        if self._idle:
+            self.hits += 1
+            _, pc, channel = self._idle.pop()
+            return pc, channel
+        self.misses += 1
+        return await self._build()
+
+    async def _build(self) -> Tuple[RTCPeerConnection, RTCDataChannel]:
+        pc = RTCPeerConnection(RTCConfiguration(iceServers=self.ice_servers))
+        pc.addTransceiver("audio", direction="sendrecv")
+        # The data channel has to exist before the offer so it is negotiated
+        channel = pc.createDataChannel(EVENTS_CHANNEL_LABEL)
+        offer = await pc.createOffer()
+        # setLocalDescription gathers ICE candidates
+        await pc.setLocalDescription(offer)
+        return pc, channel
+
+    async def _evict_stale(self):
+        deadline = time.monotonic() - self.max_idle_age
+        while self._idle and self._idle[0][0] < deadline:
+            _, pc, _ = self._idle.popleft()
+            self.expired += 1
+            await pc.close()
+
+    async def _maintain(self):
+        while True:
+            await self._evict_stale()
+            while len(self._idle) < self.size:
+                try:
+                    pc, channel = await self._build()
+                except Exception as e:
+                    logger.error(f"Failed to pre-build peer connection: {str(e)}")
+                    break
+                self._idle.append((time.monotonic(), pc, channel))
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.max_idle_age / 2)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,126 @@
+from functools import lru_cache
+from math import gcd
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Filter length per polyphase branch (scaled up when decimating)
+TAPS_PER_PHASE = 16
+INT16_MIN, INT16_MAX = -32768, 32767
+
+
+@lru_cache(maxsize=32)
+def polyphase_filter(up: int, down: int, taps_per_phase: int = TAPS_PER_PHASE) -> np.ndarray:
+    """Low-pass filter for ``up/down`` resampling, split into ``up`` branches.
+
+    Row ``p`` holds branch ``p`` in reverse order, ready to be dotted with the
+    most recent input samples. Branches get longer when decimating so the
+    anti-aliasing filter keeps its transition width. Designed once per ratio.
+    """
+    from scipy import signal
+
+    taps_per_phase *= max(1, -(-down // up))
+    taps = signal.firwin(up * taps_per_phase, 1.0 / max(up, down), window=("kaiser", 6.0)) * up
+    branches = taps.reshape(taps_per_phase, up).T
+    return np.ascontiguousarray(branches[:, ::-1], dtype=np.float32)
+
+
+def mix_channels(data: np.ndarray, channels: int) -> np.ndarray:
+    """Up/down-mix ``(n, c)`` samples to ``channels``.
+
+    Mono is broadcast without copying; other layouts are averaged to mono first.
+    """
+    current = data.shape[1]
+    if current == channels:
+        return data
+    if current != 1:
+        mono = data.sum(axis=1, dtype=np.int32, keepdims=True)
+        mono //= current
+        data = mono.astype(data.dtype)
+        if channels == 1:
+            return data
+    return np.broadcast_to(data, (len(data), channels))
+
+
+class Resampler:
+    """Streaming rational-ratio polyphase resampler for ``(n, channels)`` int16 blocks.
+
+    Filter history and the output phase carry over between calls, so
+    consecutive blocks resample as one continuous signal.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, channels: int):
+        divisor = gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.channels = channels
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        self._filter = polyphase_filter(self.up, self.down)
+        self._taps = self._filter.shape[1]
+        self._history = np.zeros((self._taps - 1, channels), dtype=np.float32)
+        self._phase = 0  # position of the next output, in upsampled units from the block start
+
+    def process(self, data: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Resample one block; writes into ``out`` when it has the right length."""
+        n = len(data)
+        count = max(0, -(-(n * self.up - self._phase) // self.down))
+        positions = self._phase + np.arange(count) * self.down
+        branches = positions % self.up
+        starts = positions // self.up
+
+        extended = np.concatenate((self._history, data.astype(np.float32)))
+        windows = np.lib.stride_tricks.sliding_window_view(extended, self._taps, axis=0)[starts]
+        result = np.einsum("kcl,kl->kc", windows, self._filter[branches])
+
+        self._history = extended[len(extended) - (self._taps - 1):]
+        self._phase += count * self.down - n * self.up
+
+        np.clip(result, INT16_MIN, INT16_MAX, out=result)
+        if out is not None and len(out) == count:
+            out[:] = result
+            return out
+        return result.astype(np.int16)
+
+    def reset(self):
+        self._history[:] = 0
+        self._phase = 0
+
+
+class AudioConverter:
+    """Sample-rate and channel conversion between two stream formats.
+
+    Channels are reduced before resampling and expanded after it so the
+    filter always runs on the fewer channels.
+    """
+
+    def __init__(self, in_rate: int, in_channels: int, out_rate: int, out_channels: int):
+        self.in_format: Tuple[int, int] = (in_rate, in_channels)
+        self.out_format: Tuple[int, int] = (out_rate, out_channels)
+        self._resampler: Optional[Resampler] = None
+        if in_rate != out_rate:
+            self._resampler = Resampler(in_rate, out_rate, min(in_channels, out_channels))
+
+    @property
+    def passthrough(self) -> bool:
+        return self.in_format == self.out_format
+
+    def process(self, data: np.ndarray) -> np.ndarray:
+        """Convert one ``(n, channels)`` block.
+
+        The result is C-contiguous and writable (up-mixed blocks are copied
+        out of their broadcast view), so it can be written into frames.
+        """
+        out_channels = self.out_format[1]
+        if self._resampler is not None:
+            if data.shape[1] > out_channels:
+                data = mix_channels(data, out_channels)
+            data = self._resampler.process(mix_channels(data, self._resampler.channels))
+        data = mix_channels(data, out_channels)
+        if not data.flags.c_contiguous or not data.flags.writeable:
+            data = np.array(data)
+        return data
+
+    def reset(self):
+        if self._resampler:
+            self._resampler.reset()
@@ -0,0 +1,251 @@
+"""
+Cached audio device registry.
+
+PortAudio enumerates devices once, when it is initialized, and every
+``query_devices`` call walks that list again. DeviceRegistry keeps a snapshot
+of it (plus the default input/output) and only re-enumerates on
+:meth:`DeviceRegistry.refresh`. Seeing a device plugged in after startup
+needs ``refresh(rescan=True)``, which re-initializes PortAudio and with it
+closes every open PortAudio stream; the hot-plug watcher therefore only
+rescans while no stream is open and otherwise sets ``pending_rescan``.
+Hot-plug detection reads ``/proc/asound`` and ``/dev/snd`` and so only works
+on Linux; elsewhere the application has to call ``refresh(rescan=True)``.
+"""
+
+import logging
+import os
+import sys
+import threading
+import weakref
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+INPUT = "input"
+OUTPUT = "output"
+DEFAULT_WATCH_INTERVAL = 2.0
+
+DeviceSpec = Union[int, str, None]
+
+
+class AudioDevice(NamedTuple):
+    index: int
+    name: str
+    hostapi: int
+    max_input_channels: int
+    max_output_channels: int
+    default_samplerate: float
+
+    def supports(self, kind: str) -> bool:
+        channels = self.max_input_channels if kind == INPUT else self.max_output_channels
+        return channels > 0
+
+
+# sounddevice streams opened through SoundDeviceBackend; a rescan would close them
+_open_streams: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def track_stream(stream):
+    """Register a PortAudio stream so the watcher knows not to rescan under it."""
+    _open_streams.add(stream)
+    return stream
+
+
+def open_stream_count() -> int:
+    return sum(1 for stream in list(_open_streams) if not getattr(stream, "closed", False))
+
+
+_rescan_unsupported_logged = False
+
+
+def _reinitialize_portaudio(sd) -> bool:
+    """Terminate and re-initialize PortAudio so it enumerates devices again.
+
+    sounddevice has no public API for this; its private ``_terminate`` and
+    ``_initialize`` (present from 0.3 through at least 0.5.x) are the
+    documented workaround. Without them the cached device list is re-read
+    as is and hot-plugged devices stay invisible until restart.
+    """
+    terminate = getattr(sd, "_terminate", None)
+    initialize = getattr(sd, "_initialize", None)
+    if terminate is None or initialize is None:
+        global _rescan_unsupported_logged
+        if not _rescan_unsupported_logged:
+            _rescan_unsupported_logged = True
+            logger.warning("This sounddevice version cannot re-scan devices; "
+                           "hot-plugged devices need a restart")
+        return False
+    terminate()
+    initialize()
+    return True
+
+
+def _query_sounddevice(rescan: bool) -> Tuple[List[Dict], int, int]:
+    import sounddevice as sd
+
+    if rescan:
+        _reinitialize_portaudio(sd)
+    devices = list(sd.query_devices())
+    defaults = []
+    for kind in (INPUT, OUTPUT):
+        try:
+            defaults.append(sd.query_devices(kind=kind)["index"])
+        except sd.PortAudioError:
+            defaults.append(-1)
+    return devices, defaults[0], defaults[1]
+
+
+def _hotplug_fingerprint() -> Optional[str]:
+    """Cheap OS-level view of attached sound hardware (Linux only)."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        with open("/proc/asound/cards") as f:
+            cards = f.read()
+        return cards + ",".join(sorted(os.listdir("/dev/snd")))
+    except OSError:
+        return None
+
+
+class DeviceRegistry:
+    """Snapshot of the available audio devices.
+
+    ``query(rescan)`` returns ``(devices, default_input_index,
+    default_output_index)`` where ``devices`` are ``query_devices()``-style
+    dicts; it defaults to sounddevice. ``on_change`` is called with the new
+    device list after a refresh that changed it. ``fingerprint`` is the
+    hot-plug probe used by :meth:`watch`; the default one only works on
+    Linux and returns None (nothing ever changes) elsewhere.
+    """
+
+    def __init__(self, query: Optional[Callable[[bool], Tuple[List[Dict], int, int]]] = None,
+                 fingerprint: Optional[Callable[[], Optional[str]]] = None):
+        self._query = query or _query_sounddevice
+        self._fingerprint = fingerprint or _hotplug_fingerprint
+        self._devices: Optional[List[AudioDevice]] = None
+        self._default_input = -1
+        self._default_output = -1
+        self._lock = threading.Lock()
+        self.on_change: Optional[Callable[[List[AudioDevice]], None]] = None
+        self.pending_rescan = False
+        self.refreshes = 0
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+
+    @property
+    def devices(self) -> List[AudioDevice]:
+        if self._devices is None:
+            self.refresh()
+        return self._devices
+
+    def input_devices(self) -> List[AudioDevice]:
+        return [device for device in self.devices if device.supports(INPUT)]
+
+    def output_devices(self) -> List[AudioDevice]:
+        return [device for device in self.devices if device.supports(OUTPUT)]
+
+    def default_device(self, kind: str) -> Optional[AudioDevice]:
+        devices = self.devices
+        index = self._default_input if kind == INPUT else self._default_output
+        return devices[index] if 0 <= index < len(devices) else None
+
+    def find(self, device: DeviceSpec, kind: str) -> Optional[AudioDevice]:
+        """Resolve an index, an exact name or a name substring to a device of ``kind``.
+
+        ``None`` means the default device.
+        """
+        if device is None:
+            return self.default_device(kind)
+        devices = self.devices
+        if isinstance(device, int):
+            if 0 <= device < len(devices) and devices[device].supports(kind):
+                return devices[device]
+            return None
+        candidates = [d for d in devices if d.supports(kind)]
+        for d in candidates:
+            if d.name == device:
+                return d
+        lowered = device.lower()
+        for d in candidates:
+            if lowered in d.name.lower():
+                return d
+        return None
+
+    def resolve(self, device: DeviceSpec, kind: str) -> DeviceSpec:
+        """Device index for ``device``, or ``device`` unchanged if it is not known."""
+        found = self.find(device, kind)
+        return found.index if found is not None else device
+
+    def refresh(self, rescan: bool = False) -> bool:
+        """Re-enumerate devices; ``rescan`` re-initializes PortAudio to pick up hot-plugged ones.
+
+        Returns True if the device list or the defaults changed.
+        """
+        with self._lock:
+            raw, default_input, default_output = self._query(rescan)
+            devices = [AudioDevice(
+                index=i,
+                name=info["name"],
+                hostapi=info.get("hostapi", 0),
+                max_input_channels=info.get("max_input_channels", 0),
+                max_output_channels=info.get("max_output_channels", 0),
+                default_samplerate=info.get("default_samplerate", 0.0),
+            ) for i, info in enumerate(raw)]
+            changed = (devices, default_input, default_output) != (
+                self._devices, self._default_input, self._default_output)
+            first = self._devices is None
+            self._devices = devices
+            self._default_input = default_input
+            self._default_output = default_output
+            self.refreshes += 1
+            if rescan:
+                self.pending_rescan = False
+
+        if changed and not first and self.on_change:
+            try:
+                self.on_change(devices)
+            except Exception as e:
+                logger.error(f"Error in device change callback: {str(e)}")
+        return changed
+
+    def watch(self, interval: float = DEFAULT_WATCH_INTERVAL):
+        """Poll for hot-plug events on a background thread (Linux only with the default probe)."""
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="DeviceRegistry", daemon=True)
+        self._watcher.start()
+
+    def unwatch(self):
+        self._stop_watching.set()
+        if self._watcher and self._watcher is not threading.current_thread():
+            self._watcher.join()
+        self._watcher = None
+
+    def _watch(self, interval: float):
+        last = self._fingerprint()
+        while not self._stop_watching.wait(interval):
+            try:
+                current = self._fingerprint()
+                if current != last:
+                    last = current
+                    if open_stream_count():
+                        # 有流在用时不能重新初始化 PortAudio，等流关闭或调用方自行 refresh(rescan=True)
+                        self.pending_rescan = True
+                        continue
+                elif not self.pending_rescan or open_stream_count():
+                    continue
+                self.refresh(rescan=True)
+            except Exception as e:
+                logger.error(f"Error watching audio devices: {str(e)}")
+
+
+_default_registry: Optional[DeviceRegistry] = None
+
+
+def default_registry() -> DeviceRegistry:
+    """Process-wide registry used by SoundDeviceBackend."""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = DeviceRegistry()
+    return _default_registry
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+
+class DiagnosticsChannel:
+    """Real-time-safe logging for audio callbacks.
+
+    Callbacks call :meth:`record`, which only stores references in
+    preallocated slots (single producer, single consumer, no locks, no I/O).
+    A background task drains the slots every ``interval`` seconds, formats
+    the messages and logs at most ``burst`` events per message per interval,
+    summarising the rest. Events recorded while the slots are full are
+    counted in ``lost``.
+    """
+
+    def __init__(self, logger: logging.Logger, capacity: int = 256, interval: float = 1.0, burst: int = 5):
+        self.logger = logger
+        self.capacity = capacity
+        self.interval = interval
+        self.burst = burst
+        self._levels: List[int] = [0] * capacity
+        self._messages: List[Optional[str]] = [None] * capacity
+        self._details: List[Any] = [None] * capacity
+        self._write = 0
+        self._read = 0
+        self.lost = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, level: int, message: str, detail: Any = None):
+        """Store an event. Safe to call from the audio callback thread."""
+        if self._write - self._read >= self.capacity:
+            self.lost += 1
+            return
+        index = self._write % self.capacity
+        self._levels[index] = level
+        self._messages[index] = message
+        self._details[index] = detail
+        self._write += 1
+
+    def start(self):
+        """Start draining to the logger from the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._drain_loop())
+
+    async def stop(self):
+        """Stop the drain task and log whatever is still buffered."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.flush()
+
+    def flush(self):
+        """Log buffered events, rate limited per message."""
+        counts: Dict[str, int] = {}
+        write = self._write
+        while self._read < write:
+            index = self._read % self.capacity
+            level, message, detail = self._levels[index], self._messages[index], self._details[index]
+            self._details[index] = None
+            self._read += 1
+
+            seen = counts.get(message, 0)
+            counts[message] = seen + 1
+            if seen < self.burst:
+                self.logger.log(level, f"{message}: {detail}" if detail is not None else message)
+
+        for message, count in counts.items():
+            if count > self.burst:
+                self.logger.warning(f"{message}: {count - self.burst} similar events suppressed")
+        if self.lost:
+            self.logger.warning(f"{self.lost} audio diagnostics events lost (buffer full)")
+            self.lost = 0
+
+    async def _drain_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.flush()
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Union
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the standard library
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL_LABEL = "oai-events"
+DEFAULT_SEND_QUEUE_SIZE = 64
+# Handlers registered under this type receive every event
+ANY_EVENT = "*"
+
+Event = Dict[str, Any]
+EventHandler = Callable[[Event], Union[None, Awaitable[None]]]
+
+
+def loads(data: Union[str, bytes]) -> Event:
+    """Decode one event, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(event: Event) -> str:
+    """Encode one event as compact JSON text."""
+    if orjson is not None:
+        return orjson.dumps(event).decode()
+    return json.dumps(event, separators=(",", ":"))
+
+
+class EventDispatcher:
+    """Routes realtime server events to handlers by their ``type``.
+
+    Handlers live in a dict keyed by event type, so dispatch is one lookup
+    no matter how many types are registered. Plain functions run inline, in
+    arrival order; coroutine handlers are scheduled as tasks so a slow
+    handler never holds up the data channel.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[EventHandler]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def on(self, event_type: str, handler: Optional[EventHandler] = None):
+        """Register ``handler`` for ``event_type``; usable as a decorator."""
+        if handler is None:
+            def decorator(func: EventHandler) -> EventHandler:
+                self.on(event_type, func)
+                return func
+            return decorator
+        self._handlers.setdefault(event_type, []).append(handler)
+        return handler
+
+    def off(self, event_type: str, handler: EventHandler):
+        handlers = self._handlers.get(event_type)
+        if handlers and handler in handlers:
+            handlers.remove(handler)
+            if not handlers:
+                del self._handlers[event_type]
+
+    def dispatch(self, event: Event) -> int:
+        """Call the handlers for ``event``; returns how many were called."""
+        handlers = self._handlers.get(event.get("type"), ())
+        wildcard = self._handlers.get(ANY_EVENT, ())
+        for handler in (*handlers, *wildcard):
+            try:
+                result = handler(event)
+                if asyncio.iscoroutine(result):
+                    task = asyncio.ensure_future(result)
+                    self._tasks.add(task)
+                    task.add_done_callback(self._task_done)
+            except Exception as e:
+                logger.error(f"Event handler for {event.get('type')} failed: {str(e)}")
+        return len(handlers) + len(wildcard)
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Event handler failed: {str(task.exception())}")
+
+    async def cancel_pending(self):
+        """Cancel handler tasks that are still running."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class EventChannel:
+    """Realtime events over the ``oai-events`` data channel.
+
+    Incoming messages are decoded and handed to an :class:`EventDispatcher`.
+    Outgoing events go through a bounded queue drained by one sender task,
+    which waits for the channel to open; ``send`` waits while the queue is
+    full and ``send_nowait`` raises ``asyncio.QueueFull``.
+    """
+
+    def __init__(self, dispatcher: Optional[EventDispatcher] = None, max_send_queue: int = DEFAULT_SEND_QUEUE_SIZE):
+        self.dispatcher = dispatcher or EventDispatcher()
+        self.channel = None
+        self._outbound: asyncio.Queue = asyncio.Queue(maxsize=max_send_queue)
+        self._opened = asyncio.Event()
+        self._sender: Optional[asyncio.Task] = None
+        self.received = 0
+        self.sent = 0
+        self.decode_errors = 0
+
+    @property
+    def pending(self) -> int:
+        """Outbound events waiting to be sent."""
+        return self._outbound.qsize()
+
+    def attach(self, channel):
+        """Bind to an aiortc RTCDataChannel and start the sender task."""
+        self.channel = channel
+        self._opened.clear()
+        if channel.readyState == "open":
+            self._opened.set()
+
+        @channel.on("open")
+        def on_open():
+            logger.info(f"Data channel {channel.label} opened")
+            self._opened.set()
+
+        @channel.on("message")
+        def on_message(message):
+            self._on_message(message)
+
+        if self._sender is None:
+            self._sender = asyncio.create_task(self._send_loop())
+
+    def detach(self):
+        """Forget the current channel; queued events wait for the next :meth:`attach`."""
+        self.channel = None
+        self._opened.clear()
+
+    async def close(self):
+        """Stop sending and drop queued events. Handlers stay registered."""
+        if self._sender:
+            self._sender.cancel()
+            try:
+                await self._sender
+            except asyncio.CancelledError:
+                pass
+            self._sender = None
+        while not self._outbound.empty():
+            self._outbound.get_nowait()
+        await self.dispatcher.cancel_pending()
+        self.channel = None
+
+    async def send(self, event: Event):
+        await self._outbound.put(event)
+
+    def send_nowait(self, event: Event):
+        self._outbound.put_nowait(event)
+
+    def _on_message(self, message: Union[str, bytes]):
+        try:
+            event = loads(message)
+        except ValueError as e:
+            self.decode_errors += 1
+            logger.warning(f"Dropping undecodable realtime event: {str(e)}")
+            return
+        self.received += 1
+        self.dispatcher.dispatch(event)
+
+    async def _send_loop(self):
+        while True:
+            event = await self._outbound.get()
+            await self._opened.wait()
+            channel = self.channel
+            if channel is None or channel.readyState != "open":
+                logger.warning(f"Data channel closed, dropping {event.get('type')} event")
+                continue
+            try:
+                channel.send(dumps(event))
+                self.sent += 1
+            except Exception as e:
+                logger.error(f"Failed to send {event.get('type')} event: {str(e)}")
@@ -0,0 +1,179 @@
+import time
+from typing import Optional
+
+import numpy as np
+
+from .ring_buffer import AudioRingBuffer
+
+DEFAULT_PLAYOUT_DELAY_MS = 60
+MIN_PLAYOUT_DELAY_MS = 20
+MAX_PLAYOUT_DELAY_MS = 300
+# int16 RMS below which a frame is treated as silence and may be dropped
+SILENCE_RMS = 300
+# Fraction of a frame removed when time-compressing speech
+STRETCH_RATIO = 0.25
+# Concealment blocks played (with decay) before falling back to silence
+MAX_CONCEAL_BLOCKS = 3
+
+
+class JitterBuffer:
+    """Playout-delay controller in front of an :class:`AudioRingBuffer`.
+
+    Frames are admitted by presentation time: late and duplicate frames are
+    dropped and gaps are filled with concealment. Interarrival jitter is
+    tracked with the RFC 3550 estimator and the target delay follows it
+    between ``min_delay_ms`` and ``max_delay_ms``. When the ring holds more
+    than the target, silent frames are dropped and speech frames are
+    time-compressed until the backlog is back in range. On the consumer side
+    :meth:`conceal` replaces underruns with a decaying repeat of the last block.
+    """
+
+    def __init__(
+        self,
+        ring: AudioRingBuffer,
+        sample_rate: int,
+        target_delay_ms: int = DEFAULT_PLAYOUT_DELAY_MS,
+        min_delay_ms: int = MIN_PLAYOUT_DELAY_MS,
+        max_delay_ms: int = MAX_PLAYOUT_DELAY_MS,
+        silence_rms: float = SILENCE_RMS,
+        stretch_ratio: float = STRETCH_RATIO,
+    ):
+        self.ring = ring
+        self.sample_rate = sample_rate
+        self.target_delay_ms = target_delay_ms
+        self.min_delay_ms = min_delay_ms
+        self.max_delay_ms = min(max_delay_ms, ring.capacity * 1000 // sample_rate)
+        self.silence_rms = silence_rms
+        self.stretch_ratio = stretch_ratio
+
+        self.jitter = 0.0  # seconds
+        self._last_arrival: Optional[float] = None
+        self._last_pts: Optional[float] = None
+        self._expected_pts: Optional[float] = None
+
+        max_samples = self.max_delay_ms * sample_rate // 1000
+        self._silence = np.zeros((max_samples, ring.channels), dtype=ring.dtype)
+        self._last_block: Optional[np.ndarray] = None
+        self._sign: Optional[np.ndarray] = None
+        self._conceal_blocks = 0
+
+        self.late_frames = 0
+        self.dropped_silence = 0
+        self.stretched_frames = 0
+        self.concealed_blocks = 0
+
+    @property
+    def current_delay_ms(self) -> float:
+        """Audio currently buffered ahead of the device, in milliseconds."""
+        return self.ring.available * 1000.0 / self.sample_rate
+
+    @property
+    def jitter_ms(self) -> float:
+        return self.jitter * 1000.0
+
+    @property
+    def effective_target_ms(self) -> float:
+        """Target playout delay after adapting to the measured jitter."""
+        target = max(self.target_delay_ms, 3 * self.jitter_ms)
+        return min(max(target, self.min_delay_ms), self.max_delay_ms)
+
+    def put(self, samples: np.ndarray, pts: Optional[float] = None, arrival_time: Optional[float] = None) -> int:
+        """Admit ``samples`` presented at ``pts`` seconds. Returns sample frames written."""
+        if arrival_time is None:
+            arrival_time = time.perf_counter()
+        duration = len(samples) / self.sample_rate
+
+        if pts is not None:
+            if self._expected_pts is not None and pts < self._expected_pts - duration / 2:
+                self.late_frames += 1
+                return 0
+            self._update_jitter(pts, arrival_time)
+            if self._expected_pts is not None and pts > self._expected_pts + duration / 2:
+                self._fill_gap(pts - self._expected_pts)
+            self._expected_pts = pts + duration
+
+        target = self.effective_target_ms * self.sample_rate // 1000
+        buffered = self.ring.available
+
+        if buffered == 0:
+            # Underrun (or first frame): rebuild the playout cushion.
+            self.ring.write(self._silence[:max(0, int(target) - len(samples))])
+        elif buffered > target + len(samples) // 2:
+            if self._is_silent(samples):
+                self.dropped_silence += 1
+                return 0
+            samples = self._compress(samples)
+            self.stretched_frames += 1
+
+        return self.ring.write(samples)
+
+    def conceal(self, out: np.ndarray, filled: int):
+        """Fill ``out[filled:]`` after a short read. Runs on the audio callback thread."""
+        if filled == len(out):
+            self._conceal_blocks = 0
+            if self._last_block is None or self._last_block.shape != out.shape:
+                self._last_block = np.empty_like(out)
+                self._sign = np.empty_like(out)
+            np.copyto(self._last_block, out)
+            return
+
+        if (self._last_block is None or self._conceal_blocks >= MAX_CONCEAL_BLOCKS
+                or self._last_block.shape != out.shape):
+            return
+
+        # Repeat the tail of the previous block, halving its level each block.
+        # Round toward zero (add 1 to negative samples before the shift) so the
+        # tail decays to silence instead of a -1 DC offset.
+        self._conceal_blocks += 1
+        self.concealed_blocks += 1
+        block = self._last_block
+        np.right_shift(block, block.dtype.itemsize * 8 - 1, out=self._sign)
+        np.subtract(block, self._sign, out=block)
+        block >>= 1
+        out[filled:] = self._last_block[filled:]
+
+    def cut(self):
+        """Stop concealing after playout was flushed. Runs on the audio callback thread."""
+        self._conceal_blocks = MAX_CONCEAL_BLOCKS
+
+    def resync(self):
+        """Forget the pts timeline so the next frame is neither late nor after a gap."""
+        self._last_arrival = None
+        self._last_pts = None
+        self._expected_pts = None
+
+    def reset(self):
+        self.jitter = 0.0
+        self.resync()
+        self._conceal_blocks = 0
+
+    def _update_jitter(self, pts: float, arrival_time: float):
+        if self._last_arrival is not None:
+            transit_delta = (arrival_time - self._last_arrival) - (pts - self._last_pts)
+            self.jitter += (abs(transit_delta) - self.jitter) / 16
+        self._last_arrival = arrival_time
+        self._last_pts = pts
+
+    def _fill_gap(self, gap: float):
+        missing = min(int(gap * self.sample_rate), len(self._silence))
+        if missing:
+            self.concealed_blocks += 1
+            self.ring.write(self._silence[:missing])
+
+    def _is_silent(self, samples: np.ndarray) -> bool:
+        flat = samples.ravel().astype(np.float32)
+        energy = np.dot(flat, flat)
+        return energy < self.silence_rms * self.silence_rms * samples.size
+
+    def _compress(self, samples: np.ndarray) -> np.ndarray:
+        """Shorten a frame by ``stretch_ratio`` with an overlap-add crossfade (pitch is kept)."""
+        n = len(samples)
+        cut = int(n * self.stretch_ratio)
+        if cut == 0 or 2 * cut > n:
+            return samples
+        start = (n - 2 * cut) // 2
+        fade = np.linspace(1.0, 0.0, cut, dtype=np.float32)[:, None]
+        head = samples[start:start + cut].astype(np.float32)
+        tail = samples[start + cut:start + 2 * cut].astype(np.float32)
+        mixed = (head * fade + tail * (1.0 - fade)).astype(samples.dtype)
+        return np.concatenate((samples[:start], mixed, samples[start + 2 * cut:]))
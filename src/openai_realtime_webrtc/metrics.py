@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 40, 80, 160, 320, 640, 1280, 2560)
+CALLBACK_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20)
+# Frames whose capture time is remembered while they travel to the sender
+PTS_WINDOW = 256
+
+
+class Histogram:
+    """Fixed-bucket histogram. ``observe`` is a bisect and two additions."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def percentile(self, q: float) -> float:
+        """Upper bucket bound containing the ``q`` quantile (0-1)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+        }
+
+
+class PipelineMetrics:
+    """Latency and throughput instrumentation for one session's audio pipeline.
+
+    Stages record into preallocated arrays, plain counters and fixed-bucket
+    histograms, so recording is cheap enough for the audio callbacks. Queue
+    depths and buffer levels are gauges read from the components only when a
+    snapshot is taken.
+    """
+
+    def __init__(self, frame_size: int = 960, labels: Optional[Dict[str, str]] = None):
+        self.frame_size = frame_size
+        self.labels = dict(labels or {})
+        self._capture_pts = np.full(PTS_WINDOW, -1, dtype=np.int64)
+        self._capture_times = np.zeros(PTS_WINDOW, dtype=np.float64)
+
+        self.counters: Dict[str, int] = {
+            "frames_captured": 0,
+            "frames_sent": 0,
+            "frames_received": 0,
+        }
+        self.histograms: Dict[str, Histogram] = {
+            "capture_to_send_ms": Histogram(LATENCY_BUCKETS_MS),
+            "receive_to_playout_ms": Histogram(LATENCY_BUCKETS_MS),
+            "input_callback_ms": Histogram(CALLBACK_BUCKETS_MS),
+            "output_callback_ms": Histogram(CALLBACK_BUCKETS_MS),
+        }
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        self._exporters: List[Callable[[Dict[str, Any]], Any]] = []
+        self._export_task: Optional[asyncio.Task] = None
+
+    def mark_captured(self, pts: int, timestamp: Optional[float] = None):
+        """Record when the frame at ``pts`` left the input callback."""
+        index = (pts // self.frame_size) % PTS_WINDOW
+        self._capture_pts[index] = pts
+        self._capture_times[index] = time.perf_counter() if timestamp is None else timestamp
+        self.counters["frames_captured"] += 1
+
+    def mark_sent(self, pts: int):
+        """Record that the frame captured at ``pts`` was handed to the encoder."""
+        self.counters["frames_sent"] += 1
+        index = (pts // self.frame_size) % PTS_WINDOW
+        if self._capture_pts[index] == pts:
+            self.observe("capture_to_send_ms", (time.perf_counter() - self._capture_times[index]) * 1000)
+
+    def observe(self, name: str, value: float):
+        self.histograms[name].observe(value)
+
+    def add_histogram(self, name: str, buckets: Sequence[float] = LATENCY_BUCKETS_MS) -> Histogram:
+        return self.histograms.setdefault(name, Histogram(buckets))
+
+    def increment(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_gauge(self, name: str, read: Callable[[], float]):
+        """Register (or replace) a gauge evaluated at snapshot time."""
+        self.gauges[name] = read
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current counters, gauges and histogram summaries as a plain dict."""
+        gauges = {}
+        for name, read in self.gauges.items():
+            try:
+                gauges[name] = float(read())
+            except Exception:
+                continue
+        return {
+            "labels": dict(self.labels),
+            "counters": dict(self.counters),
+            "gauges": gauges,
+            "histograms": {name: hist.snapshot() for name, hist in self.histograms.items()},
+        }
+
+    def to_prometheus(self, prefix: str = "openai_realtime") -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        labels = ",".join(f'{key}="{_escape_label(value)}"' for key, value in sorted(self.labels.items()))
+        base = "{" + labels + "}" if labels else ""
+        lines = []
+        for name, value in self.counters.items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total{base} {value}")
+        for name, value in self.snapshot()["gauges"].items():
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name}{base} {value}")
+        for name, hist in self.histograms.items():
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            cumulative = 0
+            bounds = [str(bound) for bound in hist.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, hist.counts):
+                cumulative += count
+                le = (labels + "," if labels else "") + f'le="{bound}"'
+                lines.append(f"{prefix}_{name}_bucket{{{le}}} {cumulative}")
+            lines.append(f"{prefix}_{name}_sum{base} {hist.sum}")
+            lines.append(f"{prefix}_{name}_count{base} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def add_exporter(self, exporter: Callable[[Dict[str, Any]], Any]):
+        """Register a callback (sync or async) that receives periodic snapshots."""
+        self._exporters.append(exporter)
+
+    def start_export(self, interval: float = 10.0):
+        """Push snapshots to the registered exporters every ``interval`` seconds."""
+        if self._export_task is None:
+            self._export_task = asyncio.create_task(self._export_loop(interval))
+
+    async def stop_export(self):
+        if self._export_task:
+            self._export_task.cancel()
+            try:
+                await self._export_task
+            except asyncio.CancelledError:
+                pass
+            self._export_task = None
+
+    async def _export_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            snapshot = self.snapshot()
+            for exporter in self._exporters:
+                try:
+                    result = exporter(snapshot)
+                    if asyncio.iscoroutine(result):
+                        await result
+                except Exception as e:
+                    logger.error(f"Metrics exporter failed: {str(e)}")
+
+
+def _escape_label(value: Any) -> str:
+    """Escape a label value as the exposition format requires (backslash, quote, newline)."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+async def serve_prometheus(render: Callable[[], str], host: str = "0.0.0.0", port: int = 9464):
+    """Serve ``render()`` at ``/metrics``. Returns the aiohttp AppRunner; call ``cleanup()`` to stop."""
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=render(), content_type="text/plain")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
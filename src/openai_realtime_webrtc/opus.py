@@ -0,0 +1,254 @@
+"""
+Opus encoder settings for the uplink track.
+
+aiortc creates its Opus encoder lazily, with a fixed 96 kbps stereo
+configuration, the first time the sender pulls a frame. TunedOpusEncoder is
+a drop-in replacement built from :class:`OpusSettings`. It is installed into
+the sender before any frame is sent, and can be retuned at runtime.
+libopus cannot change settings on an open encoder, so a retune swaps in a
+new codec context at the next frame boundary. RTP timestamps stay
+continuous, at the cost of a brief discontinuity in the encoder state, so
+changes should be infrequent. BitrateController drives those retunes from
+the receiver's loss and RTT reports, as sampled by the connection stats
+poller.
+"""
+
+import logging
+import math
+from typing import NamedTuple, Optional, Tuple
+
+import aiortc
+from aiortc.codecs.opus import OpusEncoder, SAMPLE_RATE, TIME_BASE
+from av import AudioResampler, CodecContext
+
+from .metrics import PipelineMetrics
+
+logger = logging.getLogger(__name__)
+
+FRAME_DURATIONS_MS = (2.5, 5, 10, 20, 40, 60)
+APPLICATIONS = ("voip", "audio", "lowdelay")
+
+# Bitrate adaptation
+MIN_BITRATE = 12000
+ADAPT_INTERVAL = 2.0
+HIGH_LOSS = 0.10  # back off above this loss fraction
+LOW_LOSS = 0.02  # probe upwards below it
+FEC_LOSS = 0.01  # turn in-band FEC on at this loss, off again at zero loss
+HIGH_RTT = 0.3  # seconds; no upward probing while RTT is this high
+BACKOFF = 0.8
+PROBE = 1.1
+# Smaller bitrate changes (e.g. from REMB) are not worth an encoder swap
+MIN_BITRATE_CHANGE = 0.1
+MAX_PACKET_LOSS = 30
+
+# TunedOpusEncoder builds on aiortc's PyAV-based OpusEncoder (1.12+) and is
+# installed through RTCRtpSender's private encoder slot; the negotiated codec
+# is read from RTCRtpTransceiver._codecs. Checked against 1.12 - 1.15.
+SUPPORTED_AIORTC = ((1, 12), (2, 0))
+_encoder_supported: Optional[bool] = None
+
+
+class OpusSettings(NamedTuple):
+    bitrate: int = 32000
+    complexity: int = 10  # 0-10, lower saves CPU
+    fec: bool = False  # in-band forward error correction
+    packet_loss: int = 0  # expected loss percentage; FEC strength
+    dtx: bool = False  # discontinuous transmission during silence
+    frame_duration_ms: float = 20
+    channels: int = 1
+    application: str = "voip"
+    vbr: str = "on"  # "on", "off" or "constrained"
+
+    def validate(self):
+        if self.frame_duration_ms not in FRAME_DURATIONS_MS:
+            raise ValueError(f"Unsupported Opus frame duration: {self.frame_duration_ms}ms")
+        if self.application not in APPLICATIONS:
+            raise ValueError(f"Unknown Opus application: {self.application}")
+        if not 0 <= self.complexity <= 10:
+            raise ValueError(f"Opus complexity must be 0-10, got {self.complexity}")
+        if self.channels not in (1, 2):
+            raise ValueError(f"Opus channels must be 1 or 2, got {self.channels}")
+
+
+def _codec_context(settings: OpusSettings) -> CodecContext:
+    codec = CodecContext.create("libopus", "w")
+    codec.bit_rate = settings.bitrate
+    codec.format = "s16"
+    codec.layout = "mono" if settings.channels == 1 else "stereo"
+    codec.sample_rate = SAMPLE_RATE
+    codec.time_base = TIME_BASE
+    codec.options = {
+        "application": settings.application,
+        "frame_duration": f"{settings.frame_duration_ms:g}",
+        "compression_level": str(settings.complexity),
+        "fec": "1" if settings.fec else "0",
+        "packet_loss": str(settings.packet_loss),
+        "dtx": "1" if settings.dtx else "0",
+        "vbr": settings.vbr,
+    }
+    return codec
+
+
+class TunedOpusEncoder(OpusEncoder):
+    """aiortc's Opus encoder with configurable libopus settings."""
+
+    def __init__(self, settings: OpusSettings = OpusSettings()):
+        settings.validate()
+        super().__init__()
+        self.settings = settings
+        self.codec = _codec_context(settings)
+        self.resampler = AudioResampler(
+            format="s16",
+            layout="mono" if settings.channels == 1 else "stereo",
+            rate=SAMPLE_RATE,
+            frame_size=int(SAMPLE_RATE * settings.frame_duration_ms / 1000),
+        )
+        self._pending: Optional[OpusSettings] = None
+        self.reconfigurations = 0
+
+    @property
+    def target_bitrate(self) -> int:
+        return (self._pending or self.settings).bitrate
+
+    @target_bitrate.setter
+    def target_bitrate(self, bitrate: int):
+        # aiortc sets this from REMB feedback
+        current = self.target_bitrate
+        if abs(bitrate - current) >= current * MIN_BITRATE_CHANGE:
+            self.reconfigure((self._pending or self.settings)._replace(bitrate=int(bitrate)))
+
+    def reconfigure(self, settings: OpusSettings):
+        """Apply ``settings`` from the next frame on (frame duration and channels are fixed)."""
+        settings.validate()
+        if (settings.frame_duration_ms, settings.channels) != (self.settings.frame_duration_ms, self.settings.channels):
+            raise ValueError("Opus frame duration and channels cannot change on a running encoder")
+        self._pending = None if settings == self.settings else settings
+
+    def encode(self, frame, force_keyframe: bool = False) -> Tuple[list, Optional[int]]:
+        # Runs on aiortc's executor thread; settings are swapped between frames only
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            self.settings = pending
+            self.codec = _codec_context(pending)
+            self.reconfigurations += 1
+        return super().encode(frame, force_keyframe)
+
+
+def _version(text: str) -> Tuple[int, ...]:
+    parts = []
+    for part in text.split(".")[:2]:
+        digits = "".join(c for c in part if c.isdigit())
+        parts.append(int(digits or 0))
+    return tuple(parts)
+
+
+def encoder_supported() -> bool:
+    """Whether the installed aiortc is in the range the encoder hooks were checked against.
+
+    Evaluated once; an unsupported version logs a single warning.
+    """
+    global _encoder_supported
+    if _encoder_supported is None:
+        version = getattr(aiortc, "__version__", "0")
+        low, high = SUPPORTED_AIORTC
+        _encoder_supported = low <= _version(version) < high
+        if not _encoder_supported:
+            logger.warning(f"aiortc {version} is outside the supported range "
+                           f"{low[0]}.{low[1]} - {high[0]}.{high[1]}; Opus encoder settings are ignored")
+    return _encoder_supported
+
+
+def install_encoder(sender, encoder: Optional[TunedOpusEncoder]) -> bool:
+    """Make ``sender`` use ``encoder`` instead of creating aiortc's default one.
+
+    Must be called before the sender pulls its first frame; ``None`` goes
+    back to aiortc's default. aiortc has no public hook for this, so the
+    sender's private encoder slot is set (see :func:`encoder_supported`).
+    """
+    if encoder is not None and not encoder_supported():
+        return False
+    sender._RTCRtpSender__encoder = encoder
+    return True
+
+
+def negotiated_codec(transceiver) -> Optional[str]:
+    """MIME type of the codec negotiated for ``transceiver``, if aiortc exposes it."""
+    codecs = getattr(transceiver, "_codecs", None)
+    return codecs[0].mimeType if codecs else None
+
+
+class BitrateController:
+    """Adjusts an encoder's bitrate and FEC from the receiver's RTCP reports.
+
+    Fed with connection stats samples (see :class:`ConnectionStats`): at
+    most every ``interval`` seconds the uplink loss fraction and RTT are
+    evaluated. High loss backs the bitrate off; low loss with a reasonable
+    RTT probes it back up to ``max_bitrate``. In-band FEC is turned on once
+    loss appears, with the expected loss rounded up to 5% steps, and turned
+    off again when loss stops; FEC and expected loss configured in the
+    encoder's settings are kept as a floor. Each step moves the bitrate by at least 10%
+    (or to a bound), since every change swaps the encoder.
+    """
+
+    def __init__(self, encoder: TunedOpusEncoder, min_bitrate: int = MIN_BITRATE,
+                 max_bitrate: Optional[int] = None, interval: float = ADAPT_INTERVAL,
+                 metrics: Optional[PipelineMetrics] = None):
+        self.encoder = encoder
+        self.min_bitrate = min_bitrate
+        self.max_bitrate = max_bitrate or encoder.settings.bitrate
+        self.min_fec = encoder.settings.fec
+        self.min_packet_loss = encoder.settings.packet_loss if encoder.settings.fec else 0
+        self.interval = interval
+        self.metrics = metrics
+        self.loss = 0.0
+        self.rtt: Optional[float] = None
+        self.adjustments = 0
+        self._last_update: Optional[float] = None
+        if metrics is not None:
+            metrics.add_gauge("encoder_bitrate", lambda: self.encoder.target_bitrate)
+            metrics.add_gauge("encoder_fec", lambda: int((self.encoder._pending or self.encoder.settings).fec))
+            metrics.add_gauge("encoder_reconfigurations", lambda: self.encoder.reconfigurations)
+
+    def configure(self, settings: OpusSettings):
+        """Adopt newly configured settings: their bitrate is the ceiling, their FEC the floor."""
+        self.max_bitrate = settings.bitrate
+        self.min_fec = settings.fec
+        self.min_packet_loss = settings.packet_loss if settings.fec else 0
+
+    def on_sample(self, sample) -> Optional[OpusSettings]:
+        """Stats listener: adapt from a :class:`StatsSample` once per ``interval``."""
+        if math.isnan(sample.loss):
+            return None  # no receiver report yet
+        # Allow a little slack so a poller running at ``interval`` is not skipped every other tick
+        if self._last_update is not None and sample.timestamp - self._last_update < self.interval * 0.9:
+            return None
+        self._last_update = sample.timestamp
+        rtt = None if math.isnan(sample.rtt_ms) else sample.rtt_ms / 1000
+        return self.update(sample.loss, rtt)
+
+    def update(self, loss: float, rtt: Optional[float] = None) -> Optional[OpusSettings]:
+        """Feed one loss/RTT sample; returns the settings applied, if any changed."""
+        self.loss = loss
+        self.rtt = rtt
+        current = self.encoder._pending or self.encoder.settings
+
+        bitrate = current.bitrate
+        if loss >= HIGH_LOSS:
+            bitrate = max(self.min_bitrate, int(bitrate * BACKOFF))
+        elif loss < LOW_LOSS and (rtt is None or rtt < HIGH_RTT):
+            bitrate = min(self.max_bitrate, int(bitrate * PROBE))
+
+        fec = self.min_fec or loss >= FEC_LOSS or (current.fec and loss > 0)
+        packet_loss = 0
+        if fec:
+            packet_loss = max(self.min_packet_loss, min(MAX_PACKET_LOSS, 5 * math.ceil(loss * 20)))
+
+        settings = current._replace(bitrate=bitrate, fec=fec, packet_loss=packet_loss)
+        if settings == current:
+            return None
+        self.encoder.reconfigure(settings)
+        self.adjustments += 1
+        logger.info(f"Encoder retuned for {loss:.1%} loss: {bitrate} bps, FEC {'on' if fec else 'off'}")
+        return settings
+
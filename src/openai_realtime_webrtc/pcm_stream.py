@@ -0,0 +1,235 @@
+"""
+Raw PCM in and out of a session without a sound device.
+
+PCMSourceBackend feeds AudioHandler from ``bytes``/``memoryview`` data or an
+async iterator of PCM chunks, and PCMOutputStream hands remote audio to an
+``async for`` loop as memoryview chunks. Both run on the event loop and
+apply backpressure instead of dropping audio.
+"""
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, AsyncIterable, AsyncIterator, Callable, Optional, Union
+
+import numpy as np
+
+from .audio_backends import AudioInputBackend
+from .audio_output import DEFAULT_SAMPLE_RATE, DEFAULT_CHANNELS, FRAME_DURATION_MS
+from .conversion import AudioConverter
+
+if TYPE_CHECKING:
+    from av import AudioFrame
+
+logger = logging.getLogger(__name__)
+
+BytesLike = Union[bytes, bytearray, memoryview]
+PCMSource = Union[BytesLike, AsyncIterable[BytesLike]]
+
+# Captured frames allowed to wait for the sender before the source is paused
+DEFAULT_MAX_BACKLOG = 10
+DEFAULT_MAX_CHUNKS = 50
+
+
+async def _iterate(source: PCMSource) -> AsyncIterator[memoryview]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield memoryview(source).cast("B")
+        return
+    async for chunk in source:
+        yield memoryview(chunk).cast("B")
+
+
+class PCMInputStream:
+    """Input stream that reads PCM from a :data:`PCMSource` on the event loop.
+
+    Chunks of any size are cut into ``blocksize`` blocks (copied once, into
+    the block buffer) and passed to the callback. With ``realtime`` the
+    blocks are paced to the stream's sample rate; the source is also paused
+    while ``backlog()`` reports more than ``max_backlog`` frames waiting to
+    be sent, so a fast producer is slowed down rather than overflowing the
+    capture queue. The last partial block is padded with silence and
+    ``finished`` is set when the source is exhausted.
+    """
+
+    def __init__(self, source: PCMSource, samplerate: int, channels: int, dtype, blocksize: int,
+                 callback: Callable, realtime: bool = True,
+                 backlog: Optional[Callable[[], int]] = None, max_backlog: int = DEFAULT_MAX_BACKLOG):
+        self.source = source
+        self.samplerate = samplerate
+        self.channels = channels
+        self.dtype = np.dtype(dtype)
+        self.blocksize = blocksize
+        self.callback = callback
+        self.realtime = realtime
+        self.backlog = backlog
+        self.max_backlog = max_backlog
+        self.blocks = 0
+        self.finished = asyncio.Event()
+        self._buffer = np.zeros((blocksize, channels), dtype=self.dtype)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def active(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.active:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def close(self):
+        self.stop()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        interval = self.blocksize / self.samplerate
+        deadline = loop.time()
+        block = memoryview(self._buffer).cast("B")
+        size = len(block)
+        filled = 0
+        try:
+            async for chunk in _iterate(self.source):
+                offset = 0
+                while offset < len(chunk):
+                    n = min(len(chunk) - offset, size - filled)
+                    block[filled:filled + n] = chunk[offset:offset + n]
+                    filled += n
+                    offset += n
+                    if filled < size:
+                        break
+                    filled = 0
+                    deadline = await self._emit(loop, deadline, interval)
+            if filled:
+                block[filled:] = bytes(size - filled)
+                await self._emit(loop, deadline, interval)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error reading PCM source: {str(e)}")
+        finally:
+            self.finished.set()
+
+    async def _emit(self, loop, deadline: float, interval: float) -> float:
+        while self.backlog is not None and self.backlog() > self.max_backlog:
+            await asyncio.sleep(interval)
+        if self.realtime:
+            deadline = max(deadline + interval, loop.time() - interval)
+            delay = deadline - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        self.callback(self._buffer, self.blocksize, None, None)
+        self.blocks += 1
+        # Let the handler wrap the block before the buffer is refilled
+        await asyncio.sleep(0)
+        return deadline
+
+
+class PCMSourceBackend(AudioInputBackend):
+    """Input backend reading interleaved PCM in the capture format (int16 by default)."""
+
+    def __init__(self, source: PCMSource, realtime: bool = True, max_backlog: int = DEFAULT_MAX_BACKLOG):
+        self.source = source
+        self.realtime = realtime
+        self.max_backlog = max_backlog
+        # Set by the owner to the number of captured frames not yet sent
+        self.backlog: Optional[Callable[[], int]] = None
+        self.stream: Optional[PCMInputStream] = None
+
+    def open_input_stream(self, samplerate, channels, dtype, blocksize, callback, device=None):
+        self.stream = PCMInputStream(
+            self.source, samplerate, channels, dtype, blocksize, callback,
+            realtime=self.realtime, backlog=self.backlog, max_backlog=self.max_backlog)
+        return self.stream
+
+
+class PCMOutputStream:
+    """Remote audio as an async iterator of PCM chunks (interleaved int16).
+
+    Each chunk covers ``chunk_ms`` of audio. When the remote frames already
+    have this format and length, chunks are memoryviews of the decoded
+    frames themselves; otherwise frames are converted and cut into
+    preallocated slots. A chunk stays valid until ``max_chunks`` further
+    chunks have been produced. At most ``max_chunks`` chunks are buffered;
+    beyond that :meth:`put_frame` waits, which stalls the receive loop
+    instead of dropping audio.
+    """
+
+    def __init__(self, sample_rate: int = DEFAULT_SAMPLE_RATE, channels: int = DEFAULT_CHANNELS,
+                 chunk_ms: int = FRAME_DURATION_MS, max_chunks: int = DEFAULT_MAX_CHUNKS):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.chunk_samples = int(sample_rate * chunk_ms / 1000)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_chunks)
+        # Queued chunks, the one being consumed and the one being filled never share a slot
+        self._slots = np.zeros((max_chunks + 2, self.chunk_samples, channels), dtype=np.int16)
+        self._slot = 0
+        self._filled = 0
+        self._converter: Optional[AudioConverter] = None
+        self._closed = False
+        self.frames = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> memoryview:
+        if self._closed and self._queue.empty():
+            raise StopAsyncIteration
+        chunk = await self._queue.get()
+        if chunk is None:
+            self._queue.put_nowait(None)
+            raise StopAsyncIteration
+        return chunk
+
+    @property
+    def buffered(self) -> int:
+        return self._queue.qsize()
+
+    async def put_frame(self, frame: "AudioFrame"):
+        """Add one decoded remote frame; waits while the consumer is behind."""
+        if self._closed:
+            return
+        self.frames += 1
+        channels = len(frame.layout.channels)
+        packed = frame.format.name == "s16" and not frame.format.is_planar
+        in_format = (frame.sample_rate or self.sample_rate, channels)
+        if (packed and self._filled == 0 and frame.samples == self.chunk_samples
+                and in_format == (self.sample_rate, self.channels)):
+            size = frame.samples * channels * 2
+            await self._queue.put(memoryview(frame.planes[0]).cast("B")[:size])
+            return
+
+        if packed:
+            data = np.frombuffer(frame.planes[0], dtype=np.int16, count=frame.samples * channels)
+            data = data.reshape(-1, channels)
+        else:
+            data = frame.to_ndarray().astype(np.int16, copy=False)
+            data = data.T if frame.format.is_planar else data.reshape(-1, channels)
+        if in_format != (self.sample_rate, self.channels):
+            if self._converter is None or self._converter.in_format != in_format:
+                self._converter = AudioConverter(*in_format, self.sample_rate, self.channels)
+            data = self._converter.process(data)
+        await self._write(data)
+
+    async def _write(self, data: np.ndarray):
+        offset = 0
+        while offset < len(data):
+            slot = self._slots[self._slot]
+            n = min(len(data) - offset, self.chunk_samples - self._filled)
+            slot[self._filled:self._filled + n] = data[offset:offset + n]
+            self._filled += n
+            offset += n
+            if self._filled == self.chunk_samples:
+                self._filled = 0
+                self._slot = (self._slot + 1) % len(self._slots)
+                await self._queue.put(memoryview(slot).cast("B"))
+
+    def close(self):
+        """End iteration once the buffered chunks have been consumed."""
+        if not self._closed:
+            self._closed = True
+            # Wake a consumer waiting on an empty queue; a full one ends after draining
+            if not self._queue.full():
+                self._queue.put_nowait(None)
@@ -0,0 +1,252 @@
+"""
+Session recording and replay.
+
+A recording is one append-only file::
+
+    header    b"ORTCREC1"
+    chunk*    records, written in batches of about ``chunk_bytes``
+    index     (timestamp, offset) of the first record of every chunk
+    footer    index offset, chunk count, b"ORTCIDX1"
+
+Each record is a fixed header (kind, channels, sample rate, payload size,
+timestamp, pts) followed by the payload: interleaved int16 PCM for audio,
+UTF-8 JSON for events. Timestamps are seconds since the recording started.
+A file without a footer (the process died) is still readable; its index is
+rebuilt by scanning the records.
+"""
+
+import asyncio
+import json
+import logging
+import mmap
+import queue
+import struct
+import threading
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from .events import Event
+
+if TYPE_CHECKING:
+    from av import AudioFrame
+
+logger = logging.getLogger(__name__)
+
+UPLINK = 1
+DOWNLINK = 2
+EVENT = 3
+
+MAGIC = b"ORTCREC1"
+INDEX_MAGIC = b"ORTCIDX1"
+RECORD_HEADER = struct.Struct("<BBHIIdq")  # kind, channels, reserved, sample_rate, size, timestamp, pts
+FOOTER = struct.Struct("<qq8s")  # index offset, chunk count, magic
+INDEX_DTYPE = np.dtype([("timestamp", "<f8"), ("offset", "<i8")])
+DEFAULT_CHUNK_BYTES = 256 * 1024
+# A partly filled chunk is written after this many seconds
+FLUSH_INTERVAL = 1.0
+
+
+class Record(NamedTuple):
+    kind: int
+    timestamp: float
+    pts: int
+    sample_rate: int
+    channels: int
+    payload: memoryview  # view into the mapped file, see SessionRecording
+
+    def samples(self) -> np.ndarray:
+        """Audio payload as an ``(n, channels)`` int16 view."""
+        return np.frombuffer(self.payload, dtype=np.int16).reshape(-1, self.channels)
+
+    def event(self) -> Event:
+        return json.loads(bytes(self.payload))
+
+
+class SessionRecorder:
+    """Writes uplink frames, remote frames and events to a recording file.
+
+    ``record_*`` only copy the payload and enqueue it, so they are cheap
+    enough for the send and receive loops; a writer thread packs records
+    into chunks of ``chunk_bytes`` (or whatever arrived within
+    ``FLUSH_INTERVAL``) and writes each chunk with a single call.
+    """
+
+    def __init__(self, path: str, chunk_bytes: int = DEFAULT_CHUNK_BYTES):
+        self.path = path
+        self.chunk_bytes = chunk_bytes
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._index = []
+        self._start = time.perf_counter()
+        self.records = 0
+        self.closed = False
+        self._thread = threading.Thread(target=self._run, name="SessionRecorder", daemon=True)
+        self._thread.start()
+
+    def record_frame(self, kind: int, frame: "AudioFrame"):
+        """Record an int16 packed frame (uplink or downlink)."""
+        if self.closed:
+            return
+        channels = len(frame.layout.channels)
+        size = frame.samples * channels * 2
+        payload = bytes(memoryview(frame.planes[0])[:size])
+        self._queue.put((kind, channels, frame.sample_rate or 0, time.perf_counter() - self._start,
+                         frame.pts or 0, payload))
+
+    def record_event(self, event: Event):
+        if self.closed:
+            return
+        payload = json.dumps(event, separators=(",", ":")).encode()
+        self._queue.put((EVENT, 0, 0, time.perf_counter() - self._start, 0, payload))
+
+    def close(self):
+        """Flush queued records, write the index and footer, and close the file."""
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.put(None)
+        self._thread.join()
+        index_offset = self._file.tell()
+        self._file.write(np.array(self._index, dtype=INDEX_DTYPE).tobytes())
+        self._file.write(FOOTER.pack(index_offset, len(self._index), INDEX_MAGIC))
+        self._file.close()
+
+    def _run(self):
+        chunk = bytearray()
+        chunk_time = 0.0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # flush interval elapsed
+            if item is None:
+                break
+            if item:
+                kind, channels, rate, timestamp, pts, payload = item
+                if not chunk:
+                    chunk_time = timestamp
+                    deadline = time.monotonic() + FLUSH_INTERVAL
+                chunk += RECORD_HEADER.pack(kind, channels, 0, rate, len(payload), timestamp, pts)
+                chunk += payload
+                self.records += 1
+            if chunk and (item is False or len(chunk) >= self.chunk_bytes):
+                self._write_chunk(chunk, chunk_time)
+                chunk = bytearray()
+                deadline = None
+        if chunk:
+            self._write_chunk(chunk, chunk_time)
+
+    def _write_chunk(self, chunk: bytearray, timestamp: float):
+        try:
+            self._index.append((timestamp, self._file.tell()))
+            self._file.write(chunk)
+        except Exception as e:
+            logger.error(f"Failed to write recording chunk: {str(e)}")
+
+
+class SessionRecording:
+    """Memory-mapped reader for a file written by :class:`SessionRecorder`.
+
+    Record payloads are views into the mapping, so reading does not copy.
+    A view keeps the mapping alive: :meth:`close` releases the file right
+    away and the mapping once the last outstanding view is gone.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a session recording")
+
+        self._end = len(self._map)
+        footer = self._map[-FOOTER.size:] if self._end >= len(MAGIC) + FOOTER.size else b""
+        if len(footer) == FOOTER.size and FOOTER.unpack(footer)[2] == INDEX_MAGIC:
+            offset, count, _ = FOOTER.unpack(footer)
+            self.index = np.frombuffer(self._map, dtype=INDEX_DTYPE, count=count, offset=offset)
+            self._end = offset
+        else:
+            self.index = self._scan_index()
+
+    @property
+    def duration(self) -> float:
+        """Timestamp of the last record."""
+        last = 0.0
+        start = float(self.index["timestamp"][-1]) if len(self.index) else 0.0
+        for record in self.records(start):
+            last = record.timestamp
+        return last
+
+    def close(self):
+        if self._map is None:
+            return
+        self.index = None
+        try:
+            self._map.close()
+        except BufferError:
+            # Payload views are still held; the map is unmapped when they are released
+            pass
+        self._map = None
+        self._file.close()
+
+    def records(self, start: float = 0.0, end: Optional[float] = None,
+                kinds: Optional[Sequence[int]] = None) -> Iterator[Record]:
+        """Iterate records with ``start <= timestamp < end``, payloads as views into the file."""
+        if not len(self.index):
+            return
+        chunk = max(0, int(np.searchsorted(self.index["timestamp"], start, side="right")) - 1)
+        offset = int(self.index["offset"][chunk])
+        view = memoryview(self._map)
+        while offset + RECORD_HEADER.size <= self._end:
+            kind, channels, _, rate, size, timestamp, pts = RECORD_HEADER.unpack_from(self._map, offset)
+            body = offset + RECORD_HEADER.size
+            offset = body + size
+            if offset > self._end:
+                break  # truncated tail
+            if end is not None and timestamp >= end:
+                break
+            if timestamp < start or (kinds is not None and kind not in kinds):
+                continue
+            yield Record(kind, timestamp, pts, rate, channels, view[body:offset])
+
+    def _scan_index(self) -> np.ndarray:
+        entries = []
+        offset = len(MAGIC)
+        while offset + RECORD_HEADER.size <= self._end:
+            _, _, _, _, size, timestamp, _ = RECORD_HEADER.unpack_from(self._map, offset)
+            if offset + RECORD_HEADER.size + size > self._end:
+                break
+            if not entries or timestamp - entries[-1][0] >= 1.0:
+                entries.append((timestamp, offset))
+            offset += RECORD_HEADER.size + size
+        self._end = offset
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+
+async def replay(recording: SessionRecording, speed: float = 1.0, start: float = 0.0,
+                 kinds: Optional[Sequence[int]] = None) -> AsyncIterator[Record]:
+    """Yield records on their recorded schedule, ``speed`` times faster (0 = unpaced)."""
+    loop = asyncio.get_running_loop()
+    origin = loop.time()
+    for record in recording.records(start, kinds=kinds):
+        if speed:
+            delay = origin + (record.timestamp - start) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        yield record
+
+
+async def replay_audio(recording: SessionRecording, kind: int = UPLINK, speed: float = 1.0,
+                       start: float = 0.0) -> AsyncIterator[bytes]:
+    """Recorded PCM of one direction, paced for use as a client ``audio_source``.
+
+    Pass ``source_realtime=False`` to the client when ``speed`` is not 1.
+    Chunks are copies, so they stay valid after the recording is closed.
+    """
+    async for record in replay(recording, speed, start, kinds=(kind,)):
+        yield bytes(record.payload)
@@ -0,0 +1,157 @@
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class AudioRingBuffer:
+    """Preallocated single-producer/single-consumer ring buffer of audio samples.
+
+    The producer only ever advances the write position and the consumer only
+    ever advances the read position, so the event loop can write while the
+    audio device callback reads without taking a lock. Positions are
+    monotonically increasing sample-frame counters; the slot index is the
+    position modulo the capacity.
+    """
+
+    def __init__(self, capacity: int, channels: int = 1, dtype: np.dtype = np.int16):
+        if capacity <= 0:
+            raise ValueError("Ring buffer capacity must be positive")
+        self.capacity = capacity
+        self.channels = channels
+        self.dtype = dtype
+        self._data = np.zeros((capacity, channels), dtype=dtype)
+        self._write_pos = 0
+        self._read_pos = 0
+        self.overruns = 0
+        self.underruns = 0
+        # Idle silence before the first write is not an underrun.
+        self._starved = True
+
+    @property
+    def available(self) -> int:
+        """Number of sample frames ready to be read."""
+        return self._write_pos - self._read_pos
+
+    @property
+    def free(self) -> int:
+        """Number of sample frames that can be written without overrunning."""
+        return self.capacity - self.available
+
+    @property
+    def write_position(self) -> int:
+        return self._write_pos
+
+    @property
+    def read_position(self) -> int:
+        return self._read_pos
+
+    def write(self, samples: np.ndarray) -> int:
+        """Copy ``samples`` (shape ``(n, channels)`` or ``(n, 1)``) into the buffer.
+
+        Samples that do not fit are discarded and counted as an overrun.
+        Returns the number of sample frames written.
+        """
+        count = len(samples)
+        n = min(count, self.free)
+        if n < count:
+            self.overruns += 1
+        if n == 0:
+            return 0
+
+        start = self._write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = samples[:first]
+        if n > first:
+            self._data[:n - first] = samples[first:n]
+        self._write_pos += n
+        return n
+
+    def read_into(self, out: np.ndarray) -> int:
+        """Fill ``out`` with up to ``len(out)`` sample frames, zero-padding the rest.
+
+        Returns the number of sample frames actually read.
+        """
+        frames = len(out)
+        n = min(frames, self.available)
+        if n:
+            start = self._read_pos % self.capacity
+            first = min(n, self.capacity - start)
+            out[:first] = self._data[start:start + first]
+            if n > first:
+                out[first:n] = self._data[:n - first]
+            self._read_pos += n
+        if n < frames:
+            out[n:] = 0
+            if not self._starved:
+                self.underruns += 1
+            self._starved = True
+        else:
+            self._starved = False
+        return n
+
+    def clear(self):
+        """Discard all buffered samples. Only safe to call from the consumer side."""
+        self._read_pos = self._write_pos
+
+
+class SharedAudioRing(AudioRingBuffer):
+    """AudioRingBuffer whose samples live in shared memory.
+
+    One process writes and another reads. Each process keeps its own copy
+    of the write and read positions; the peer's position is only adopted
+    through :meth:`advance_write` / :meth:`advance_read` after it arrived
+    over a pipe or another channel that orders memory (a syscall), so the
+    samples are always visible before the position that covers them, on
+    any CPU. The creator owns the segment and must ``unlink()`` it; other
+    processes open it with :meth:`attach`. Overrun and underrun counters
+    are per process.
+    """
+
+    def __init__(self, capacity: int, channels: int = 1, dtype: np.dtype = np.int16, name: Optional[str] = None):
+        if capacity <= 0:
+            raise ValueError("Ring buffer capacity must be positive")
+        self.capacity = capacity
+        self.channels = channels
+        self.dtype = np.dtype(dtype)
+        size = capacity * channels * self.dtype.itemsize
+        self.owner = name is None
+        # Workers started by multiprocessing share the creator's resource
+        # tracker, so attaching does not make the segment theirs to unlink.
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self._data = np.ndarray((capacity, channels), dtype=self.dtype, buffer=self.shm.buf)
+        self._write_pos = 0
+        self._read_pos = 0
+        self.overruns = 0
+        self.underruns = 0
+        self._starved = True
+
+    @classmethod
+    def attach(cls, spec: Tuple[str, int, int, str]) -> "SharedAudioRing":
+        """Open a ring created in another process from its :attr:`spec`."""
+        name, capacity, channels, dtype = spec
+        return cls(capacity, channels, dtype, name=name)
+
+    @property
+    def spec(self) -> Tuple[str, int, int, str]:
+        """Picklable description for :meth:`attach`."""
+        return self.shm.name, self.capacity, self.channels, self.dtype.str
+
+    def advance_write(self, position: int):
+        """Consumer side: the producer has written up to ``position``."""
+        if position > self._write_pos:
+            self._write_pos = position
+
+    def advance_read(self, position: int):
+        """Producer side: the consumer has read up to ``position``."""
+        if position > self._read_pos:
+            self._read_pos = position
+
+    def close(self):
+        """Release this process's mapping (views into it become invalid)."""
+        self._data = None
+        self.shm.close()
+
+    def unlink(self):
+        """Destroy the segment; only the creating process should call this."""
+        self.shm.unlink()
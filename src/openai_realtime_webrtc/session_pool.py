@@ -0,0 +1,263 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import aiohttp
+from aiortc import RTCIceServer
+
+from .audio_backends import AudioBackend
+from .audio_output import DEFAULT_SAMPLE_RATE
+from .client import OpenAIWebRTCClient
+from .jitter_buffer import DEFAULT_PLAYOUT_DELAY_MS
+from .stats import aggregate_stats
+from .token_cache import EphemeralTokenCache
+from .connection_pool import PeerConnectionPool
+from .webrtc_manager import WebRTCManager, create_http_session
+
+logger = logging.getLogger(__name__)
+
+
+class PoolFullError(Exception):
+    """Raised when a SessionPool cannot admit another session in time."""
+
+
+class SessionPool:
+    """Runs many OpenAIWebRTCClient sessions on one event loop.
+
+    All sessions share one aiohttp connector. Admission is limited to
+    ``max_sessions`` live sessions; callers wait up to ``admission_timeout``
+    seconds for a free slot (0 rejects immediately, None waits forever).
+    Sessions that ended without :meth:`close_session` (reconnection gave up,
+    or the connection failed or closed) are closed on the next admission,
+    which frees their slots.
+    At most ``max_concurrent_setups`` sessions negotiate at the same time so
+    a burst of new calls cannot starve sessions that are already running.
+    Each session's playout buffer is capped at ``max_buffered_ms``.
+    Ephemeral tokens come from a shared cache that keeps ``token_prefetch``
+    tokens ready per model and instructions, and with ``prewarmed_connections``
+    set, peer connections are taken from a shared PeerConnectionPool.
+    ``api_base`` and ``ice_servers`` apply to every session. Client
+    arguments that configure playout (``device_sample_rate``,
+    ``output_device``) are applied to each session's WebRTCManager. Pass
+    ``stats_interval`` (a client argument) to poll connection stats, which
+    :meth:`connection_stats` then aggregates across sessions.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        max_sessions: int = 200,
+        max_concurrent_setups: int = 10,
+        admission_timeout: Optional[float] = 0,
+        connection_limit: int = 100,
+        http_timeout: float = 10.0,
+        token_prefetch: int = 1,
+        prewarmed_connections: int = 0,
+        max_buffered_ms: int = 500,
+        playout_delay_ms: Optional[int] = DEFAULT_PLAYOUT_DELAY_MS,
+        audio_backend_factory: Optional[Callable[[], AudioBackend]] = None,
+        api_base: Optional[str] = None,
+        ice_servers: Optional[List[RTCIceServer]] = None,
+        **client_kwargs: Any,
+    ):
+        self.api_key = api_key
+        self.max_sessions = max_sessions
+        self.admission_timeout = admission_timeout
+        self.connection_limit = connection_limit
+        self.http_timeout = http_timeout
+        self.token_prefetch = token_prefetch
+        self.prewarmed_connections = prewarmed_connections
+        self.max_buffered_ms = max_buffered_ms
+        self.playout_delay_ms = playout_delay_ms
+        self.audio_backend_factory = audio_backend_factory
+        self.api_base = api_base
+        self.ice_servers = ice_servers
+        self.client_kwargs = client_kwargs
+
+        self.http_session: Optional[aiohttp.ClientSession] = None
+        self.token_cache: Optional[EphemeralTokenCache] = None
+        self.connection_pool: Optional[PeerConnectionPool] = None
+        self.sessions: Set[OpenAIWebRTCClient] = set()
+        self._capacity = asyncio.Semaphore(max_sessions)
+        self._setup_slots = asyncio.Semaphore(max_concurrent_setups)
+
+        self._pending = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._failed = 0
+        self._pruned = 0
+        self._setup_time_total = 0.0
+        self._setup_time_max = 0.0
+
+    async def __aenter__(self) -> "SessionPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self):
+        """Create the shared HTTP connector and token cache."""
+        if self.http_session is None:
+            self.http_session = create_http_session(
+                limit=self.connection_limit, timeout=self.http_timeout)
+            self.token_cache = EphemeralTokenCache(
+                self.api_key,
+                WebRTCManager(http_session=self.http_session, http_timeout=self.http_timeout,
+                              api_base=self.api_base),
+                prefetch=self.token_prefetch)
+            if self.prewarmed_connections:
+                self.connection_pool = PeerConnectionPool(
+                    size=self.prewarmed_connections, ice_servers=self.ice_servers)
+                await self.connection_pool.start()
+
+    async def close(self):
+        """Stop every session and release the shared connector."""
+        await asyncio.gather(
+            *(self.close_session(client) for client in list(self.sessions)),
+            return_exceptions=True)
+        if self.connection_pool:
+            await self.connection_pool.close()
+            self.connection_pool = None
+        if self.token_cache:
+            await self.token_cache.close()
+            self.token_cache = None
+        if self.http_session:
+            await self.http_session.close()
+            self.http_session = None
+
+    async def open_session(self, **overrides: Any) -> OpenAIWebRTCClient:
+        """Admit, create and start a new session.
+
+        Keyword arguments override the pool's default OpenAIWebRTCClient arguments.
+        """
+        await self.start()
+        await self._admit()
+
+        self._pending += 1
+        try:
+            client = self._create_client(**overrides)
+            async with self._setup_slots:
+                started = time.monotonic()
+                await client.start_streaming()
+                elapsed = time.monotonic() - started
+        except BaseException:
+            # Cancellation during connect must give the slot back too
+            self._failed += 1
+            self._capacity.release()
+            raise
+        finally:
+            self._pending -= 1
+
+        self._admitted += 1
+        self._setup_time_total += elapsed
+        self._setup_time_max = max(self._setup_time_max, elapsed)
+        self.sessions.add(client)
+        return client
+
+    async def close_session(self, client: OpenAIWebRTCClient):
+        """Stop a session and free its slot."""
+        if client not in self.sessions:
+            return
+        self.sessions.discard(client)
+        try:
+            await client.stop_streaming()
+        finally:
+            self._capacity.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Aggregate counters across all sessions in the pool."""
+        buffered_ms = 0.0
+        overruns = underruns = 0
+        for client in self.sessions:
+            output = client.webrtc_manager.audio_output
+            if output is None:
+                continue
+            buffered_ms += output.current_delay_ms
+            overruns += output.overruns
+            underruns += output.underruns
+
+        admitted = self._admitted
+        return {
+            "active": len(self.sessions),
+            "pending": self._pending,
+            "admitted": admitted,
+            "rejected": self._rejected,
+            "failed": self._failed,
+            "pruned": self._pruned,
+            "setup_time_avg": self._setup_time_total / admitted if admitted else 0.0,
+            "setup_time_max": self._setup_time_max,
+            "buffered_ms_avg": buffered_ms / len(self.sessions) if self.sessions else 0.0,
+            "playout_overruns": overruns,
+            "playout_underruns": underruns,
+        }
+
+    def connection_stats(self) -> Dict[str, Any]:
+        """RTT, jitter and loss distribution and total bitrates over the sessions' latest stats."""
+        return aggregate_stats(
+            client.connection_stats for client in self.sessions if client.connection_stats)
+
+    async def _admit(self):
+        await self._prune()
+        if self.admission_timeout == 0:
+            if self._capacity.locked():
+                self._rejected += 1
+                raise PoolFullError(f"Session pool is full ({self.max_sessions} sessions)")
+            await self._capacity.acquire()
+            return
+
+        try:
+            await asyncio.wait_for(self._capacity.acquire(), self.admission_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise PoolFullError(
+                f"No session slot freed within {self.admission_timeout}s") from None
+
+    async def _prune(self):
+        """Free the slots of sessions that ended without close_session()."""
+        for client in list(self.sessions):
+            if _session_ended(client):
+                self._pruned += 1
+                try:
+                    await self.close_session(client)
+                except Exception as e:
+                    logger.error(f"Error closing ended session: {str(e)}")
+
+    def _create_client(self, **overrides: Any) -> OpenAIWebRTCClient:
+        kwargs = dict(self.client_kwargs)
+        kwargs.update(overrides)
+        backend = kwargs.pop("audio_backend", None)
+        if backend is None and self.audio_backend_factory:
+            backend = self.audio_backend_factory()
+
+        # 20ms frames per playout buffer
+        max_queue_size = max(1, self.max_buffered_ms // 20)
+        # The client only builds its own manager without one, so the manager's
+        # arguments are taken from the client kwargs here. Stats polling and
+        # encoder settings stay with the client, which applies them to this manager.
+        manager = WebRTCManager(
+            playout_delay_ms=kwargs.pop("playout_delay_ms", self.playout_delay_ms),
+            audio_backend=backend,
+            http_session=self.http_session,
+            http_timeout=self.http_timeout,
+            max_queue_size=max_queue_size,
+            api_base=kwargs.pop("api_base", None) or self.api_base,
+            ice_servers=self.ice_servers,
+            output_sample_rate=kwargs.get("device_sample_rate") or DEFAULT_SAMPLE_RATE,
+            output_device=kwargs.pop("output_device", None),
+        )
+        return OpenAIWebRTCClient(
+            self.api_key, audio_backend=backend, webrtc_manager=manager,
+            token_cache=self.token_cache, connection_pool=self.connection_pool, **kwargs)
+
+
+def _session_ended(client: OpenAIWebRTCClient) -> bool:
+    """True once a session stopped itself (reconnect gave up) or lost its connection for good."""
+    if not client.is_streaming:
+        return True
+    if client.auto_reconnect:
+        # Supervised sessions either reconnect or stop themselves
+        return False
+    pc = client.webrtc_manager.peer_connection
+    return pc is not None and pc.connectionState in ("failed", "closed")
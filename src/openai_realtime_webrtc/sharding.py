@@ -0,0 +1,582 @@
+"""
+Sessions sharded across worker processes.
+
+A SessionSupervisor starts one worker process per core. Each worker runs
+its own event loop with a SessionPool, so Opus coding, SRTP, conversion and
+playout for its sessions use that worker's core. Control messages and
+realtime events travel over a ``multiprocessing`` pipe per worker; audio
+moves through a pair of SharedAudioRing buffers per session and never goes
+through the pipe. Only ring positions do: a producer publishes its write
+position after copying samples in, and a blocked producer asks the consumer
+for its read position. Updates are batched into one RINGS message per loop
+iteration, so idle sessions cost no wakeups at all, and since the position
+travels through a syscall the copy is ordered before it on any CPU.
+ShardedSession is the parent-side handle and mirrors the
+OpenAIWebRTCClient API.
+"""
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .audio_output import FRAME_DURATION_MS
+from .events import Event, EventDispatcher, EventHandler, ANY_EVENT
+from .pcm_stream import PCMOutputStream
+from .ring_buffer import SharedAudioRing
+from .transcripts import TranscriptAssembler, TranscriptChunk
+
+logger = logging.getLogger(__name__)
+
+# Ring capacity per direction
+DEFAULT_RING_MS = 2000
+
+# Pipe messages are (op, session_id, payload) tuples. Requests (OPEN, CLOSE)
+# carry (request_id, payload) and are answered with (request_id, result).
+OPEN, CLOSE, SEND_EVENT, INTERRUPT, PAUSE, RESUME, SHUTDOWN = (
+    "open", "close", "send_event", "interrupt", "pause", "resume", "shutdown")
+OPENED, CLOSED, ERROR, EVENT, SPEECH = "opened", "closed", "error", "event", "speech"
+# Sent both ways; payload is {(session_id, ring, kind): position}
+RINGS = "rings"
+UPLINK, DOWNLINK = "uplink", "downlink"
+WRITTEN, CONSUMED, WANTED = "written", "consumed", "wanted"
+
+
+class _RingSignals:
+    """Batches ring position updates into one RINGS pipe message per loop iteration."""
+
+    def __init__(self, send: Callable[[str, Optional[int], Any], None]):
+        self._send = send
+        self._updates: Dict[Tuple[int, str, str], int] = {}
+
+    def publish(self, session_id: int, ring: str, kind: str, position: int = 0):
+        if not self._updates:
+            asyncio.get_running_loop().call_soon(self._flush)
+        self._updates[(session_id, ring, kind)] = position
+
+    def _flush(self):
+        updates, self._updates = self._updates, {}
+        if updates:
+            self._send(RINGS, None, updates)
+
+
+class _RingEnd:
+    """This process's side of one session ring, as its producer or its consumer.
+
+    Waiters sleep on an event that is only set when the peer publishes a
+    position (or the ring is closed). A producer that runs out of space
+    sends WANTED once; the consumer answers with its read position right
+    away if it has read anything since the last answer, otherwise after its
+    next read. Without a WANTED the consumer never publishes, so a ring that
+    keeps up costs one message per write.
+    """
+
+    def __init__(self, ring: SharedAudioRing, session_id: int, name: str, signals: _RingSignals):
+        self.ring = ring
+        self.session_id = session_id
+        self.name = name
+        self.signals = signals
+        self.closed = False
+        self._changed = asyncio.Event()
+        self._space_wanted = False  # producer: WANTED sent, no answer yet
+        self._answer_pending = False  # consumer: owe the producer a read position
+        self._published_read = 0
+
+    def write(self, data: np.ndarray) -> int:
+        written = self.ring.write(data)
+        if written:
+            self.signals.publish(self.session_id, self.name, WRITTEN, self.ring.write_position)
+        return written
+
+    def read_into(self, out: np.ndarray) -> int:
+        read = self.ring.read_into(out)
+        if read and self._answer_pending:
+            self._answer_pending = False
+            self._publish_read()
+        return read
+
+    async def wait_space(self, frames: int):
+        while self.ring.free < frames and not self.closed:
+            if not self._space_wanted:
+                self._space_wanted = True
+                self.signals.publish(self.session_id, self.name, WANTED)
+            self._changed.clear()
+            await self._changed.wait()
+
+    async def wait_data(self, frames: int):
+        while self.ring.available < frames and not self.closed:
+            self._changed.clear()
+            await self._changed.wait()
+
+    def update(self, kind: str, position: int):
+        """Apply a position published by the other process."""
+        if kind == WRITTEN:
+            self.ring.advance_write(position)
+        elif kind == CONSUMED:
+            self.ring.advance_read(position)
+            self._space_wanted = False
+        elif kind == WANTED:
+            if self.ring.read_position > self._published_read:
+                self._publish_read()
+            else:
+                self._answer_pending = True
+        self._changed.set()
+
+    def close(self):
+        self.closed = True
+        self._changed.set()
+
+    def _publish_read(self):
+        self._published_read = self.ring.read_position
+        self.signals.publish(self.session_id, self.name, CONSUMED, self._published_read)
+
+
+class ShardedSession:
+    """Parent-side handle for a session running in a worker process.
+
+    Audio is written with :meth:`write_audio` (waits while the uplink ring
+    is full) and read with :meth:`remote_audio`. Server events are
+    forwarded from the worker and dispatched locally, so ``on()``,
+    ``on_transcription`` and the transcript callbacks behave as on
+    OpenAIWebRTCClient.
+    """
+
+    def __init__(self, supervisor: "SessionSupervisor", worker: "_WorkerHandle", session_id: int,
+                 sample_rate: int, channels: int, ring_ms: int):
+        self.supervisor = supervisor
+        self.session_id = session_id
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._worker = worker
+        capacity = sample_rate * ring_ms // 1000
+        self._uplink = _RingEnd(SharedAudioRing(capacity, channels), session_id, UPLINK, worker.signals)
+        self._downlink = _RingEnd(SharedAudioRing(capacity, channels), session_id, DOWNLINK, worker.signals)
+        self.is_streaming = False
+
+        self.events = EventDispatcher()
+        self.transcripts = TranscriptAssembler()
+        self.transcripts.attach(self.events)
+        self.transcripts.on_partial = self._handle_partial_transcript
+        self.transcripts.on_final = self._handle_final_transcript
+        self.on_transcription: Optional[Callable[[str], None]] = None
+        self.on_partial_transcript: Optional[Callable[[TranscriptChunk], None]] = None
+        self.on_final_transcript: Optional[Callable[[TranscriptChunk], None]] = None
+        self.on_speech_start: Optional[Callable[[], None]] = None
+        self.on_speech_end: Optional[Callable[[], None]] = None
+
+    async def start_streaming(self, **client_kwargs: Any):
+        """Open the session in its worker; keyword arguments go to OpenAIWebRTCClient."""
+        if self.is_streaming:
+            return
+        # Set before the request so a stop issued meanwhile reaches the worker
+        self.is_streaming = True
+        try:
+            await self._worker.request(OPEN, self.session_id, {
+                "uplink": self._uplink.ring.spec,
+                "downlink": self._downlink.ring.spec,
+                "client_kwargs": client_kwargs,
+            })
+        except Exception:
+            self.is_streaming = False
+            raise
+
+    async def stop_streaming(self):
+        if not self.is_streaming:
+            return
+        self.is_streaming = False
+        self._downlink.close()
+        try:
+            await self._worker.request(CLOSE, self.session_id)
+        except Exception as e:
+            logger.error(f"Error while stopping sharded session: {str(e)}")
+
+    async def close(self):
+        """Stop the session and free its shared-memory rings."""
+        await self.stop_streaming()
+        self.supervisor._forget(self)
+        for end in (self._uplink, self._downlink):
+            end.close()
+            end.ring.close()
+            end.ring.unlink()
+
+    async def pause_streaming(self):
+        self._worker.send(PAUSE, self.session_id)
+
+    async def resume_streaming(self):
+        self._worker.send(RESUME, self.session_id)
+
+    def on(self, event_type: str, handler: Optional[EventHandler] = None):
+        return self.events.on(event_type, handler)
+
+    async def send_event(self, event: Event):
+        self._worker.send(SEND_EVENT, self.session_id, event)
+
+    async def update_session(self, **session):
+        await self.send_event({"type": "session.update", "session": session})
+
+    async def create_response(self, **response):
+        event: Event = {"type": "response.create"}
+        if response:
+            event["response"] = response
+        await self.send_event(event)
+
+    async def interrupt(self):
+        self._worker.send(INTERRUPT, self.session_id)
+
+    async def write_audio(self, pcm) -> int:
+        """Queue interleaved int16 PCM for the uplink, waiting while the ring is full."""
+        data = np.frombuffer(pcm, dtype=np.int16).reshape(-1, self.channels)
+        written = 0
+        while written < len(data) and not self._uplink.closed:
+            written += self._uplink.write(data[written:written + self._uplink.ring.free])
+            if written < len(data):
+                await self._uplink.wait_space(1)
+        return written
+
+    async def remote_audio(self, chunk_ms: int = 20) -> AsyncIterator[memoryview]:
+        """Yield remote audio as memoryview chunks; each is valid until the next one is requested."""
+        chunk = np.zeros((self.sample_rate * chunk_ms // 1000, self.channels), dtype=np.int16)
+        view = memoryview(chunk).cast("B")
+        while True:
+            await self._downlink.wait_data(len(chunk))
+            if self._downlink.ring.available < len(chunk):
+                return  # stopped and drained
+            self._downlink.read_into(chunk)
+            yield view
+
+    def _handle_message(self, op: str, payload: Any):
+        if op == EVENT:
+            self.events.dispatch(payload)
+        elif op == SPEECH:
+            callback = self.on_speech_start if payload else self.on_speech_end
+            if callback:
+                callback()
+        elif op == CLOSED:
+            self.is_streaming = False
+            self._downlink.close()
+
+    def _ring_update(self, ring: str, kind: str, position: int):
+        end = self._uplink if ring == UPLINK else self._downlink
+        end.update(kind, position)
+
+    def _handle_partial_transcript(self, chunk: TranscriptChunk):
+        if self.on_partial_transcript:
+            self.on_partial_transcript(chunk)
+
+    def _handle_final_transcript(self, chunk: TranscriptChunk):
+        if self.on_final_transcript:
+            self.on_final_transcript(chunk)
+        if self.on_transcription:
+            self.on_transcription(chunk.text)
+
+
+class _WorkerHandle:
+    """Parent side of one worker: its process, pipe and pending requests."""
+
+    def __init__(self, context, index: int, api_key: str, pool_kwargs: Dict[str, Any]):
+        self.index = index
+        self._conn, child = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child, api_key, pool_kwargs),
+            name=f"realtime-worker-{index}", daemon=True)
+        self.sessions: Dict[int, ShardedSession] = {}
+        self.signals = _RingSignals(self.send)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._request_ids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[threading.Thread] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self.process.start()
+        self._reader = threading.Thread(target=self._read, name=f"{self.process.name}-reader", daemon=True)
+        self._reader.start()
+
+    def send(self, op: str, session_id: Optional[int] = None, payload: Any = None):
+        self._conn.send((op, session_id, payload))
+
+    async def request(self, op: str, session_id: int, payload: Any = None):
+        """Send a control message and wait for the worker's acknowledgement."""
+        request_id = next(self._request_ids)
+        future = self._loop.create_future()
+        self._pending[request_id] = future
+        self.send(op, session_id, (request_id, payload))
+        try:
+            return await future
+        finally:
+            self._pending.pop(request_id, None)
+
+    def stop(self, timeout: float = 5.0):
+        try:
+            self.send(SHUTDOWN)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self._conn.close()
+
+    def _read(self):
+        while True:
+            try:
+                message = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            try:
+                self._loop.call_soon_threadsafe(self._dispatch, *message)
+            except RuntimeError:  # loop already closed
+                return
+        try:
+            self._loop.call_soon_threadsafe(self._worker_exited)
+        except RuntimeError:
+            pass
+
+    def _dispatch(self, op: str, session_id: int, payload: Any):
+        if op == RINGS:
+            for (session_id, ring, kind), position in payload.items():
+                session = self.sessions.get(session_id)
+                if session is not None:
+                    session._ring_update(ring, kind, position)
+            return
+        if op in (OPENED, CLOSED, ERROR):
+            request_id, payload = payload
+            future = self._pending.get(request_id)
+            if future and not future.done():
+                if op == ERROR:
+                    future.set_exception(Exception(payload))
+                else:
+                    future.set_result(payload)
+        session = self.sessions.get(session_id)
+        if session is not None:
+            session._handle_message(op, payload)
+
+    def _worker_exited(self):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(Exception(f"Worker {self.index} exited"))
+        for session in self.sessions.values():
+            session.is_streaming = False
+            session._downlink.close()
+            session._uplink.close()
+
+
+class SessionSupervisor:
+    """Shards sessions across ``workers`` processes, each with its own event loop.
+
+    Each worker runs a SessionPool built from ``pool_kwargs`` (which must be
+    picklable); new sessions go to the worker with the fewest sessions.
+    """
+
+    def __init__(self, api_key: str, workers: Optional[int] = None, ring_ms: int = DEFAULT_RING_MS,
+                 **pool_kwargs: Any):
+        self.api_key = api_key
+        self.workers = workers or os.cpu_count() or 1
+        self.ring_ms = ring_ms
+        self.pool_kwargs = pool_kwargs
+        self._context = multiprocessing.get_context("spawn")
+        self._handles: List[_WorkerHandle] = []
+        self._ids = itertools.count(1)
+
+    async def __aenter__(self) -> "SessionSupervisor":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self):
+        if self._handles:
+            return
+        loop = asyncio.get_running_loop()
+        for index in range(self.workers):
+            handle = _WorkerHandle(self._context, index, self.api_key, self.pool_kwargs)
+            handle.start(loop)
+            self._handles.append(handle)
+
+    async def close(self):
+        """Close every session and stop the workers."""
+        for handle in self._handles:
+            await asyncio.gather(*(s.close() for s in list(handle.sessions.values())), return_exceptions=True)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(None, handle.stop) for handle in self._handles))
+        self._handles.clear()
+
+    async def open_session(self, sample_rate: int = 48000, channels: int = 1, **client_kwargs: Any) -> ShardedSession:
+        """Start a session on the least loaded worker.
+
+        ``sample_rate`` and ``channels`` set the PCM format of both rings;
+        other keyword arguments go to the worker's OpenAIWebRTCClient.
+        """
+        await self.start()
+        handle = min(self._handles, key=lambda h: len(h.sessions))
+        session = ShardedSession(self, handle, next(self._ids), sample_rate, channels, self.ring_ms)
+        handle.sessions[session.session_id] = session
+        try:
+            await session.start_streaming(sample_rate=sample_rate, channels=channels, **client_kwargs)
+        except Exception:
+            await session.close()
+            raise
+        return session
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [{"worker": h.index, "pid": h.process.pid, "alive": h.process.is_alive(),
+                 "sessions": len(h.sessions)} for h in self._handles]
+
+    def _forget(self, session: ShardedSession):
+        session._worker.sessions.pop(session.session_id, None)
+
+
+def _worker_main(conn, api_key: str, pool_kwargs: Dict[str, Any]):
+    """Worker process entry point."""
+    try:
+        asyncio.run(_Worker(conn, api_key, pool_kwargs).run())
+    except KeyboardInterrupt:
+        pass
+
+
+class _Worker:
+    """Runs the sessions of one worker process on its own event loop."""
+
+    def __init__(self, conn, api_key: str, pool_kwargs: Dict[str, Any]):
+        from .session_pool import SessionPool  # aiortc is only needed in the worker
+
+        self.conn = conn
+        self.pool = SessionPool(api_key, **pool_kwargs)
+        self.clients: Dict[int, Any] = {}
+        self.rings: Dict[int, Dict[str, _RingEnd]] = {}
+        self.opening: Dict[int, asyncio.Task] = {}
+        self.tasks: Dict[int, asyncio.Task] = {}
+        self.signals = _RingSignals(self._send)
+        self._shutdown = asyncio.Event()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        reader = threading.Thread(target=self._read, args=(loop,), daemon=True)
+        reader.start()
+        await self.pool.start()
+        try:
+            await self._shutdown.wait()
+        finally:
+            for session_id in set(self.clients) | set(self.opening):
+                await self._close(session_id)
+            await self.pool.close()
+
+    def _read(self, loop: asyncio.AbstractEventLoop):
+        while True:
+            try:
+                op, session_id, payload = self.conn.recv()
+            except (EOFError, OSError):
+                op, session_id, payload = SHUTDOWN, None, None
+            loop.call_soon_threadsafe(self._handle, op, session_id, payload)
+            if op == SHUTDOWN:
+                break
+
+    def _send(self, op: str, session_id: Optional[int], payload: Any = None):
+        try:
+            self.conn.send((op, session_id, payload))
+        except (BrokenPipeError, OSError):
+            self._shutdown.set()
+
+    def _handle(self, op: str, session_id: Optional[int], payload: Any):
+        if op == SHUTDOWN:
+            self._shutdown.set()
+        elif op == RINGS:
+            for (session_id, ring, kind), position in payload.items():
+                ends = self.rings.get(session_id)
+                if ends is not None:
+                    ends[ring].update(kind, position)
+        elif op == OPEN:
+            request_id, payload = payload
+            # Rings are registered right away: position updates may arrive before the session is up
+            self.rings[session_id] = {
+                UPLINK: _RingEnd(SharedAudioRing.attach(payload["uplink"]), session_id, UPLINK, self.signals),
+                DOWNLINK: _RingEnd(SharedAudioRing.attach(payload["downlink"]), session_id, DOWNLINK, self.signals),
+            }
+            task = asyncio.ensure_future(self._open(session_id, request_id, payload))
+            self.opening[session_id] = task
+            task.add_done_callback(lambda _: self.opening.pop(session_id, None))
+        elif op == CLOSE:
+            request_id, _ = payload
+            asyncio.ensure_future(self._close(session_id, request_id))
+        elif session_id in self.clients:
+            client = self.clients[session_id]
+            if op == SEND_EVENT:
+                asyncio.ensure_future(client.send_event(payload))
+            elif op == INTERRUPT:
+                asyncio.ensure_future(client.interrupt())
+            elif op == PAUSE:
+                asyncio.ensure_future(client.pause_streaming())
+            elif op == RESUME:
+                asyncio.ensure_future(client.resume_streaming())
+
+    async def _open(self, session_id: int, request_id: int, payload: Dict[str, Any]):
+        ends = self.rings[session_id]
+        kwargs = dict(payload["client_kwargs"])
+        sample_rate, channels = kwargs["sample_rate"], kwargs["channels"]
+        frame_size = sample_rate * kwargs.get("frame_duration", FRAME_DURATION_MS) // 1000
+        remote = PCMOutputStream(sample_rate, channels)
+        try:
+            client = await self.pool.open_session(
+                audio_source=_ring_source(ends[UPLINK], frame_size), remote_audio=remote, **kwargs)
+        except Exception as e:
+            self._close_rings(session_id)
+            self._send(ERROR, session_id, (request_id, f"Failed to open session: {str(e)}"))
+            return
+
+        client.on(ANY_EVENT, lambda event: self._send(EVENT, session_id, event))
+        client.on_speech_start = lambda: self._send(SPEECH, session_id, True)
+        client.on_speech_end = lambda: self._send(SPEECH, session_id, False)
+        self.clients[session_id] = client
+        self.tasks[session_id] = asyncio.create_task(_drain_to_ring(remote, ends[DOWNLINK]))
+        self._send(OPENED, session_id, (request_id, None))
+
+    async def _close(self, session_id: int, request_id: Optional[int] = None):
+        opening = self.opening.get(session_id)
+        if opening is not None:
+            # A close that overtook its open: let the open finish, then undo it
+            await asyncio.gather(opening, return_exceptions=True)
+        client = self.clients.pop(session_id, None)
+        if client is not None:
+            try:
+                await self.pool.close_session(client)
+            except Exception as e:
+                logger.error(f"Error closing session {session_id}: {str(e)}")
+        task = self.tasks.pop(session_id, None)
+        if task:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        self._close_rings(session_id)
+        if request_id is not None:
+            self._send(CLOSED, session_id, (request_id, None))
+
+    def _close_rings(self, session_id: int):
+        for end in self.rings.pop(session_id, {}).values():
+            end.close()
+            end.ring.close()
+
+
+async def _ring_source(end: _RingEnd, frame_size: int) -> AsyncIterator[memoryview]:
+    """Uplink PCM read from the parent's ring, one 20ms block at a time."""
+    block = np.zeros((frame_size, end.ring.channels), dtype=np.int16)
+    view = memoryview(block).cast("B")
+    while True:
+        await end.wait_data(frame_size)
+        if end.closed:
+            return
+        end.read_into(block)
+        yield view
+
+
+async def _drain_to_ring(remote, end: _RingEnd):
+    """Copy remote audio into the parent's ring, waiting while it is full."""
+    async for chunk in remote:
+        data = np.frombuffer(chunk, dtype=np.int16).reshape(-1, end.ring.channels)
+        await end.wait_space(len(data))
+        if end.closed:
+            return
+        end.write(data)
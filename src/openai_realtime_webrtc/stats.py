@@ -0,0 +1,287 @@
+"""
+Connection quality statistics.
+
+ConnectionStats polls the peer connection's ``getStats()`` every
+``interval`` seconds and turns the cumulative RTP/RTCP counters into one
+:class:`StatsSample` per tick: RTT and uplink loss from the server's
+receiver reports, downlink jitter and loss measured locally, and send/receive
+bitrates. The last ``window`` samples are kept in a preallocated ring
+(:class:`StatsWindow`), so a long session costs a fixed amount of memory.
+Listeners are called with each new sample; :func:`aggregate_stats`
+summarizes the latest sample of many sessions.
+
+aiortc reports no codec statistics, so the codec is read from the audio
+transceiver's negotiated codec instead.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from .metrics import PipelineMetrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATS_INTERVAL = 1.0
+DEFAULT_STATS_WINDOW = 60  # samples
+
+# Fields that describe link quality, summarized per window and across sessions
+QUALITY_FIELDS = ("rtt_ms", "jitter_ms", "remote_jitter_ms", "loss", "inbound_loss")
+RATE_FIELDS = ("send_kbps", "recv_kbps")
+
+
+class StatsSample(NamedTuple):
+    timestamp: float  # time.monotonic()
+    rtt_ms: float  # NaN until the first receiver report
+    jitter_ms: float  # downlink, measured locally
+    remote_jitter_ms: float  # uplink, as reported by the server
+    loss: float  # uplink loss fraction from the last receiver report
+    inbound_loss: float  # downlink loss fraction since the previous sample
+    send_kbps: float
+    recv_kbps: float
+    packets_sent: int
+    packets_received: int
+    bytes_sent: int
+    bytes_received: int
+
+
+class CodecInfo(NamedTuple):
+    mime_type: str
+    clock_rate: int
+    channels: Optional[int]
+    payload_type: Optional[int]
+
+
+SAMPLE_DTYPE = np.dtype([
+    (name, np.int64 if name.startswith(("packets", "bytes")) else np.float64)
+    for name in StatsSample._fields
+])
+
+
+class StatsWindow:
+    """Fixed-size ring of the most recent samples."""
+
+    def __init__(self, size: int = DEFAULT_STATS_WINDOW):
+        if size < 1:
+            raise ValueError(f"Stats window must hold at least one sample, got {size}")
+        self._data = np.zeros(size, dtype=SAMPLE_DTYPE)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return min(self._count, len(self._data))
+
+    def append(self, sample: StatsSample):
+        self._data[self._count % len(self._data)] = tuple(sample)
+        self._count += 1
+
+    def clear(self):
+        self._count = 0
+
+    @property
+    def latest(self) -> Optional[StatsSample]:
+        if not self._count:
+            return None
+        row = self._data[(self._count - 1) % len(self._data)]
+        return StatsSample(*row.tolist())
+
+    def values(self, field: str) -> np.ndarray:
+        """``field`` of every sample in the window, oldest first."""
+        size = len(self._data)
+        if self._count <= size:
+            return self._data[field][:self._count].copy()
+        start = self._count % size
+        return np.concatenate((self._data[field][start:], self._data[field][:start]))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, average, median, p95 and maximum of the quality and rate fields over the window."""
+        return {field: _describe(self.values(field)) for field in QUALITY_FIELDS + RATE_FIELDS}
+
+
+def _describe(values: np.ndarray) -> Dict[str, float]:
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return {"count": 0, "avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    return {
+        "count": len(values),
+        "avg": float(values.mean()),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "max": float(values.max()),
+    }
+
+
+def codec_info(transceiver) -> Optional[CodecInfo]:
+    """Codec negotiated for ``transceiver``, if aiortc exposes it."""
+    codecs = getattr(transceiver, "_codecs", None)
+    if not codecs:
+        return None
+    codec = codecs[0]
+    return CodecInfo(codec.mimeType, codec.clockRate, codec.channels, codec.payloadType)
+
+
+class ConnectionStats:
+    """Periodic ``getStats()`` poller for the connection returned by ``connection()``.
+
+    ``connection`` is called on every tick, so the poller follows a session
+    across reconnects; counters restart from zero on a new connection and
+    rates are computed from that point. Samples are only taken while the
+    connection is ``connected``.
+    """
+
+    def __init__(self, connection: Callable[[], Optional[object]],
+                 interval: float = DEFAULT_STATS_INTERVAL, window: int = DEFAULT_STATS_WINDOW,
+                 metrics: Optional[PipelineMetrics] = None):
+        self.connection = connection
+        self.interval = interval
+        self.window = StatsWindow(window)
+        self.codec: Optional[CodecInfo] = None
+        self.polls = 0
+        self._listeners: List[Callable[[StatsSample], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._pc = None
+        self._previous: Optional[StatsSample] = None
+        self._inbound_lost = 0
+        if metrics is not None:
+            for field in QUALITY_FIELDS + RATE_FIELDS:
+                metrics.add_gauge(f"connection_{field}", self._gauge(field))
+
+    @property
+    def latest(self) -> Optional[StatsSample]:
+        return self.window.latest
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return self.window.summary()
+
+    def add_listener(self, listener: Callable[[StatsSample], None]):
+        """Call ``listener`` with every new sample (on the event loop)."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[StatsSample], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._pc = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            pc = self.connection()
+            if pc is None or pc.connectionState != "connected":
+                continue
+            try:
+                await self.poll(pc)
+            except Exception as e:
+                logger.error(f"Failed to read connection stats: {str(e)}")
+
+    async def poll(self, pc) -> StatsSample:
+        """Take one sample from ``pc`` now, append it and notify listeners."""
+        report = await pc.getStats()
+        now = time.monotonic()
+        if pc is not self._pc:
+            self._pc = pc
+            self._previous = None
+            self.codec = None
+        if self.codec is None:
+            for transceiver in pc.getTransceivers():
+                if transceiver.kind == "audio":
+                    self.codec = codec_info(transceiver)
+                    break
+
+        sample = self._sample(report, now)
+        self._previous = sample
+        self.polls += 1
+        self.window.append(sample)
+        for listener in list(self._listeners):
+            try:
+                listener(sample)
+            except Exception as e:
+                logger.error(f"Error in stats listener: {str(e)}")
+        return sample
+
+    def _sample(self, report, now: float) -> StatsSample:
+        found = {}
+        for stats in report.values():
+            found.setdefault(getattr(stats, "type", None), stats)
+        outbound = found.get("outbound-rtp")
+        inbound = found.get("inbound-rtp")
+        remote = found.get("remote-inbound-rtp")
+        # RTP jitter is in timestamp units of the codec clock
+        clock_rate = self.codec.clock_rate if self.codec else 48000
+
+        packets_sent = outbound.packetsSent if outbound else 0
+        bytes_sent = outbound.bytesSent if outbound else 0
+        packets_received = inbound.packetsReceived if inbound else 0
+        # aiortc has no inbound byte count per stream; the transport's includes RTCP and SCTP
+        transport = found.get("transport")
+        bytes_received = transport.bytesReceived if transport else 0
+        inbound_lost = max(0, inbound.packetsLost) if inbound else 0
+
+        previous = self._previous
+        send_kbps = recv_kbps = inbound_loss = math.nan
+        if previous is not None and now > previous.timestamp:
+            elapsed = now - previous.timestamp
+            send_kbps = (bytes_sent - previous.bytes_sent) * 8 / elapsed / 1000
+            recv_kbps = (bytes_received - previous.bytes_received) * 8 / elapsed / 1000
+            lost = inbound_lost - self._inbound_lost
+            expected = packets_received - previous.packets_received + lost
+            inbound_loss = lost / expected if expected > 0 else 0.0
+        self._inbound_lost = inbound_lost
+
+        return StatsSample(
+            timestamp=now,
+            rtt_ms=_scaled(remote, "roundTripTime", 1000),
+            jitter_ms=_scaled(inbound, "jitter", 1000 / clock_rate),
+            remote_jitter_ms=_scaled(remote, "jitter", 1000 / clock_rate),
+            # RTCP carries the loss fraction as an 8-bit fixed point value
+            loss=_scaled(remote, "fractionLost", 1 / 256),
+            inbound_loss=inbound_loss,
+            send_kbps=send_kbps,
+            recv_kbps=recv_kbps,
+            packets_sent=packets_sent,
+            packets_received=packets_received,
+            bytes_sent=bytes_sent,
+            bytes_received=bytes_received,
+        )
+
+    def _gauge(self, field: str) -> Callable[[], float]:
+        def read() -> float:
+            value = getattr(self.latest, field)  # AttributeError (skipped) before the first sample
+            if not math.isfinite(value):
+                raise ValueError(f"{field} not measured yet")
+            return value
+        return read
+
+
+def _scaled(stats, name: str, factor: float) -> float:
+    # aiortc leaves RTT unset until the first report comes back
+    value = getattr(stats, name, None)
+    return value * factor if value is not None else math.nan
+
+
+def aggregate_stats(pollers: Iterable[ConnectionStats]) -> Dict[str, object]:
+    """Distribution of the latest quality sample and total bitrates across sessions."""
+    latest = [poller.latest for poller in pollers]
+    latest = [sample for sample in latest if sample is not None]
+    result: Dict[str, object] = {"sessions": len(latest)}
+    for field in QUALITY_FIELDS:
+        result[field] = _describe(np.array([getattr(s, field) for s in latest], dtype=np.float64))
+    for field in RATE_FIELDS:
+        values = np.array([getattr(s, field) for s in latest], dtype=np.float64)
+        result[field] = float(values[np.isfinite(values)].sum())
+    return result
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, NamedTuple, Optional, Sequence, Set, Tuple
+
+from .webrtc_manager import WebRTCManager, DEFAULT_MODALITIES
+
+logger = logging.getLogger(__name__)
+
+TokenKey = Tuple[str, str, Tuple[str, ...]]
+
+
+class EphemeralToken(NamedTuple):
+    value: str
+    expires_at: float  # unix time
+
+
+class EphemeralTokenCache:
+    """Mints ephemeral tokens ahead of demand.
+
+    Tokens are kept per (model, instructions, modalities) key. Each token is
+    handed out once; after every hand-out the cache refills in the background
+    so that ``prefetch`` tokens stay ready. Tokens within ``expiry_margin``
+    seconds of expiring are evicted rather than returned.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        manager: Optional[WebRTCManager] = None,
+        prefetch: int = 1,
+        expiry_margin: float = 10.0,
+        default_ttl: float = 60.0,
+    ):
+        self.api_key = api_key
+        # A manager created here is ours to close (with its HTTP session)
+        self._owns_manager = manager is None
+        self.manager = manager or WebRTCManager()
+        self.prefetch = prefetch
+        self.expiry_margin = expiry_margin
+        self.default_ttl = default_ttl
+        self._tokens: Dict[TokenKey, Deque[EphemeralToken]] = {}
+        self._refills: Dict[TokenKey, Set[asyncio.Task]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    @staticmethod
+    def make_key(model: str, instructions: str, modalities: Sequence[str] = DEFAULT_MODALITIES) -> TokenKey:
+        return model, instructions, tuple(modalities)
+
+    async def get(self, model: str, instructions: str, modalities: Sequence[str] = DEFAULT_MODALITIES) -> str:
+        """Return a fresh token for the key, minting one now if none is cached."""
+        key = self.make_key(model, instructions, modalities)
+        tokens = self._evict(key)
+        if tokens:
+            self.hits += 1
+            token = tokens.popleft()
+        else:
+            self.misses += 1
+            token = await self._mint(key)
+        self.warm(model, instructions, modalities)
+        return token.value
+
+    def warm(self, model: str, instructions: str, modalities: Sequence[str] = DEFAULT_MODALITIES,
+             count: Optional[int] = None):
+        """Start background minting until ``count`` (default ``prefetch``) tokens are ready."""
+        key = self.make_key(model, instructions, modalities)
+        wanted = self.prefetch if count is None else count
+        tokens = self._evict(key)
+        refills = self._refills.setdefault(key, set())
+        for _ in range(wanted - len(tokens) - len(refills)):
+            task = asyncio.ensure_future(self._refill(key))
+            refills.add(task)
+            task.add_done_callback(refills.discard)
+
+    def ready(self, model: str, instructions: str, modalities: Sequence[str] = DEFAULT_MODALITIES) -> int:
+        """Number of unexpired tokens cached for the key."""
+        return len(self._evict(self.make_key(model, instructions, modalities)))
+
+    async def close(self):
+        """Cancel pending refills and drop all cached tokens.
+
+        A manager the cache created itself is closed too; one passed in is
+        left to its owner.
+        """
+        tasks = [task for refills in self._refills.values() for task in refills]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._refills.clear()
+        self._tokens.clear()
+        if self._owns_manager:
+            await self.manager.close()
+
+    async def _refill(self, key: TokenKey):
+        try:
+            token = await self._mint(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Token prefetch failed: {str(e)}")
+            return
+        self._tokens.setdefault(key, deque()).append(token)
+
+    async def _mint(self, key: TokenKey) -> EphemeralToken:
+        model, instructions, modalities = key
+        secret = await self.manager.create_ephemeral_session(
+            self.api_key, model, instructions, modalities)
+        expires_at = secret.get("expires_at") or time.time() + self.default_ttl
+        return EphemeralToken(secret["value"], float(expires_at))
+
+    def _evict(self, key: TokenKey) -> Deque[EphemeralToken]:
+        tokens = self._tokens.setdefault(key, deque())
+        deadline = time.time() + self.expiry_margin
+        while tokens and tokens[0].expires_at <= deadline:
+            tokens.popleft()
+            self.evicted += 1
+        return tokens
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from .events import Event, EventDispatcher
+
+logger = logging.getLogger(__name__)
+
+INPUT = "input"
+OUTPUT = "output"
+
+# event type -> (source, is_final, field holding the text)
+TRANSCRIPT_EVENTS: Dict[str, Tuple[str, bool, str]] = {
+    "conversation.item.input_audio_transcription.delta": (INPUT, False, "delta"),
+    "conversation.item.input_audio_transcription.completed": (INPUT, True, "transcript"),
+    "response.audio_transcript.delta": (OUTPUT, False, "delta"),
+    "response.audio_transcript.done": (OUTPUT, True, "transcript"),
+    "response.output_audio_transcript.delta": (OUTPUT, False, "delta"),
+    "response.output_audio_transcript.done": (OUTPUT, True, "transcript"),
+    "response.text.delta": (OUTPUT, False, "delta"),
+    "response.text.done": (OUTPUT, True, "text"),
+    "response.output_text.delta": (OUTPUT, False, "delta"),
+    "response.output_text.done": (OUTPUT, True, "text"),
+}
+
+ItemKey = Tuple[str, int]
+
+
+class TranscriptChunk(NamedTuple):
+    item_id: str
+    response_id: Optional[str]
+    content_index: int
+    source: str  # INPUT (user speech) or OUTPUT (model)
+    text: str  # the delta for partial chunks, the whole transcript for final ones
+    final: bool
+
+
+class _OpenItem:
+    __slots__ = ("response_id", "parts")
+
+    def __init__(self, response_id: Optional[str]):
+        self.response_id = response_id
+        self.parts: List[str] = []
+
+
+class TranscriptAssembler:
+    """Builds transcripts from realtime delta events.
+
+    Deltas are appended to a per-item list of chunks and joined once, when
+    the item finishes (or when :meth:`text` is asked for it), so assembly
+    stays linear in the transcript length. Finished transcripts are kept for
+    the last ``retain_finished`` items and then evicted; at most
+    ``max_open_items`` unfinished items are tracked, the oldest being dropped
+    when a response is abandoned without a done event.
+    """
+
+    def __init__(self, retain_finished: int = 32, max_open_items: int = 64, stream_queue_size: int = 256):
+        self.retain_finished = retain_finished
+        self.max_open_items = max_open_items
+        self.stream_queue_size = stream_queue_size
+        self._open: "OrderedDict[ItemKey, _OpenItem]" = OrderedDict()
+        self._finished: "OrderedDict[ItemKey, str]" = OrderedDict()
+        self._subscribers: Set[asyncio.Queue] = set()
+
+        self.on_partial: Optional[Callable[[TranscriptChunk], None]] = None
+        self.on_final: Optional[Callable[[TranscriptChunk], None]] = None
+        self.deltas = 0
+        self.evicted = 0
+        self.stream_overflows = 0
+
+    def attach(self, dispatcher: EventDispatcher):
+        """Register for the transcript events of ``dispatcher``."""
+        for event_type in TRANSCRIPT_EVENTS:
+            dispatcher.on(event_type, self.handle_event)
+
+    def handle_event(self, event: Event):
+        source, final, field = TRANSCRIPT_EVENTS[event["type"]]
+        key = (event.get("item_id", ""), event.get("content_index", 0))
+        if final:
+            self._finish(key, source, event.get("response_id"), event.get(field))
+        else:
+            self._append(key, source, event.get("response_id"), event.get(field, ""))
+
+    def text(self, item_id: str, content_index: int = 0) -> Optional[str]:
+        """Current transcript of an item, partial or final; None once evicted."""
+        key = (item_id, content_index)
+        item = self._open.get(key)
+        if item is not None:
+            # Compact so repeated reads do not join the same chunks again
+            if len(item.parts) > 1:
+                item.parts[:] = ["".join(item.parts)]
+            return item.parts[0] if item.parts else ""
+        return self._finished.get(key)
+
+    @property
+    def open_items(self) -> int:
+        return len(self._open)
+
+    async def stream(self) -> AsyncIterator[TranscriptChunk]:
+        """Yield every partial and final chunk from now on.
+
+        Each consumer gets its own bounded queue; if it falls behind, the
+        oldest chunks are dropped and counted in ``stream_overflows``.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.stream_queue_size)
+        self._subscribers.add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers.discard(queue)
+
+    def clear(self):
+        self._open.clear()
+        self._finished.clear()
+
+    def _append(self, key: ItemKey, source: str, response_id: Optional[str], delta: str):
+        item = self._open.get(key)
+        if item is None:
+            item = self._open[key] = _OpenItem(response_id)
+            while len(self._open) > self.max_open_items:
+                self._open.popitem(last=False)
+                self.evicted += 1
+        item.parts.append(delta)
+        self.deltas += 1
+        self._emit(TranscriptChunk(key[0], response_id, key[1], source, delta, False), self.on_partial)
+
+    def _finish(self, key: ItemKey, source: str, response_id: Optional[str], transcript: Optional[str]):
+        item = self._open.pop(key, None)
+        if transcript is None:
+            transcript = "".join(item.parts) if item else ""
+        if response_id is None and item is not None:
+            response_id = item.response_id
+
+        self._finished[key] = transcript
+        self._finished.move_to_end(key)
+        while len(self._finished) > self.retain_finished:
+            self._finished.popitem(last=False)
+            self.evicted += 1
+        self._emit(TranscriptChunk(key[0], response_id, key[1], source, transcript, True), self.on_final)
+
+    def _emit(self, chunk: TranscriptChunk, callback: Optional[Callable[[TranscriptChunk], None]]):
+        if callback:
+            try:
+                callback(chunk)
+            except Exception as e:
+                logger.error(f"Transcript callback failed: {str(e)}")
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+                self.stream_overflows += 1
+            queue.put_nowait(chunk)
@@ -0,0 +1,84 @@
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+SPEECH_START = "speech_start"
+SPEECH_END = "speech_end"
+
+# Full-scale int16 energy, the 0 dBFS reference
+FULL_SCALE_ENERGY = 32768.0 * 32768.0
+
+
+class VoiceActivityDetector:
+    """Energy and zero-crossing voice activity detector for int16 frames.
+
+    A frame counts as speech when its level is ``threshold_db`` above the
+    tracked noise floor (and above ``min_level_db``) and its zero-crossing
+    rate is below ``max_zcr``, which rejects hiss and fricative-free noise.
+    After speech stops the detector stays active for ``hangover_ms`` so word
+    gaps do not cut the stream; ``preroll_ms`` tells the capture gate how
+    much audio to replay from before the detected onset.
+    """
+
+    def __init__(
+        self,
+        frame_duration: int = 20,
+        threshold_db: float = 10.0,
+        min_level_db: float = -55.0,
+        max_zcr: float = 0.4,
+        hangover_ms: int = 400,
+        preroll_ms: int = 200,
+        noise_adaptation: float = 0.05,
+    ):
+        self.frame_duration = frame_duration
+        self.threshold_db = threshold_db
+        self.min_level_db = min_level_db
+        self.max_zcr = max_zcr
+        self.hangover_frames = max(1, hangover_ms // frame_duration)
+        self.preroll_frames = preroll_ms // frame_duration
+        self.noise_adaptation = noise_adaptation
+
+        self.noise_floor_db = min_level_db
+        self.level_db = -120.0
+        self.is_active = False
+        self._hangover = 0
+
+    def is_speech(self, samples: np.ndarray) -> bool:
+        """Classify one frame without hangover; also updates the noise floor."""
+        flat = samples.reshape(-1).astype(np.float32)
+        energy = float(np.dot(flat, flat)) / max(1, flat.size)
+        self.level_db = 10.0 * math.log10(energy / FULL_SCALE_ENERGY + 1e-12)
+        crossings = np.count_nonzero(np.signbit(flat[1:]) != np.signbit(flat[:-1]))
+        zcr = crossings / max(1, flat.size - 1)
+
+        threshold = max(self.min_level_db, self.noise_floor_db + self.threshold_db)
+        speech = self.level_db > threshold and zcr < self.max_zcr
+        if not speech:
+            # Follow drops immediately, rises slowly
+            if self.level_db < self.noise_floor_db:
+                self.noise_floor_db = self.level_db
+            else:
+                self.noise_floor_db += self.noise_adaptation * (self.level_db - self.noise_floor_db)
+        return speech
+
+    def process(self, samples: np.ndarray) -> Tuple[bool, Optional[str]]:
+        """Return ``(active, event)`` for one frame; ``event`` is a speech start/end marker or None."""
+        if self.is_speech(samples):
+            self._hangover = self.hangover_frames
+            if not self.is_active:
+                self.is_active = True
+                return True, SPEECH_START
+            return True, None
+
+        if self.is_active:
+            self._hangover -= 1
+            if self._hangover <= 0:
+                self.is_active = False
+                return False, SPEECH_END
+        return self.is_active, None
+
+    def reset(self):
+        self.noise_floor_db = self.min_level_db
+        self.is_active = False
+        self._hangover = 0
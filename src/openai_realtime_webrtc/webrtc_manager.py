@@ -2,80 +2,269 @@ import asyncio
 import aiohttp
 import json
 import logging
+import os
+import random
+import time
 from aiortc import RTCPeerConnection, RTCConfiguration, RTCIceServer, MediaStreamTrack
-from typing import Dict, Any, Optional
-from .audio_output import AudioOutput
+from aiortc.mediastreams import MediaStreamError
+from typing import Callable, Dict, Any, List, Optional, Sequence, Tuple
+from .audio_output import AudioOutput, DEFAULT_SAMPLE_RATE, DEFAULT_CHANNELS
+from .audio_backends import AudioBackend
+from .devices import DeviceSpec
+from .jitter_buffer import DEFAULT_PLAYOUT_DELAY_MS
+from .metrics import PipelineMetrics
+from .pcm_stream import PCMOutputStream
+from .recording import SessionRecorder, DOWNLINK
+from .stats import ConnectionStats, DEFAULT_STATS_WINDOW
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MODALITIES = ("audio", "text")
+DEFAULT_STUN_URL = "stun:stun.l.google.com:19302"
+
+# Statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def create_http_session(
+    limit: int = 100,
+    timeout: float = 10.0,
+    ttl_dns_cache: int = 300,
+    keepalive_timeout: float = 60.0,
+) -> aiohttp.ClientSession:
+    """Create a keep-alive HTTP session with connection pooling and DNS caching."""
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        ttl_dns_cache=ttl_dns_cache,
+        keepalive_timeout=keepalive_timeout,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    )
+
 
 class WebRTCManager:
     OPENAI_API_BASE = "https://api.openai.com/v1"
     REALTIME_SESSION_URL = f"{OPENAI_API_BASE}/realtime/sessions"
     REALTIME_URL = f"{OPENAI_API_BASE}/realtime"
 
-    def __init__(self):
-        self.ice_servers = [
-            RTCIceServer(
-                urls=["stun:stun.l.google.com:19302"]
-            )
-        ]
+    def __init__(
+        self,
+        playout_delay_ms: Optional[int] = DEFAULT_PLAYOUT_DELAY_MS,
+        audio_backend: Optional[AudioBackend] = None,
+        http_session: Optional[aiohttp.ClientSession] = None,
+        max_queue_size: int = 50,
+        http_timeout: float = 10.0,
+        max_retries: int = 2,
+        retry_backoff: float = 0.2,
+        ice_servers: Optional[List[RTCIceServer]] = None,
+        metrics: Optional[PipelineMetrics] = None,
+        output_sample_rate: int = DEFAULT_SAMPLE_RATE,
+        output_channels: int = DEFAULT_CHANNELS,
+        remote_audio: Optional[PCMOutputStream] = None,
+        api_base: Optional[str] = None,
+        output_device: DeviceSpec = None,
+        stats_interval: Optional[float] = None,
+        stats_window: int = DEFAULT_STATS_WINDOW,
+    ):
+        self.playout_delay_ms = playout_delay_ms
+        # API 根地址可替换（本地测试服务器、代理）；默认读取 OPENAI_REALTIME_API_BASE
+        self.api_base = (api_base or os.environ.get("OPENAI_REALTIME_API_BASE") or self.OPENAI_API_BASE).rstrip("/")
+        self.realtime_session_url = f"{self.api_base}/realtime/sessions"
+        self.realtime_url = f"{self.api_base}/realtime"
+        self.audio_backend = audio_backend
+        self.max_queue_size = max_queue_size
+        self.metrics = metrics
+        # 输出设备的原生采样率/声道数，远端音频在 AudioOutput 中转换
+        self.output_sample_rate = output_sample_rate
+        self.output_channels = output_channels
+        self.output_device = output_device
+        # 设置后远端音频交给该迭代器，而不是播放到输出设备
+        self.remote_audio = remote_audio
+        self.recorder: Optional[SessionRecorder] = None
+        # 外部传入的 HTTP 会话由调用方负责关闭；否则首次请求时创建并由 close() 关闭
+        self.http_session = http_session
+        self._owns_http_session = http_session is None
+        self.http_timeout = http_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        if ice_servers is None:
+            ice_servers = [RTCIceServer(urls=[DEFAULT_STUN_URL])]
+        self.ice_servers = ice_servers
         self.audio_output: Optional[AudioOutput] = None
         self.peer_connection: Optional[RTCPeerConnection] = None
+        # Called with connectionState changes of the current connection (supervised mode)
+        self.on_state_change: Optional[Callable[[str], None]] = None
+        # monotonic time of the last remote audio frame, for liveness checks
+        self.last_received: Optional[float] = None
+        self._connected = asyncio.Event()
+        # Connection quality poller (off unless stats_interval is set)
+        self.stats: Optional[ConnectionStats] = None
+        if stats_interval is not None:
+            self.enable_stats(stats_interval, stats_window)
+
+    def enable_stats(self, interval: float, window: int = DEFAULT_STATS_WINDOW) -> ConnectionStats:
+        """Poll connection stats every ``interval`` seconds (keeps an existing poller)."""
+        if self.stats is None:
+            self.stats = ConnectionStats(
+                lambda: self.peer_connection, interval=interval, window=window, metrics=self.metrics)
+            if self.peer_connection is not None:
+                self.stats.start()
+        return self.stats
+
+    async def create_connection(
+        self, peer_connection: Optional[RTCPeerConnection] = None
+    ) -> RTCPeerConnection:
+        """Create a new WebRTC peer connection, or adopt a pre-built one.
 
-    async def create_connection(self) -> RTCPeerConnection:
-        """Create a new WebRTC peer connection."""
-        config = RTCConfiguration(iceServers=self.ice_servers)
-        self.peer_connection = RTCPeerConnection(config)
+        Audio output survives reconnects: when one is already running it is
+        kept and only its jitter buffer is told that a new timeline starts.
+        """
+        if peer_connection is None:
+            config = RTCConfiguration(iceServers=self.ice_servers)
+            peer_connection = RTCPeerConnection(config)
+        self.peer_connection = peer_connection
+        self._connected = asyncio.Event()
+        self.last_received = time.monotonic()
 
         # 初始化音频输出
-        self.audio_output = AudioOutput()
-        await self.audio_output.start()
+        if self.remote_audio is None and self.audio_output is None:
+            self.audio_output = AudioOutput(
+                sample_rate=self.output_sample_rate,
+                channels=self.output_channels,
+                max_queue_size=self.max_queue_size,
+                playout_delay_ms=self.playout_delay_ms,
+                device=self.output_device,
+                backend=self.audio_backend,
+                metrics=self.metrics)
+            await self.audio_output.start()
+        elif self.audio_output and self.audio_output.jitter_buffer:
+            self.audio_output.jitter_buffer.resync()
+        if self.stats:
+            self.stats.start()
 
-        @self.peer_connection.on("track")
+        pc = peer_connection
+
+        @pc.on("track")
         async def on_track(track: MediaStreamTrack):
             logger.info(f"Received {track.kind} track from remote")
             if track.kind == "audio":
                 @track.on("ended")
                 async def on_ended():
-                    if self.audio_output:
+                    if self.audio_output and pc is self.peer_connection and self.on_state_change is None:
                         await self.audio_output.stop()
 
                 while True:
                     try:
                         frame = await track.recv()
-                        if self.audio_output and frame:
+                        self.last_received = time.monotonic()
+                        if self.metrics is not None:
+                            self.metrics.increment("frames_received")
+                        if self.recorder is not None and frame:
+                            self.recorder.record_frame(DOWNLINK, frame)
+                        if self.remote_audio is not None and frame:
+                            await self.remote_audio.put_frame(frame)
+                        elif self.audio_output and frame:
                             await self.audio_output.play_frame(frame)
+                    except MediaStreamError:
+                        # The connection was closed; not an error
+                        logger.debug("Remote audio track ended")
+                        break
                     except Exception as e:
                         logger.error(
                             f"Error processing remote audio frame: {str(e)}")
                         break
 
-        @self.peer_connection.on("connectionstatechange")
+        @pc.on("connectionstatechange")
         async def on_connectionstatechange():
-            logger.info(f"Connection state changed to: {self.peer_connection.connectionState}")
-            if self.peer_connection.connectionState == "failed":
+            state = pc.connectionState
+            logger.info(f"Connection state changed to: {state}")
+            if pc is not self.peer_connection:
+                return  # a connection we already replaced or closed
+            if state == "connected":
+                self._connected.set()
+            if self.on_state_change is not None:
+                self.on_state_change(state)
+            elif state == "failed":
                 if self.audio_output:
                     await self.audio_output.stop()
 
-        @self.peer_connection.on("iceconnectionstatechange")
+        @pc.on("iceconnectionstatechange")
         async def on_iceconnectionstatechange():
-            logger.info(f"ICE connection state changed to: {self.peer_connection.iceConnectionState}")
+            logger.info(f"ICE connection state changed to: {pc.iceConnectionState}")
 
         return self.peer_connection
 
+    async def wait_connected(self, timeout: Optional[float] = None):
+        """Wait until the current connection reaches ``connected``."""
+        await asyncio.wait_for(self._connected.wait(), timeout)
+
+    async def close_connection(self):
+        """Close the peer connection only; audio output and remote audio stay open."""
+        pc, self.peer_connection = self.peer_connection, None
+        if pc:
+            await pc.close()
+
     async def cleanup(self):
         """Clean up resources."""
+        if self.stats:
+            await self.stats.stop()
+
+        if self.remote_audio is not None:
+            self.remote_audio.close()
+
         if self.audio_output:
             await self.audio_output.stop()
             self.audio_output = None
 
-        if self.peer_connection:
-            await self.peer_connection.close()
-            self.peer_connection = None
+        await self.close_connection()
 
-    async def get_ephemeral_token(self, api_key: str, model: str, instructions: str) -> str:
-        """Get an ephemeral token from OpenAI."""
+    async def close(self):
+        """Clean up the connection and close the HTTP session if this manager created it."""
+        await self.cleanup()
+        if self._owns_http_session and self.http_session:
+            await self.http_session.close()
+            self.http_session = None
+
+    def _get_http_session(self) -> aiohttp.ClientSession:
+        """Return the long-lived HTTP session, creating it on first use."""
+        if self.http_session is None or self.http_session.closed:
+            self.http_session = create_http_session(timeout=self.http_timeout)
+            self._owns_http_session = True
+        return self.http_session
+
+    async def _post(self, url: str, headers: Dict[str, str], **kwargs) -> Tuple[int, str]:
+        """POST over the pooled session, retrying transient failures with jittered backoff."""
+        session = self._get_http_session()
+        attempt = 0
+        while True:
+            try:
+                async with session.post(url, headers=headers, **kwargs) as response:
+                    body = await response.text()
+                    if response.status not in RETRY_STATUSES or attempt >= self.max_retries:
+                        return response.status, body
+                    reason = f"HTTP {response.status}"
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                reason = str(e) or type(e).__name__
+
+            # Full jitter: sleep a random fraction of the exponential backoff
+            delay = random.uniform(0, self.retry_backoff * (2 ** attempt))
+            attempt += 1
+            logger.warning(
+                f"POST {url} failed ({reason}), retry {attempt}/{self.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def create_ephemeral_session(
+        self,
+        api_key: str,
+        model: str,
+        instructions: str,
+        modalities: Sequence[str] = DEFAULT_MODALITIES,
+    ) -> Dict[str, Any]:
+        """Create a realtime session and return its client secret (``value`` and ``expires_at``)."""
         headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
@@ -83,42 +272,50 @@ class WebRTCManager:
 
         data = {
             "model": model,
-            "modalities": ["audio", "text"],
+            "modalities": list(modalities),
             "instructions": f"{instructions}"
         }
 
-       
-
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.REALTIME_SESSION_URL,
-                    headers=headers,
-                    json=data
-                ) as response:
-                    if response.status not in [200, 201]:
-                        error_text = await response.text()
-                        raise Exception(
-                            f"Failed to get ephemeral token: {error_text}")
-
-                    result = await response.json()
-                    return result["client_secret"]["value"]
+            status, body = await self._post(
+                self.realtime_session_url,
+                headers=headers,
+                json=data
+            )
+            if status not in [200, 201]:
+                raise Exception(f"Failed to get ephemeral token: {body}")
+
+            result = json.loads(body)
+            return result["client_secret"]
 
         except Exception as e:
             logger.error(f"Failed to get ephemeral token: {str(e)}")
             raise
 
+    async def get_ephemeral_token(
+        self,
+        api_key: str,
+        model: str,
+        instructions: str,
+        modalities: Sequence[str] = DEFAULT_MODALITIES,
+    ) -> str:
+        """Get an ephemeral token from OpenAI."""
+        secret = await self.create_ephemeral_session(api_key, model, instructions, modalities)
+        return secret["value"]
+
     async def connect_to_openai(
         self,
         api_key: str,
         model: str,
         offer: Dict[str, Any],
         instructions: str = "You are a friendly assistant.",
+        ephemeral_token: Optional[str] = None,
     ) -> Dict[str, Any]:
         """Connect to OpenAI's WebRTC endpoint using ephemeral token."""
         try:
-            # 1. 获取临时token
-            ephemeral_token = await self.get_ephemeral_token(api_key, model,instructions)
+            # 1. 获取临时token（调用方已预取时跳过）
+            if ephemeral_token is None:
+                ephemeral_token = await self.get_ephemeral_token(api_key, model, instructions)
 
             # 2. 使用临时token建立WebRTC连接
             headers = {
@@ -127,21 +324,18 @@ class WebRTCManager:
             }
 
             # 3. 发送SDP offer并获取answer
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.REALTIME_URL}?model={model}",
-                    headers=headers,
-                    data=offer.sdp
-                ) as response:
-                    if response.status not in [200, 201]:
-                        error_text = await response.text()
-                        raise Exception(f"OpenAI WebRTC error: {error_text}")
-
-                    sdp_answer = await response.text()
-                    return {
-                        "type": "answer",
-                        "sdp": sdp_answer
-                    }
+            status, sdp_answer = await self._post(
+                f"{self.realtime_url}?model={model}",
+                headers=headers,
+                data=offer.sdp
+            )
+            if status not in [200, 201]:
+                raise Exception(f"OpenAI WebRTC error: {sdp_answer}")
+
+            return {
+                "type": "answer",
+                "sdp": sdp_answer
+            }
 
         except Exception as e:
             logger.error(f"Failed to connect to OpenAI: {str(e)}")
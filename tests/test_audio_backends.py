@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from openai_realtime_webrtc.audio_backends import (
+    AudioBackend, AudioInputBackend, AudioOutputBackend, NumpyBackend,
+)
+from openai_realtime_webrtc.pcm_stream import PCMSourceBackend
+
+
+def test_backends_must_implement_their_streams():
+    with pytest.raises(TypeError):
+        AudioBackend()
+
+    class OutputOnly(AudioOutputBackend):
+        def open_output_stream(self, samplerate, channels, dtype, blocksize, callback, device=None):
+            return None
+
+    assert not isinstance(OutputOnly(), AudioInputBackend)
+
+
+def test_pcm_source_is_input_only():
+    backend = PCMSourceBackend(b"")
+    assert isinstance(backend, AudioInputBackend)
+    assert not isinstance(backend, AudioOutputBackend)
+    assert not hasattr(backend, "open_output_stream")
+
+
+def test_numpy_backend_provides_both_directions():
+    backend = NumpyBackend(np.zeros((0, 1), dtype=np.int16))
+    assert isinstance(backend, AudioInputBackend)
+    assert isinstance(backend, AudioOutputBackend)
@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+import numpy as np
+from av import AudioFrame
+
+from openai_realtime_webrtc.audio_backends import NumpyBackend
+from openai_realtime_webrtc.audio_output import AudioOutput
+
+RATE = 48000
+FRAME = 960
+
+
+def make_frame(value=1000, samples=FRAME, pts=None):
+    frame = AudioFrame(samples=samples, layout="stereo", format="s16")
+    frame.sample_rate = RATE
+    frame.planes[0].update(np.full(samples * 2, value, dtype=np.int16))
+    if pts is not None:
+        frame.pts = pts
+        frame.time_base = None
+    return frame
+
+
+def make_output(**kwargs):
+    output = AudioOutput(backend=NumpyBackend(), **kwargs)
+    output.stream = object()  # flushes go through the callback, as while playing
+    return output
+
+
+def play(output, frames):
+    out = np.zeros((frames, output.channels), dtype=np.int16)
+    output._audio_callback(out, frames, None, None)
+    return out
+
+
+def queue(output, count, **kwargs):
+    async def run():
+        for _ in range(count):
+            await output.play_frame(make_frame(**kwargs))
+    asyncio.run(run())
+
+
+def test_played_position_counts_partial_blocks():
+    output = make_output(playout_delay_ms=None)
+    queue(output, 3)
+    assert output.media_queued_position == 3 * FRAME
+    play(output, FRAME)
+    play(output, FRAME // 2)
+    assert output.media_played_position == FRAME + FRAME // 2
+    assert output.played_position == FRAME + FRAME // 2
+
+
+def test_jitter_buffer_silence_is_not_counted_as_played():
+    output = make_output(playout_delay_ms=60)
+    queue(output, 1)
+    # 40ms of cushion silence sit ahead of the frame in the ring
+    assert output.queued_position == 3 * FRAME
+    play(output, 2 * FRAME)
+    assert output.media_played_position == 0
+    play(output, FRAME // 4)
+    assert output.media_played_position == FRAME // 4
+
+
+def test_compressed_frames_count_their_whole_duration():
+    output = make_output(playout_delay_ms=20)
+    output._ring.write(np.zeros((10 * FRAME, 2), dtype=np.int16))
+    queue(output, 1, value=8000)
+    written = output.queued_position - 10 * FRAME
+    assert written < FRAME
+    play(output, 10 * FRAME + written)
+    assert output.media_played_position == FRAME
+
+
+def test_flush_fades_out_and_drops_the_rest():
+    output = make_output(playout_delay_ms=None)
+    queue(output, 5)
+    play(output, FRAME)
+    output.flush(fade_ms=5)
+    block = play(output, FRAME)
+    fade = 5 * RATE // 1000
+    ramp = block[:fade, 0]
+    assert ramp[0] == 1000 and ramp[-1] < 50
+    assert (np.diff(ramp.astype(int)) <= 0).all()
+    assert not block[fade:].any()
+    # Only the faded samples were heard
+    assert output.media_played_position == FRAME + fade
+    assert output.buffered_frames == 0
+    assert output.flushed_samples == 4 * FRAME - fade
+
+    # Media positions keep counting received audio, flushed or not, so a new
+    # item measured from media_queued_position starts at zero
+    item_start = output.media_queued_position
+    queue(output, 1)
+    play(output, FRAME)
+    assert output.media_played_position - item_start == FRAME
+
+
+def test_hold_discards_frames_until_release():
+    output = make_output(playout_delay_ms=None)
+    output.flush(hold=True)
+    queue(output, 2)
+    assert output.media_queued_position == 0
+    output.release()
+    queue(output, 1)
+    assert output.media_queued_position == FRAME
+
+
+def test_hold_expires_after_the_timeout():
+    output = make_output(playout_delay_ms=None)
+    output.flush(hold=True, hold_timeout=0.01)
+    queue(output, 1)
+    assert output.media_queued_position == 0
+    time.sleep(0.02)
+    queue(output, 1)
+    assert output.media_queued_position == FRAME
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from openai_realtime_webrtc.audio_backends import NumpyBackend
+from openai_realtime_webrtc.audio_handler import (
+    DROP_BACKLOG, DROP_NEWEST, DROP_OLDEST, AudioHandler, AudioTrack, CaptureQueue,
+)
+
+FRAME = 960
+
+
+class Frame:
+    def __init__(self, index):
+        self.pts = index * FRAME
+        self.samples = FRAME
+
+
+def fill(queue, count, start=0):
+    for i in range(start, start + count):
+        queue.put_nowait(Frame(i))
+
+
+def queued(queue):
+    indices = []
+    while not queue.empty():
+        indices.append(queue.get_nowait().pts // FRAME)
+    return indices
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        CaptureQueue(policy="coalesce")
+
+
+def test_drop_oldest_keeps_the_newest_frames():
+    dropped = []
+    queue = CaptureQueue(3, DROP_OLDEST, on_drop=dropped.append)
+    fill(queue, 5)
+    assert queued(queue) == [2, 3, 4]
+    assert [f.pts // FRAME for f in dropped] == [0, 1]
+    assert queue.dropped_frames == 2
+    assert queue.max_depth == 3
+
+
+def test_drop_newest_keeps_the_backlog():
+    queue = CaptureQueue(3, DROP_NEWEST)
+    fill(queue, 5)
+    assert queued(queue) == [0, 1, 2]
+    assert queue.dropped_frames == 2
+
+
+def test_drop_backlog_keeps_only_the_incoming_frame():
+    queue = CaptureQueue(3, DROP_BACKLOG)
+    fill(queue, 4)
+    assert queued(queue) == [3]
+    assert queue.dropped_frames == 3
+
+
+def test_drop_records_are_consumed_up_to_a_pts():
+    queue = CaptureQueue(2, DROP_OLDEST)
+    fill(queue, 5)
+    assert queue.dropped_samples_before(2 * FRAME) == 2 * FRAME
+    assert queue.dropped_samples_before(10 * FRAME) == FRAME
+    assert queue.dropped_samples_before(10 * FRAME) == 0
+
+
+def test_get_waits_for_a_frame():
+    async def run():
+        queue = CaptureQueue(3)
+        waiter = asyncio.ensure_future(queue.get())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        queue.put_nowait(Frame(7))
+        return (await waiter).pts
+    assert asyncio.run(run()) == 7 * FRAME
+
+
+def make_track(max_queue_size=2):
+    handler = AudioHandler(backend=NumpyBackend())
+    return AudioTrack(handler, max_queue_size, DROP_OLDEST)
+
+
+def send(track):
+    frame = track._queue.get_nowait()
+    track._resync_pts(frame)
+    return frame.pts
+
+
+def test_overflow_drops_leave_no_hole_in_the_timeline():
+    track = make_track(max_queue_size=2)
+    fill(track._queue, 4)  # frames 0 and 1 are dropped
+    assert [send(track), send(track)] == [0, FRAME]
+
+
+def test_real_capture_gaps_are_kept():
+    track = make_track(max_queue_size=4)
+    fill(track._queue, 1)
+    assert send(track) == 0
+    # Frames 1-4 were never captured (e.g. held back by the VAD gate)
+    fill(track._queue, 1, start=5)
+    assert send(track) == 5 * FRAME
+
+
+def test_drops_and_capture_gaps_combine():
+    track = make_track(max_queue_size=1)
+    fill(track._queue, 1)
+    assert send(track) == 0
+    # Gap of two frames, then frame 3 is dropped by overflow
+    fill(track._queue, 2, start=3)
+    assert send(track) == 3 * FRAME
@@ -0,0 +1,144 @@
+import asyncio
+import json
+
+import pytest
+
+from openai_realtime_webrtc import events
+from openai_realtime_webrtc.events import EventChannel, EventDispatcher
+
+
+class FakeChannel:
+    label = "oai-events"
+
+    def __init__(self, ready_state="open"):
+        self.readyState = ready_state
+        self.sent = []
+        self._listeners = {}
+
+    def on(self, name):
+        def register(func):
+            self._listeners[name] = func
+            return func
+        return register
+
+    def open(self):
+        self.readyState = "open"
+        self._listeners["open"]()
+
+    def receive(self, message):
+        self._listeners["message"](message)
+
+    def send(self, data):
+        self.sent.append(json.loads(data))
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_codec_round_trip_with_and_without_orjson(monkeypatch, use_orjson):
+    if use_orjson:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(events, "orjson", None)
+    event = {"type": "session.update", "session": {"instructions": "héllo", "temperature": 0.5}}
+    text = events.dumps(event)
+    assert isinstance(text, str)
+    assert ", " not in text and ": " not in text
+    assert events.loads(text) == event
+    assert events.loads(text.encode()) == event
+
+
+def test_dispatch_by_type_and_wildcard():
+    dispatcher = EventDispatcher()
+    seen = []
+    dispatcher.on("response.done", lambda e: seen.append(("done", e["type"])))
+    dispatcher.on("*", lambda e: seen.append(("any", e["type"])))
+
+    @dispatcher.on("error")
+    def failing(event):
+        raise RuntimeError("boom")
+
+    assert dispatcher.dispatch({"type": "response.done"}) == 2
+    assert dispatcher.dispatch({"type": "error"}) == 2
+    assert seen == [("done", "response.done"), ("any", "response.done"), ("any", "error")]
+
+    dispatcher.off("error", failing)
+    assert dispatcher.dispatch({"type": "error"}) == 1
+
+
+def test_coroutine_handlers_run_as_tasks():
+    async def run():
+        dispatcher = EventDispatcher()
+        seen = []
+
+        async def handler(event):
+            await asyncio.sleep(0)
+            seen.append(event["type"])
+
+        dispatcher.on("x", handler)
+        dispatcher.dispatch({"type": "x"})
+        assert seen == []
+        await asyncio.sleep(0.01)
+        return seen
+    assert asyncio.run(run()) == ["x"]
+
+
+def test_messages_are_decoded_and_bad_ones_counted():
+    async def run():
+        channel = EventChannel()
+        seen = []
+        channel.dispatcher.on("*", seen.append)
+        fake = FakeChannel()
+        channel.attach(fake)
+        fake.receive('{"type":"response.created"}')
+        fake.receive("not json")
+        await channel.close()
+        return channel, seen
+    channel, seen = asyncio.run(run())
+    assert seen == [{"type": "response.created"}]
+    assert (channel.received, channel.decode_errors) == (1, 1)
+
+
+def test_send_queue_is_bounded():
+    async def run():
+        channel = EventChannel(max_send_queue=2)
+        channel.send_nowait({"type": "a"})
+        channel.send_nowait({"type": "b"})
+        with pytest.raises(asyncio.QueueFull):
+            channel.send_nowait({"type": "c"})
+        blocked = asyncio.ensure_future(channel.send({"type": "c"}))
+        await asyncio.sleep(0)
+        assert not blocked.done()
+
+        fake = FakeChannel()
+        channel.attach(fake)
+        await asyncio.wait_for(blocked, 1)
+        while channel.pending:
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        await channel.close()
+        return fake.sent
+    assert [e["type"] for e in asyncio.run(run())] == ["a", "b", "c"]
+
+
+def test_events_queued_while_detached_go_to_the_next_channel():
+    async def run():
+        channel = EventChannel()
+        first = FakeChannel()
+        channel.attach(first)
+        await channel.send({"type": "before"})
+        await asyncio.sleep(0.01)
+
+        # Reconnecting: nothing is sent until a new channel opens
+        channel.detach()
+        await channel.send({"type": "during"})
+        await asyncio.sleep(0.01)
+        second = FakeChannel(ready_state="connecting")
+        channel.attach(second)
+        await asyncio.sleep(0.01)
+        assert second.sent == []
+        second.open()
+        await asyncio.sleep(0.01)
+        await channel.close()
+        return first.sent, second.sent
+    first, second = asyncio.run(run())
+    assert [e["type"] for e in first] == ["before"]
+    assert [e["type"] for e in second] == ["during"]
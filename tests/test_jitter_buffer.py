@@ -0,0 +1,123 @@
+import numpy as np
+
+from openai_realtime_webrtc.jitter_buffer import JitterBuffer, MAX_CONCEAL_BLOCKS
+from openai_realtime_webrtc.ring_buffer import AudioRingBuffer
+
+RATE = 48000
+FRAME = 960  # 20ms
+
+
+def make_buffer(target_delay_ms=60, capacity=50 * FRAME):
+    ring = AudioRingBuffer(capacity, 1, np.int16)
+    return ring, JitterBuffer(ring, RATE, target_delay_ms=target_delay_ms)
+
+
+def tone(n=FRAME, level=8000):
+    t = np.arange(n)
+    return (level * np.sin(2 * np.pi * 440 * t / RATE)).astype(np.int16)[:, None]
+
+
+def silence(n=FRAME):
+    return np.zeros((n, 1), dtype=np.int16)
+
+
+def test_first_frame_builds_playout_cushion():
+    ring, jb = make_buffer(target_delay_ms=60)
+    written = jb.put(tone(), pts=0.0, arrival_time=0.0)
+    assert written == FRAME
+    # 60ms target: 40ms of silence ahead of the first 20ms frame
+    assert ring.available == 3 * FRAME
+    assert jb.current_delay_ms == 60.0
+
+
+def test_late_and_duplicate_frames_are_dropped():
+    ring, jb = make_buffer()
+    jb.put(tone(), pts=0.0, arrival_time=0.0)
+    jb.put(tone(), pts=0.02, arrival_time=0.02)
+    before = ring.available
+    assert jb.put(tone(), pts=0.0, arrival_time=0.03) == 0
+    assert jb.late_frames == 1
+    assert ring.available == before
+
+
+def test_gap_is_filled_with_silence():
+    ring, jb = make_buffer()
+    jb.put(tone(), pts=0.0, arrival_time=0.0)
+    before = ring.available
+    # The frame at 0.02 never arrives
+    written = jb.put(tone(), pts=0.04, arrival_time=0.04)
+    assert jb.concealed_blocks == 1
+    assert ring.available == before + FRAME + written
+
+
+def test_resync_accepts_an_earlier_timeline():
+    _, jb = make_buffer()
+    jb.put(tone(), pts=10.0, arrival_time=0.0)
+    jb.resync()
+    assert jb.put(tone(), pts=0.0, arrival_time=0.02) == FRAME
+    assert jb.late_frames == 0
+
+
+def test_backlog_compresses_speech_and_drops_silence():
+    ring, jb = make_buffer(target_delay_ms=20)
+    ring.write(tone(10 * FRAME))
+    written = jb.put(tone(), arrival_time=0.0)
+    assert written == FRAME - int(FRAME * jb.stretch_ratio)
+    assert jb.stretched_frames == 1
+
+    assert jb.put(silence(), arrival_time=0.02) == 0
+    assert jb.dropped_silence == 1
+
+
+def test_compress_crossfades_the_middle_and_keeps_the_edges():
+    _, jb = make_buffer()
+    samples = tone()
+    out = jb._compress(samples)
+    cut = int(FRAME * jb.stretch_ratio)
+    start = (FRAME - 2 * cut) // 2
+    assert len(out) == FRAME - cut
+    np.testing.assert_array_equal(out[:start], samples[:start])
+    np.testing.assert_array_equal(out[-start:], samples[-start:])
+
+
+def test_conceal_repeats_last_block_with_decay():
+    _, jb = make_buffer()
+    block = np.full((FRAME, 1), 1024, dtype=np.int16)
+    jb.conceal(block, FRAME)
+
+    levels = []
+    for _ in range(MAX_CONCEAL_BLOCKS + 1):
+        out = np.zeros((FRAME, 1), dtype=np.int16)
+        jb.conceal(out, 0)
+        levels.append(int(out[0, 0]))
+    assert levels == [512, 256, 128, 0]
+    assert jb.concealed_blocks == MAX_CONCEAL_BLOCKS
+
+    # Negative samples decay toward zero as well
+    jb.conceal(np.array([[-3], [-1], [3], [-32768]], dtype=np.int16), 4)
+    out = np.zeros((4, 1), dtype=np.int16)
+    jb.conceal(out, 0)
+    assert out[:, 0].tolist() == [-1, 0, 1, -16384]
+    for _ in range(MAX_CONCEAL_BLOCKS - 1):
+        jb.conceal(out, 0)
+    # Without rounding toward zero this would settle at -1
+    assert out[:2, 0].tolist() == [0, 0]
+
+
+def test_conceal_only_fills_the_missing_tail():
+    _, jb = make_buffer()
+    jb.conceal(np.full((FRAME, 1), 1000, dtype=np.int16), FRAME)
+    out = np.full((FRAME, 1), 7, dtype=np.int16)
+    out[FRAME // 2:] = 0
+    jb.conceal(out, FRAME // 2)
+    assert (out[:FRAME // 2] == 7).all()
+    assert (out[FRAME // 2:] == 500).all()
+
+
+def test_cut_stops_concealment():
+    _, jb = make_buffer()
+    jb.conceal(np.full((FRAME, 1), 1000, dtype=np.int16), FRAME)
+    jb.cut()
+    out = np.zeros((FRAME, 1), dtype=np.int16)
+    jb.conceal(out, 0)
+    assert not out.any()
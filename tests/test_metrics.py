@@ -0,0 +1,22 @@
+from openai_realtime_webrtc.metrics import PipelineMetrics
+
+
+def test_prometheus_escapes_label_values():
+    metrics = PipelineMetrics(labels={"device": 'Mic "USB"\\2\nleft'})
+    metrics.increment("frames")
+    text = metrics.to_prometheus()
+    assert 'openai_realtime_frames_total{device="Mic \\"USB\\"\\\\2\\nleft"} 1' in text
+    # Every sample stays on one line
+    assert all(line.startswith(("#", "openai_realtime_")) for line in text.splitlines())
+
+
+def test_prometheus_histogram_buckets_are_cumulative():
+    metrics = PipelineMetrics(labels={"session": "a"})
+    histogram = metrics.add_histogram("latency_ms", buckets=(1, 10))
+    for value in (0.5, 5, 50):
+        histogram.observe(value)
+    text = metrics.to_prometheus()
+    assert 'openai_realtime_latency_ms_bucket{session="a",le="1"} 1' in text
+    assert 'openai_realtime_latency_ms_bucket{session="a",le="10"} 2' in text
+    assert 'openai_realtime_latency_ms_bucket{session="a",le="+Inf"} 3' in text
+    assert 'openai_realtime_latency_ms_count{session="a"} 3' in text
@@ -0,0 +1,107 @@
+import math
+
+from openai_realtime_webrtc.opus import (
+    MAX_PACKET_LOSS, BitrateController, OpusSettings, TunedOpusEncoder)
+from openai_realtime_webrtc.stats import StatsSample
+
+
+def make_sample(timestamp: float, loss: float, rtt_ms: float = 50.0) -> StatsSample:
+    nan = math.nan
+    return StatsSample(timestamp, rtt_ms, nan, nan, loss, nan, nan, nan, 0, 0, 0, 0)
+
+
+def target(encoder: TunedOpusEncoder) -> OpusSettings:
+    return encoder._pending or encoder.settings
+
+
+def test_high_loss_backs_off_to_min_bitrate():
+    encoder = TunedOpusEncoder(OpusSettings(bitrate=32000))
+    controller = BitrateController(encoder, min_bitrate=20000)
+    assert controller.update(0.15).bitrate == 25600
+    assert controller.update(0.15).bitrate == 20480
+    assert controller.update(0.15).bitrate == 20000
+    # Already at the floor with FEC unchanged
+    assert controller.update(0.15) is None
+    assert controller.adjustments == 3
+
+
+def test_low_loss_probes_up_to_max_bitrate():
+    encoder = TunedOpusEncoder(OpusSettings(bitrate=20000))
+    controller = BitrateController(encoder, max_bitrate=24000)
+    assert controller.update(0.0, rtt=0.05).bitrate == 22000
+    assert controller.update(0.0, rtt=0.05).bitrate == 24000
+    assert controller.update(0.0, rtt=0.05) is None
+
+
+def test_high_rtt_holds_bitrate():
+    encoder = TunedOpusEncoder(OpusSettings(bitrate=20000))
+    controller = BitrateController(encoder, max_bitrate=32000)
+    assert controller.update(0.0, rtt=0.5) is None
+    # Loss between the two thresholds holds it as well
+    assert controller.update(0.05, rtt=0.05).bitrate == 20000
+    assert target(encoder).bitrate == 20000
+
+
+def test_fec_follows_loss_in_five_percent_steps():
+    encoder = TunedOpusEncoder(OpusSettings(bitrate=32000))
+    controller = BitrateController(encoder)
+
+    settings = controller.update(0.012)
+    assert settings.fec and settings.packet_loss == 5
+    assert controller.update(0.06).packet_loss == 10
+    assert controller.update(0.5).packet_loss == MAX_PACKET_LOSS
+    # Below the threshold FEC stays on while any loss remains
+    settings = controller.update(0.005)
+    assert settings.fec and settings.packet_loss == 5
+    settings = controller.update(0.0)
+    assert not settings.fec and settings.packet_loss == 0
+
+
+def test_configured_fec_is_kept_as_floor():
+    encoder = TunedOpusEncoder(OpusSettings(bitrate=32000, fec=True, packet_loss=10))
+    controller = BitrateController(encoder)
+    assert controller.update(0.0) is None
+    # Loss below the configured expectation keeps it
+    assert controller.update(0.03) is None
+    assert controller.update(0.12).packet_loss == 15
+    settings = controller.update(0.0)
+    assert settings.fec and settings.packet_loss == 10
+
+
+def test_configure_moves_ceiling_and_floor():
+    encoder = TunedOpusEncoder(OpusSettings(bitrate=32000, fec=True, packet_loss=10))
+    controller = BitrateController(encoder)
+    controller.configure(OpusSettings(bitrate=24000))
+    assert (controller.max_bitrate, controller.min_fec, controller.min_packet_loss) == (24000, False, 0)
+
+    settings = controller.update(0.0)
+    assert settings.bitrate == 24000 and not settings.fec and settings.packet_loss == 0
+
+
+def test_on_sample_skips_missing_loss_and_throttles():
+    encoder = TunedOpusEncoder(OpusSettings(bitrate=32000))
+    controller = BitrateController(encoder, interval=2.0)
+
+    assert controller.on_sample(make_sample(0.0, math.nan)) is None
+    assert controller.on_sample(make_sample(0.0, 0.15)).bitrate == 25600
+    # Within the interval (less 10% slack) samples are ignored
+    assert controller.on_sample(make_sample(1.7, 0.15)) is None
+    assert controller.on_sample(make_sample(1.8, 0.15)).bitrate == 20480
+    assert controller.loss == 0.15 and controller.rtt == 0.05
+
+
+def test_on_sample_without_rtt_still_probes():
+    encoder = TunedOpusEncoder(OpusSettings(bitrate=20000))
+    controller = BitrateController(encoder, max_bitrate=32000)
+    assert controller.on_sample(make_sample(0.0, 0.0, rtt_ms=math.nan)).bitrate == 22000
+    assert controller.rtt is None
+
+
+def test_reconfigure_is_applied_at_next_frame():
+    encoder = TunedOpusEncoder(OpusSettings(bitrate=32000))
+    controller = BitrateController(encoder)
+    controller.update(0.15)
+    assert encoder.settings.bitrate == 32000
+    assert encoder.target_bitrate == 25600
+    # Steps build on the pending settings, not the running ones
+    assert controller.update(0.15).bitrate == 20480
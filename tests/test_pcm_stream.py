@@ -0,0 +1,152 @@
+import asyncio
+
+import numpy as np
+from av import AudioFrame
+
+from openai_realtime_webrtc.pcm_stream import PCMInputStream, PCMOutputStream
+
+BLOCK = 480  # 10ms mono at 48kHz
+
+
+def pcm(n, start=1):
+    return np.arange(start, start + n, dtype=np.int16)
+
+
+def collect_input(source, **kwargs):
+    async def run():
+        blocks = []
+        stream = PCMInputStream(source, 48000, 1, np.int16, BLOCK,
+                                lambda data, frames, time, status: blocks.append(data.copy()),
+                                realtime=False, **kwargs)
+        stream.start()
+        await asyncio.wait_for(stream.finished.wait(), 5)
+        return blocks
+    return asyncio.run(run())
+
+
+def test_bytes_are_cut_into_blocks_with_a_padded_tail():
+    samples = pcm(2 * BLOCK + BLOCK // 2)
+    blocks = collect_input(samples.tobytes())
+    assert len(blocks) == 3
+    np.testing.assert_array_equal(np.concatenate(blocks)[:len(samples), 0], samples)
+    assert not blocks[2][BLOCK // 2:].any()
+
+
+def test_chunks_of_any_size_are_reassembled():
+    samples = pcm(3 * BLOCK)
+    data = samples.tobytes()
+
+    async def chunks():
+        # Odd byte counts split samples across chunks
+        for start in range(0, len(data), 333):
+            yield data[start:start + 333]
+
+    blocks = collect_input(chunks())
+    assert len(blocks) == 3
+    np.testing.assert_array_equal(np.concatenate(blocks)[:, 0], samples)
+
+
+def test_source_waits_while_the_backlog_is_high():
+    async def run():
+        backlog = [5]
+        blocks = []
+        stream = PCMInputStream(pcm(2 * BLOCK).tobytes(), 48000, 1, np.int16, BLOCK,
+                                lambda *args: blocks.append(1), realtime=False,
+                                backlog=lambda: backlog[0], max_backlog=1)
+        stream.start()
+        await asyncio.sleep(0.05)
+        paused = len(blocks)
+        backlog[0] = 0
+        await asyncio.wait_for(stream.finished.wait(), 5)
+        return paused, len(blocks)
+    assert asyncio.run(run()) == (0, 2)
+
+
+def make_frame(samples, layout="stereo", rate=48000, value=None):
+    channels = 1 if layout == "mono" else 2
+    frame = AudioFrame(samples=samples, layout=layout, format="s16")
+    frame.sample_rate = rate
+    data = pcm(samples * channels) if value is None else np.full(samples * channels, value, dtype=np.int16)
+    frame.planes[0].update(data)
+    return frame
+
+
+def test_matching_frames_are_passed_through_without_copying():
+    async def run():
+        stream = PCMOutputStream(48000, 2, chunk_ms=20)
+        frame = make_frame(960)
+        await stream.put_frame(frame)
+        stream.close()
+        return frame, [chunk async for chunk in stream]
+    frame, chunks = asyncio.run(run())
+    assert len(chunks) == 1
+    assert not isinstance(chunks[0].obj, np.ndarray)
+    assert bytes(chunks[0]) == bytes(frame.planes[0])[:960 * 4]
+
+
+def test_other_frames_are_cut_into_slots():
+    async def run():
+        stream = PCMOutputStream(48000, 2, chunk_ms=20)
+        for _ in range(3):
+            await stream.put_frame(make_frame(640))  # 13.3ms frames
+        stream.close()
+        return [chunk async for chunk in stream]
+    chunks = asyncio.run(run())
+    # 1920 samples make two whole 960-sample chunks
+    assert len(chunks) == 2
+    assert all(isinstance(chunk.obj, np.ndarray) and len(chunk) == 960 * 4 for chunk in chunks)
+    frame_data = pcm(640 * 2).reshape(-1, 2)
+    expected = np.concatenate([frame_data] * 3)[:1920]
+    received = np.concatenate([np.frombuffer(chunk, dtype=np.int16).reshape(-1, 2) for chunk in chunks])
+    np.testing.assert_array_equal(received, expected)
+
+
+def test_other_formats_are_converted():
+    async def run():
+        stream = PCMOutputStream(48000, 2, chunk_ms=20)
+        await stream.put_frame(make_frame(480, layout="mono", rate=24000, value=1000))
+        stream.close()
+        return [np.frombuffer(bytes(chunk), dtype=np.int16).reshape(-1, 2) async for chunk in stream]
+
+    chunks = asyncio.run(run())
+    assert len(chunks) == 1 and chunks[0].shape == (960, 2)
+    np.testing.assert_array_equal(chunks[0][:, 0], chunks[0][:, 1])
+
+
+def test_put_frame_waits_for_the_consumer():
+    async def run():
+        stream = PCMOutputStream(48000, 2, chunk_ms=20, max_chunks=1)
+        await stream.put_frame(make_frame(960))
+        blocked = asyncio.ensure_future(stream.put_frame(make_frame(960)))
+        await asyncio.sleep(0.01)
+        waited = not blocked.done()
+        await stream.__anext__()
+        await asyncio.wait_for(blocked, 1)
+        return waited, stream.buffered
+    assert asyncio.run(run()) == (True, 1)
+
+
+def test_close_drains_then_stops_and_wakes_waiters():
+    async def run():
+        stream = PCMOutputStream(48000, 2, chunk_ms=20)
+        waiter = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+        await stream.put_frame(make_frame(960))
+        await waiter
+
+        await stream.put_frame(make_frame(960))
+        stream.close()
+        await stream.put_frame(make_frame(960))  # ignored after close
+        remaining = [chunk async for chunk in stream]
+
+        idle = PCMOutputStream(48000, 2)
+        pending = asyncio.ensure_future(idle.__anext__())
+        await asyncio.sleep(0)
+        idle.close()
+        try:
+            await asyncio.wait_for(pending, 1)
+            ended = False
+        except StopAsyncIteration:
+            ended = True
+        return len(remaining), ended
+    assert asyncio.run(run()) == (1, True)
@@ -0,0 +1,131 @@
+import asyncio
+
+import numpy as np
+import pytest
+from av import AudioFrame
+
+from openai_realtime_webrtc.recording import (
+    DOWNLINK, EVENT, FOOTER, INDEX_MAGIC, MAGIC, RECORD_HEADER, UPLINK, SessionRecorder, SessionRecording,
+    replay_audio,
+)
+
+
+def make_frame(value, samples=480, layout="mono", rate=24000, pts=0):
+    channels = 1 if layout == "mono" else 2
+    frame = AudioFrame(samples=samples, layout=layout, format="s16")
+    frame.sample_rate = rate
+    frame.pts = pts
+    frame.planes[0].update(np.full(samples * channels, value, dtype=np.int16))
+    return frame
+
+
+def write_session(path, chunk_bytes=1):
+    recorder = SessionRecorder(str(path), chunk_bytes=chunk_bytes)
+    recorder.record_frame(UPLINK, make_frame(1, pts=0))
+    recorder.record_event({"type": "response.created", "response": {"id": "resp_1"}})
+    recorder.record_frame(DOWNLINK, make_frame(2, layout="stereo", rate=48000, pts=960))
+    recorder.close()
+    return recorder
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "session.rec"
+    recorder = write_session(path)
+    assert recorder.records == 3
+
+    recording = SessionRecording(str(path))
+    try:
+        records = list(recording.records())
+        assert [r.kind for r in records] == [UPLINK, EVENT, DOWNLINK]
+        uplink, event, downlink = records
+        assert (uplink.sample_rate, uplink.channels, uplink.pts) == (24000, 1, 0)
+        assert uplink.samples().shape == (480, 1) and (uplink.samples() == 1).all()
+        assert event.event() == {"type": "response.created", "response": {"id": "resp_1"}}
+        assert (downlink.sample_rate, downlink.channels, downlink.pts) == (48000, 2, 960)
+        assert downlink.samples().shape == (480, 2) and (downlink.samples() == 2).all()
+        timestamps = [r.timestamp for r in records]
+        assert timestamps == sorted(timestamps)
+    finally:
+        recording.close()
+
+
+def test_close_with_payload_views_still_held(tmp_path):
+    path = tmp_path / "session.rec"
+    write_session(path)
+    recording = SessionRecording(str(path))
+    records = list(recording.records())
+    recording.close()
+    # The views keep the mapping alive until they are released
+    assert (records[0].samples() == 1).all()
+    assert records[1].event()["type"] == "response.created"
+    recording.close()
+
+
+def test_replay_audio_yields_copies(tmp_path):
+    path = tmp_path / "session.rec"
+    write_session(path)
+    recording = SessionRecording(str(path))
+
+    async def run():
+        return [chunk async for chunk in replay_audio(recording, DOWNLINK, speed=0)]
+
+    chunks = asyncio.run(run())
+    recording.close()
+    assert len(chunks) == 1 and isinstance(chunks[0], bytes)
+    assert (np.frombuffer(chunks[0], dtype=np.int16) == 2).all()
+
+
+def test_file_layout_and_index(tmp_path):
+    path = tmp_path / "session.rec"
+    write_session(path, chunk_bytes=1)
+    data = path.read_bytes()
+    assert data[:len(MAGIC)] == MAGIC
+
+    index_offset, chunks, magic = FOOTER.unpack(data[-FOOTER.size:])
+    assert magic == INDEX_MAGIC
+    # chunk_bytes=1 puts every record in its own chunk
+    assert chunks == 3
+    index = np.frombuffer(data, dtype=[("timestamp", "<f8"), ("offset", "<i8")], count=chunks, offset=index_offset)
+    assert index["offset"][0] == len(MAGIC)
+    for timestamp, offset in index:
+        kind, _, _, _, _, record_time, _ = RECORD_HEADER.unpack_from(data, int(offset))
+        assert kind in (UPLINK, DOWNLINK, EVENT)
+        assert record_time == timestamp
+
+
+def test_records_filter_by_kind_and_time(tmp_path):
+    path = tmp_path / "session.rec"
+    write_session(path)
+    recording = SessionRecording(str(path))
+    try:
+        assert [r.kind for r in recording.records(kinds=(DOWNLINK,))] == [DOWNLINK]
+        timestamps = [r.timestamp for r in recording.records()]
+        later = [r.timestamp for r in recording.records(start=timestamps[1])]
+        assert later == timestamps[1:]
+        assert list(recording.records(end=timestamps[0])) == []
+        assert recording.duration == timestamps[-1]
+    finally:
+        recording.close()
+
+
+def test_unfinished_file_is_rescanned(tmp_path):
+    path = tmp_path / "session.rec"
+    write_session(path)
+    data = path.read_bytes()
+    index_offset, _, _ = FOOTER.unpack(data[-FOOTER.size:])
+    # Drop the index and footer, and cut the last record short as if the writer died
+    path.write_bytes(data[:index_offset - 10])
+
+    recording = SessionRecording(str(path))
+    try:
+        assert [r.kind for r in recording.records()] == [UPLINK, EVENT]
+        assert len(recording.index) == 1
+    finally:
+        recording.close()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a recording")
+    with pytest.raises(ValueError):
+        SessionRecording(str(path))
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from openai_realtime_webrtc.ring_buffer import AudioRingBuffer, SharedAudioRing
+
+
+def ramp(start, n, channels=1):
+    return np.arange(start, start + n, dtype=np.int16).repeat(channels).reshape(n, channels)
+
+
+def test_rejects_empty_capacity():
+    with pytest.raises(ValueError):
+        AudioRingBuffer(0)
+
+
+def test_wraparound_keeps_sample_order():
+    ring = AudioRingBuffer(8, 2)
+    out = np.empty((5, 2), dtype=np.int16)
+    assert ring.write(ramp(0, 6, 2)) == 6
+    assert ring.read_into(out) == 5
+    # Positions 8..10 wrap to slots 0..2
+    assert ring.write(ramp(6, 5, 2)) == 5
+    assert ring.available == 6
+    result = np.empty((6, 2), dtype=np.int16)
+    assert ring.read_into(result) == 6
+    np.testing.assert_array_equal(result, ramp(5, 6, 2))
+    assert (ring.write_position, ring.read_position) == (11, 11)
+
+
+def test_overrun_discards_what_does_not_fit():
+    ring = AudioRingBuffer(4)
+    assert ring.write(ramp(0, 6)) == 4
+    assert ring.overruns == 1
+    assert ring.free == 0
+    assert ring.write(ramp(6, 1)) == 0
+    assert ring.overruns == 2
+    out = np.empty((4, 1), dtype=np.int16)
+    ring.read_into(out)
+    np.testing.assert_array_equal(out, ramp(0, 4))
+
+
+def test_short_read_zero_fills_and_counts_one_underrun():
+    ring = AudioRingBuffer(8)
+    out = np.full((4, 1), 99, dtype=np.int16)
+    # Silence before the first write is not an underrun
+    assert ring.read_into(out) == 0
+    assert not out.any()
+    assert ring.underruns == 0
+
+    ring.write(ramp(1, 4))
+    ring.read_into(out)
+    ring.write(ramp(5, 2))
+    out[:] = 99
+    assert ring.read_into(out) == 2
+    np.testing.assert_array_equal(out[:, 0], [5, 6, 0, 0])
+    assert ring.underruns == 1
+    # Still starved: no new underrun until audio flows again
+    ring.read_into(out)
+    assert ring.underruns == 1
+
+
+def test_clear_drops_buffered_audio():
+    ring = AudioRingBuffer(8)
+    ring.write(ramp(0, 5))
+    ring.clear()
+    assert ring.available == 0
+    assert ring.read_position == ring.write_position == 5
+
+
+def test_shared_ring_attach_and_advance():
+    producer = SharedAudioRing(8, 2)
+    consumer = SharedAudioRing.attach(producer.spec)
+    try:
+        assert not consumer.owner
+        producer.write(ramp(0, 6, 2))
+        # Positions are per process until the peer's position is handed over
+        assert consumer.available == 0
+        consumer.advance_write(producer.write_position)
+        out = np.empty((6, 2), dtype=np.int16)
+        assert consumer.read_into(out) == 6
+        np.testing.assert_array_equal(out, ramp(0, 6, 2))
+
+        assert producer.free == 2
+        producer.advance_read(consumer.read_position)
+        assert producer.free == 8
+        # Stale positions never move a ring backwards
+        producer.advance_read(2)
+        assert producer.read_position == 6
+
+        producer.write(ramp(6, 5, 2))
+        consumer.advance_write(producer.write_position)
+        out = np.empty((5, 2), dtype=np.int16)
+        consumer.read_into(out)
+        np.testing.assert_array_equal(out, ramp(6, 5, 2))
+    finally:
+        consumer.close()
+        producer.close()
+        producer.unlink()
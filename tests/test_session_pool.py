@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from openai_realtime_webrtc.session_pool import PoolFullError, SessionPool
+
+
+class FakeClient:
+    def __init__(self, fail=None):
+        self.is_streaming = False
+        self.auto_reconnect = False
+        self.fail = fail
+        self.webrtc_manager = type("Manager", (), {"peer_connection": None, "audio_output": None})()
+        self.connection_stats = None
+
+    async def start_streaming(self):
+        if self.fail is not None:
+            await asyncio.sleep(0)
+            raise self.fail
+        self.is_streaming = True
+
+    async def stop_streaming(self):
+        self.is_streaming = False
+
+
+def make_pool(clients, **kwargs):
+    pool = SessionPool("key", max_sessions=1, **kwargs)
+    pool._create_client = lambda **overrides: clients.pop(0)
+    return pool
+
+
+async def no_start():
+    pass
+
+
+def test_failed_start_frees_the_slot():
+    async def run():
+        pool = make_pool([FakeClient(fail=RuntimeError("boom")), FakeClient()])
+        pool.start = no_start
+        with pytest.raises(RuntimeError):
+            await pool.open_session()
+        await pool.open_session()
+        assert pool.stats()["failed"] == 1
+    asyncio.run(run())
+
+
+def test_cancelled_start_frees_the_slot():
+    async def run():
+        pool = make_pool([FakeClient(fail=asyncio.CancelledError()), FakeClient()])
+        pool.start = no_start
+        with pytest.raises(asyncio.CancelledError):
+            await pool.open_session()
+        await pool.open_session()
+    asyncio.run(run())
+
+
+def test_sessions_that_stopped_themselves_are_pruned():
+    async def run():
+        pool = make_pool([FakeClient(), FakeClient()])
+        pool.start = no_start
+        first = await pool.open_session()
+        with pytest.raises(PoolFullError):
+            await pool._admit()
+        # e.g. reconnection gave up
+        await first.stop_streaming()
+        second = await pool.open_session()
+        assert pool.sessions == {second}
+        assert pool.stats()["pruned"] == 1
+    asyncio.run(run())
+
+
+def test_sessions_with_a_closed_connection_are_pruned():
+    async def run():
+        pool = make_pool([FakeClient(), FakeClient()])
+        pool.start = no_start
+        first = await pool.open_session()
+        first.webrtc_manager.peer_connection = type("PC", (), {"connectionState": "closed"})()
+        await pool.open_session()
+        assert not first.is_streaming
+    asyncio.run(run())
@@ -0,0 +1,109 @@
+import math
+from types import SimpleNamespace
+
+import pytest
+
+from openai_realtime_webrtc.stats import ConnectionStats, StatsSample, StatsWindow, aggregate_stats
+
+
+def make_sample(timestamp: float, rtt_ms: float = math.nan, loss: float = math.nan,
+                send_kbps: float = math.nan, bytes_sent: int = 0) -> StatsSample:
+    nan = math.nan
+    return StatsSample(timestamp, rtt_ms, nan, nan, loss, nan, send_kbps, nan, 0, 0, bytes_sent, 0)
+
+
+def test_window_size_must_be_positive():
+    with pytest.raises(ValueError):
+        StatsWindow(0)
+
+
+def test_latest_round_trips_sample():
+    window = StatsWindow(4)
+    assert window.latest is None and len(window) == 0
+    sample = make_sample(1.5, rtt_ms=40.0, loss=0.25, bytes_sent=1234)
+    window.append(sample)
+    latest = window.latest
+    assert latest.timestamp == 1.5 and latest.rtt_ms == 40.0 and latest.loss == 0.25
+    assert latest.bytes_sent == 1234 and math.isnan(latest.jitter_ms)
+
+
+def test_values_are_oldest_first_after_wraparound():
+    window = StatsWindow(3)
+    for t in range(5):
+        window.append(make_sample(float(t), rtt_ms=10.0 * t))
+    assert len(window) == 3
+    assert window.values("timestamp").tolist() == [2.0, 3.0, 4.0]
+    assert window.values("rtt_ms").tolist() == [20.0, 30.0, 40.0]
+    assert window.latest.timestamp == 4.0
+
+
+def test_values_are_copies():
+    window = StatsWindow(3)
+    window.append(make_sample(0.0, rtt_ms=10.0))
+    values = window.values("rtt_ms")
+    values[0] = 99.0
+    assert window.latest.rtt_ms == 10.0
+
+
+def test_summary_skips_unmeasured_values():
+    window = StatsWindow(10)
+    window.append(make_sample(0.0))  # before the first receiver report
+    for t, rtt in enumerate((10.0, 20.0, 30.0, 40.0), start=1):
+        window.append(make_sample(float(t), rtt_ms=rtt, loss=0.0))
+    summary = window.summary()
+    assert summary["rtt_ms"]["count"] == 4
+    assert summary["rtt_ms"]["avg"] == 25.0
+    assert summary["rtt_ms"]["p50"] == 25.0
+    assert summary["rtt_ms"]["max"] == 40.0
+    assert summary["send_kbps"] == {"count": 0, "avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+
+
+def test_clear_empties_window():
+    window = StatsWindow(2)
+    for t in range(3):
+        window.append(make_sample(float(t)))
+    window.clear()
+    assert len(window) == 0 and window.latest is None
+    assert len(window.values("timestamp")) == 0
+    window.append(make_sample(7.0))
+    assert window.values("timestamp").tolist() == [7.0]
+
+
+def test_aggregate_stats_over_sessions():
+    pollers = [
+        SimpleNamespace(latest=make_sample(0.0, rtt_ms=20.0, send_kbps=30.0)),
+        SimpleNamespace(latest=make_sample(0.0, rtt_ms=60.0, send_kbps=math.nan)),
+        SimpleNamespace(latest=None),
+    ]
+    result = aggregate_stats(pollers)
+    assert result["sessions"] == 2
+    assert result["rtt_ms"]["avg"] == 40.0 and result["rtt_ms"]["max"] == 60.0
+    assert result["loss"]["count"] == 0
+    assert result["send_kbps"] == 30.0
+
+
+def report(packets_received: int, packets_lost: int, bytes_sent: int, bytes_received: int,
+           fraction_lost: int = 0, rtt: float = 0.05):
+    stats = [
+        SimpleNamespace(type="outbound-rtp", packetsSent=0, bytesSent=bytes_sent),
+        SimpleNamespace(type="inbound-rtp", packetsReceived=packets_received,
+                        packetsLost=packets_lost, jitter=480),
+        SimpleNamespace(type="remote-inbound-rtp", roundTripTime=rtt, fractionLost=fraction_lost, jitter=960),
+        SimpleNamespace(type="transport", bytesReceived=bytes_received),
+    ]
+    return {str(i): s for i, s in enumerate(stats)}
+
+
+def test_sample_computes_rates_and_loss_from_previous():
+    poller = ConnectionStats(lambda: None)
+    first = poller._sample(report(100, 0, 10000, 20000), now=10.0)
+    assert math.isnan(first.send_kbps) and math.isnan(first.inbound_loss)
+    assert first.rtt_ms == 50.0 and first.jitter_ms == 10.0 and first.remote_jitter_ms == 20.0
+    poller._previous = first
+
+    second = poller._sample(report(190, 10, 15000, 30000, fraction_lost=64), now=12.0)
+    assert second.send_kbps == 20.0
+    assert second.recv_kbps == 40.0
+    # 10 lost of 100 expected since the previous sample
+    assert second.inbound_loss == 0.1
+    assert second.loss == 0.25
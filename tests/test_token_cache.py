@@ -0,0 +1,45 @@
+import asyncio
+import time
+
+from openai_realtime_webrtc.token_cache import EphemeralTokenCache
+from openai_realtime_webrtc.webrtc_manager import WebRTCManager
+
+
+class FakeManager:
+    def __init__(self):
+        self.minted = 0
+        self.closed = False
+
+    async def create_ephemeral_session(self, api_key, model, instructions, modalities):
+        self.minted += 1
+        return {"value": f"token_{self.minted}", "expires_at": time.time() + 60}
+
+    async def close(self):
+        self.closed = True
+
+
+def test_tokens_are_prefetched_and_handed_out_once():
+    async def run():
+        manager = FakeManager()
+        cache = EphemeralTokenCache("key", manager, prefetch=1)
+        assert await cache.get("model", "hi") == "token_1"
+        await asyncio.sleep(0)
+        assert cache.ready("model", "hi") == 1
+        assert await cache.get("model", "hi") == "token_2"
+        assert (cache.hits, cache.misses) == (1, 1)
+        await cache.close()
+        # A manager passed in belongs to the caller
+        assert not manager.closed
+    asyncio.run(run())
+
+
+def test_close_releases_an_owned_manager_session():
+    async def run():
+        cache = EphemeralTokenCache("key")
+        manager = cache.manager
+        assert isinstance(manager, WebRTCManager)
+        session = manager._get_http_session()
+        await cache.close()
+        assert session.closed
+        assert manager.http_session is None
+    asyncio.run(run())
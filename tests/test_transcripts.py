@@ -0,0 +1,115 @@
+import asyncio
+
+from openai_realtime_webrtc.events import EventDispatcher
+from openai_realtime_webrtc.transcripts import INPUT, OUTPUT, TranscriptAssembler, TranscriptChunk
+
+
+def delta(item_id, text, response_id="resp_1", content_index=0):
+    return {"type": "response.audio_transcript.delta", "item_id": item_id, "response_id": response_id,
+            "content_index": content_index, "delta": text}
+
+
+def done(item_id, transcript=None, content_index=0):
+    event = {"type": "response.audio_transcript.done", "item_id": item_id, "content_index": content_index}
+    if transcript is not None:
+        event["transcript"] = transcript
+    return event
+
+
+def test_deltas_are_joined_per_item():
+    assembler = TranscriptAssembler()
+    for text in ("Hel", "lo, ", "world"):
+        assembler.handle_event(delta("item_1", text))
+    assembler.handle_event(delta("item_2", "Other"))
+    assert assembler.text("item_1") == "Hello, world"
+    assert assembler.text("item_2") == "Other"
+    assert assembler.open_items == 2
+    assert assembler.deltas == 4
+
+
+def test_text_compacts_without_changing_the_result():
+    assembler = TranscriptAssembler()
+    assembler.handle_event(delta("item_1", "a"))
+    assembler.handle_event(delta("item_1", "b"))
+    assert assembler.text("item_1") == "ab"
+    assembler.handle_event(delta("item_1", "c"))
+    assert assembler.text("item_1") == "abc"
+
+
+def test_done_without_transcript_uses_the_deltas():
+    assembler = TranscriptAssembler()
+    finals = []
+    assembler.on_final = finals.append
+    assembler.handle_event(delta("item_1", "Hi "))
+    assembler.handle_event(delta("item_1", "there"))
+    assembler.handle_event(done("item_1"))
+    assert finals == [TranscriptChunk("item_1", "resp_1", 0, OUTPUT, "Hi there", True)]
+    assert assembler.open_items == 0
+    assert assembler.text("item_1") == "Hi there"
+
+
+def test_done_transcript_wins_over_the_deltas():
+    assembler = TranscriptAssembler()
+    assembler.handle_event(delta("item_1", "Hi thre"))
+    assembler.handle_event(done("item_1", "Hi there"))
+    assert assembler.text("item_1") == "Hi there"
+
+
+def test_content_parts_are_kept_apart():
+    assembler = TranscriptAssembler()
+    assembler.handle_event(delta("item_1", "first", content_index=0))
+    assembler.handle_event(delta("item_1", "second", content_index=1))
+    assert assembler.text("item_1", 0) == "first"
+    assert assembler.text("item_1", 1) == "second"
+
+
+def test_partial_callbacks_and_dispatcher_routing():
+    assembler = TranscriptAssembler()
+    dispatcher = EventDispatcher()
+    assembler.attach(dispatcher)
+    partials = []
+    assembler.on_partial = partials.append
+    dispatcher.dispatch({"type": "conversation.item.input_audio_transcription.delta",
+                         "item_id": "user_1", "delta": "yes"})
+    assert partials == [TranscriptChunk("user_1", None, 0, INPUT, "yes", False)]
+
+
+def test_finished_and_abandoned_items_are_evicted():
+    assembler = TranscriptAssembler(retain_finished=2, max_open_items=2)
+    for i in range(3):
+        assembler.handle_event(done(f"done_{i}", "text"))
+    assert assembler.text("done_0") is None
+    assert assembler.text("done_2") == "text"
+
+    for i in range(3):
+        assembler.handle_event(delta(f"open_{i}", "x"))
+    assert assembler.open_items == 2
+    assert assembler.text("open_0") is None
+    assert assembler.evicted == 2
+
+
+def test_callback_errors_do_not_stop_assembly():
+    assembler = TranscriptAssembler()
+
+    def fail(chunk):
+        raise RuntimeError("boom")
+
+    assembler.on_partial = fail
+    assembler.handle_event(delta("item_1", "ok"))
+    assert assembler.text("item_1") == "ok"
+
+
+def test_stream_yields_chunks_in_order():
+    async def run():
+        assembler = TranscriptAssembler()
+        stream = assembler.stream()
+        first = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+        assembler.handle_event(delta("item_1", "a"))
+        assembler.handle_event(done("item_1"))
+        chunks = [await first, await stream.__anext__()]
+        await stream.aclose()
+        return chunks
+
+    chunks = asyncio.run(run())
+    assert [(c.text, c.final) for c in chunks] == [("a", False), ("a", True)]
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from openai_realtime_webrtc.audio_backends import NumpyBackend
+from openai_realtime_webrtc.audio_handler import AudioHandler, CaptureQueue, VAD_COMFORT_NOISE
+from openai_realtime_webrtc.vad import SPEECH_END, SPEECH_START, VoiceActivityDetector
+
+RATE = 48000
+FRAME = 960  # 20ms
+
+
+def speech():
+    t = np.arange(FRAME)
+    return (8000 * np.sin(2 * np.pi * 220 * t / RATE)).astype(np.int16)[:, None]
+
+
+def silence():
+    return np.zeros((FRAME, 1), dtype=np.int16)
+
+
+def test_speech_onset_and_end_after_hangover():
+    vad = VoiceActivityDetector(hangover_ms=100)
+    assert vad.process(speech()) == (True, SPEECH_START)
+    assert vad.process(speech()) == (True, None)
+
+    results = [vad.process(silence()) for _ in range(6)]
+    # Active through the 100ms hangover, then a single end marker
+    assert results[:4] == [(True, None)] * 4
+    assert results[4] == (False, SPEECH_END)
+    assert results[5] == (False, None)
+
+
+def test_speech_within_hangover_keeps_the_segment_open():
+    vad = VoiceActivityDetector(hangover_ms=100)
+    vad.process(speech())
+    for _ in range(3):
+        vad.process(silence())
+    assert vad.process(speech()) == (True, None)
+    events = [vad.process(silence())[1] for _ in range(5)]
+    assert events.count(SPEECH_END) == 1
+
+
+def test_noise_floor_follows_steady_noise():
+    rng = np.random.default_rng(0)
+    vad = VoiceActivityDetector()
+    noise = (rng.standard_normal((FRAME, 1)) * 20).astype(np.int16)
+    for _ in range(20):
+        vad.process(noise)
+    assert vad.noise_floor_db < vad.min_level_db
+    assert not vad.is_active
+
+
+def make_handler(**kwargs):
+    vad = VoiceActivityDetector(hangover_ms=40, preroll_ms=60)
+    handler = AudioHandler(backend=NumpyBackend(), vad=vad, **kwargs)
+    handler._queue = CaptureQueue(100)
+    return handler
+
+
+def feed(handler, data, pts):
+    frame = handler._new_frame()
+    frame.planes[0].update(data)
+    frame.pts = pts
+    handler._gate(frame, data)
+
+
+def drain(queue):
+    frames = []
+    while not queue.empty():
+        frames.append(queue.get_nowait())
+    return frames
+
+
+def test_gate_replays_preroll_before_the_onset():
+    handler = make_handler()
+    starts = []
+    handler.on_speech_start = lambda: starts.append(True)
+    for i in range(5):
+        feed(handler, silence(), i * FRAME)
+    assert handler._queue.empty()
+
+    feed(handler, speech(), 5 * FRAME)
+    # 60ms of pre-roll (three frames) ahead of the first speech frame
+    assert [f.pts // FRAME for f in drain(handler._queue)] == [2, 3, 4, 5]
+    assert starts == [True]
+
+
+def test_gate_drops_silence_after_hangover():
+    handler = make_handler()
+    ends = []
+    handler.on_speech_end = lambda: ends.append(True)
+    feed(handler, speech(), 0)
+    for i in range(1, 8):
+        feed(handler, silence(), i * FRAME)
+    # The hangover frame is sent, the rest waits as pre-roll or is dropped
+    assert [f.pts // FRAME for f in drain(handler._queue)] == [0, 1]
+    assert ends == [True]
+    assert len(handler._preroll) == handler.vad.preroll_frames
+
+
+def test_gate_sends_comfort_noise_in_place_of_expired_silence():
+    handler = make_handler(vad_silence_mode=VAD_COMFORT_NOISE)
+    for i in range(5):
+        feed(handler, silence(), i * FRAME)
+    sent = drain(handler._queue)
+    assert [f.pts // FRAME for f in sent] == [0, 1]
+    assert all(f.samples == FRAME for f in sent)
+
+
+def test_unknown_silence_mode_is_rejected():
+    with pytest.raises(ValueError):
+        AudioHandler(backend=NumpyBackend(), vad=VoiceActivityDetector(), vad_silence_mode="comfort")